@@ -0,0 +1,132 @@
+"""Time to compile the PROV graph of synthetic MLflow projects of growing size.
+
+Usage: python benchmarks/compile_graph.py [RUN_COUNT ...]
+
+"merged" merges the document of every model into the accumulated document
+and dedupes it again, as compile_graph did before all models appended to one
+document. "shared" runs compile_graph. Per-run times of "shared" stay flat as
+the project grows, those of "merged" grow with the size of the graph.
+"""
+import datetime
+import sys
+import time
+from typing import Callable
+
+import prov.model
+
+from mlflow2prov.domain.model import (
+    Experiment,
+    LifecycleStage,
+    Metric,
+    Param,
+    Run,
+    RunStatus,
+    User,
+)
+from mlflow2prov.prov import model, operations
+from mlflow2prov.prov.query import QueryPlanner
+from mlflow2prov.service_layer.services import compile_graph
+from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork
+
+DEFAULT_RUN_COUNTS = [100, 200, 400, 800]
+RUNS_PER_EXPERIMENT = 20
+METRICS_PER_RUN = 10
+PARAMS_PER_RUN = 5
+GIT = "git"
+MLFLOW = "mlflow"
+
+
+def build_uow(run_count: int) -> InMemoryUnitOfWork:
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    user = User.from_username_str("user")
+    uow = InMemoryUnitOfWork()
+    with uow:
+        uow.resources[GIT]
+        for e in range(run_count // RUNS_PER_EXPERIMENT):
+            uow.resources[MLFLOW].add(
+                Experiment(
+                    experiment_id=str(e),
+                    name=f"experiment-{e}",
+                    user=user,
+                    artifact_location=f"artifacts/{e}",
+                    lifecycle_stage=LifecycleStage.ACTIVE,
+                    tags=[],
+                    created_at=timestamp,
+                    last_updated=timestamp,
+                )
+            )
+        for n in range(run_count):
+            run_id = f"{n:032x}"
+            uow.resources[MLFLOW].add(
+                Run(
+                    run_id=run_id,
+                    name=f"run-{n}",
+                    experiment_id=str(n // RUNS_PER_EXPERIMENT),
+                    user=user,
+                    status=RunStatus.FINISHED,
+                    start_time=timestamp,
+                    end_time=timestamp,
+                    lifecycle_stage=LifecycleStage.ACTIVE,
+                    artifact_uri=None,
+                    metrics=[
+                        Metric(
+                            run_id=run_id,
+                            name="loss",
+                            value=float(step),
+                            timestamp=timestamp,
+                            step=step,
+                        )
+                        for step in range(METRICS_PER_RUN)
+                    ],
+                    params=[
+                        Param(run_id=run_id, name=f"param-{i}", value=str(i))
+                        for i in range(PARAMS_PER_RUN)
+                    ],
+                    tags=[],
+                    artifacts=None,
+                    model_artifacts=None,
+                    note=None,
+                    source_type=None,
+                    source_name=None,
+                    source_git_commit=None,
+                    source_git_branch=None,
+                    source_git_repo_url=None,
+                )
+            )
+        uow.commit()
+    return uow
+
+
+def compile_merged(uow: InMemoryUnitOfWork) -> prov.model.ProvDocument:
+    repositories = [uow.resources[GIT], uow.resources[MLFLOW]]
+    planner = QueryPlanner(*repositories)
+    document = prov.model.ProvDocument()
+    for prov_model in model.MODELS:
+        context = model.ProvContext(prov.model.ProvDocument())
+        model_result = prov_model(repositories, planner, context)
+        document = operations.merge(graphs=[document, model_result])
+        document = operations.dedupe(graph=document)
+    return document
+
+
+def measure(build: Callable[[], prov.model.ProvDocument]) -> tuple[float, int]:
+    start = time.perf_counter()
+    document = build()
+    return time.perf_counter() - start, len(document.get_records())
+
+
+def main(run_counts: list[int]) -> None:
+    print(f"{'runs':>6} {'records':>8} {'merged':>12} {'shared':>12}")
+    for run_count in run_counts:
+        uow = build_uow(run_count)
+        merged, records = measure(lambda: compile_merged(uow))
+        shared, _ = measure(lambda: compile_graph([GIT, MLFLOW], uow))
+        print(
+            f"{run_count:>6} {records:>8} "
+            f"{merged / run_count * 1e3:>7.2f} ms/run "
+            f"{shared / run_count * 1e3:>7.2f} ms/run"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_RUN_COUNTS)
@@ -0,0 +1,122 @@
+"""Bytes per run of the MLflow domain objects, before and after slotting.
+
+Usage: python benchmarks/domain_memory.py [METRICS_PER_RUN ...]
+
+Synthetic runs are built the way the MLflow fetcher builds them. "before"
+uses plain dataclass copies of the domain classes and a fresh string per
+identifier, as returned by the tracking server. "after" uses the slotted
+domain classes and interned identifiers. Allocations are traced with
+tracemalloc, so the numbers only cover the domain objects.
+"""
+import dataclasses
+import datetime
+import sys
+import tracemalloc
+from typing import Any, Callable
+
+from mlflow2prov.domain.model import Metric, Param, Run, RunStatus, RunTag
+
+DEFAULT_METRICS_PER_RUN = [10, 100, 1000]
+RUN_COUNT = 100
+PARAMS_PER_RUN = 20
+TAGS_PER_RUN = 10
+METRIC_NAMES = 5
+
+
+def unslotted(cls: type) -> type:
+    # same fields and defaults, but instances carry a __dict__
+    return dataclasses.make_dataclass(
+        f"Unslotted{cls.__name__}",
+        [(f.name, f.type, f) for f in dataclasses.fields(cls)],
+    )
+
+
+def fresh(value: str) -> str:
+    # a new string object per occurrence, like a decoded server response
+    return "".join(list(value))
+
+
+def build_runs(
+    metrics_per_run: int,
+    classes: dict[str, type],
+    identifier: Callable[[str], str],
+) -> list[Any]:
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    runs = []
+    for n in range(RUN_COUNT):
+        run_id = f"{n:032x}"
+        runs.append(
+            classes["Run"](
+                run_id=identifier(run_id),
+                name=f"run-{n}",
+                experiment_id=identifier("0"),
+                user=None,
+                status=RunStatus.FINISHED,
+                start_time=timestamp,
+                end_time=timestamp,
+                lifecycle_stage=None,
+                artifact_uri=None,
+                metrics=[
+                    classes["Metric"](
+                        run_id=identifier(run_id),
+                        name=identifier(f"metric-{step % METRIC_NAMES}"),
+                        value=float(step),
+                        timestamp=timestamp,
+                        step=step // METRIC_NAMES,
+                    )
+                    for step in range(metrics_per_run)
+                ],
+                params=[
+                    classes["Param"](
+                        run_id=identifier(run_id),
+                        name=identifier(f"param-{i}"),
+                        value=str(i),
+                    )
+                    for i in range(PARAMS_PER_RUN)
+                ],
+                tags=[
+                    classes["RunTag"](
+                        run_id=identifier(run_id),
+                        name=identifier(f"tag-{i}"),
+                        value=str(i),
+                    )
+                    for i in range(TAGS_PER_RUN)
+                ],
+                artifacts=None,
+                model_artifacts=None,
+                note=None,
+                source_type=None,
+                source_name=None,
+                source_git_commit=None,
+                source_git_branch=None,
+                source_git_repo_url=None,
+            )
+        )
+    return runs
+
+
+def measure(build: Callable[[], list[Any]]) -> float:
+    tracemalloc.start()
+    runs = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del runs
+    return size / RUN_COUNT
+
+
+def main(metric_counts: list[int]) -> None:
+    slotted = {cls.__name__: cls for cls in (Run, Metric, Param, RunTag)}
+    plain = {name: unslotted(cls) for name, cls in slotted.items()}
+
+    print(f"{'metrics':>8} {'before':>14} {'after':>14} {'saved':>6}")
+    for metrics_per_run in metric_counts:
+        before = measure(lambda: build_runs(metrics_per_run, plain, fresh))
+        after = measure(lambda: build_runs(metrics_per_run, slotted, sys.intern))
+        print(
+            f"{metrics_per_run:>8} {before:>8.0f} B/run {after:>8.0f} B/run "
+            f"{1 - after / before:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_METRICS_PER_RUN)
@@ -0,0 +1,97 @@
+"""Peak RSS of the Git extraction stage for growing commit counts.
+
+Usage: python benchmarks/git_memory.py [COMMIT_COUNT ...]
+
+A synthetic repository is generated for every commit count, every commit
+modifies the same file. Both modes stream commits, the default mode reads the
+log of a file history at once while --stream_logs streams it. The default mode
+grows with the length of the history, streamed logs should show a flat curve. Each measurement runs in a fresh interpreter and
+reads the peak RSS of that process only (linux only). Expect several minutes
+for the default commit counts, every commit is diffed.
+"""
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+DEFAULT_COMMIT_COUNTS = [2500, 5000, 10000, 20000]
+FILE_COUNT = 1
+
+# ru_maxrss survives exec and would include the forked benchmark process,
+# the high water mark in /proc is reset by exec
+MEASURE = """
+import sys
+from pathlib import Path
+from mlflow2prov.adapters.git.fetcher import GitFetcher
+
+with GitFetcher(stream_logs=sys.argv[2] == "1") as fetcher:
+    fetcher.get_from_local_path(Path(sys.argv[1]))
+    count = sum(1 for _ in fetcher.fetch_all())
+with open("/proc/self/status") as status:
+    peak = next(line.split()[1] for line in status if line.startswith("VmHWM"))
+print(count, peak)
+"""
+
+
+def fast_import_stream(commit_count: int) -> bytes:
+    # every commit modifies one of FILE_COUNT files, files are added by the
+    # first commits
+    lines = []
+    for n in range(commit_count):
+        message = f"commit {n}".encode()
+        content = f"{n}\n".encode() * 64
+        lines += [
+            b"commit refs/heads/main",
+            f"mark :{n + 1}".encode(),
+            f"committer Bench <bench@example.org> {1_600_000_000 + n} +0000".encode(),
+            f"data {len(message)}".encode(),
+            message,
+        ]
+        if n:
+            lines.append(f"from :{n}".encode())
+        lines += [
+            f"M 644 inline src/file_{n % FILE_COUNT}.py".encode(),
+            f"data {len(content)}".encode(),
+            content,
+        ]
+    return b"\n".join(lines) + b"\n"
+
+
+def create_repository(path: Path, commit_count: int) -> None:
+    subprocess.run(["git", "init", "--quiet", str(path)], check=True)
+    subprocess.run(
+        ["git", "fast-import", "--quiet"],
+        cwd=path,
+        input=fast_import_stream(commit_count),
+        check=True,
+    )
+
+
+def measure(path: Path, stream_logs: bool) -> tuple[int, int]:
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE, str(path), "1" if stream_logs else "0"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    count, maxrss = result.stdout.split()
+    return int(count), int(maxrss)
+
+
+def main(commit_counts: list[int]) -> None:
+    # peaks are reported in kilobytes
+    print(f"{'commits':>8} {'resources':>10} {'default':>12} {'streamed':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for commit_count in commit_counts:
+            path = Path(tmp) / f"repo-{commit_count}"
+            create_repository(path, commit_count)
+            count, default = measure(path, stream_logs=False)
+            _, streamed = measure(path, stream_logs=True)
+            print(
+                f"{commit_count:>8} {count:>10} "
+                f"{default / 1024:>8.1f} MiB {streamed / 1024:>8.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_COMMIT_COUNTS)
@@ -0,0 +1,82 @@
+"""Time to generate PROV identifiers for the metrics of a run history.
+
+Usage: python benchmarks/identifiers.py [METRIC_COUNT]
+
+Models access the identifier of a metric several times in a row while adding
+it and its relations. "rebuilt" creates a document per qualified name and
+quotes every field on each access, as the domain objects did before
+identifiers were memoized. "memoized" runs the same accesses on the memoized
+identifiers, "first" only accesses each memoized identifier once.
+"""
+import datetime
+import sys
+import time
+import urllib.parse
+from typing import Callable
+
+import prov.model
+
+from mlflow2prov.domain.model import Metric
+from mlflow2prov.utils.prov_utils import document_factory
+
+DEFAULT_METRIC_COUNT = 1_000_000
+METRIC_NAMES = 10
+# accesses per metric after the first one
+REPEATS = 3
+
+
+def rebuilt_identifier(metric: Metric) -> prov.model.QualifiedName:
+    run_id = urllib.parse.quote_plus(metric.run_id, safe="")
+    name = urllib.parse.quote_plus(metric.name, safe="")
+    step = urllib.parse.quote_plus(str(metric.step), safe="")
+    namespace = document_factory().get_default_namespace()
+
+    return prov.model.QualifiedName(
+        namespace=namespace,
+        localpart=f"Metric?run_id={run_id}&name={name}&step={step}",
+    )
+
+
+def measure(metrics: list[Metric], identifier: Callable[[Metric], object]) -> float:
+    start = time.perf_counter()
+    for metric in metrics:
+        identifier(metric)
+    return time.perf_counter() - start
+
+
+def main(metric_count: int) -> None:
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    metrics = [
+        Metric(
+            run_id="0" * 32,
+            name=f"metric-{n % METRIC_NAMES}",
+            value=float(n),
+            timestamp=timestamp,
+            step=n // METRIC_NAMES,
+        )
+        for n in range(metric_count)
+    ]
+
+    def memoized(metric: Metric) -> object:
+        return metric.prov_identifier
+
+    # identifiers are accessed per run, one metric after the other
+    def memoized_repeated(metric: Metric) -> None:
+        for _ in range(1 + REPEATS):
+            metric.prov_identifier
+
+    def rebuilt_repeated(metric: Metric) -> None:
+        for _ in range(1 + REPEATS):
+            rebuilt_identifier(metric)
+
+    print(f"{metric_count} metrics, {1 + REPEATS} accesses each")
+    rebuilt = measure(metrics, rebuilt_repeated)
+    print(f"rebuilt   {rebuilt:>8.2f} s")
+    first = measure(metrics, memoized)
+    print(f"first     {first:>8.2f} s")
+    repeated = measure(metrics, memoized_repeated)
+    print(f"memoized  {repeated:>8.2f} s  ({rebuilt / repeated:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_METRIC_COUNT)
@@ -0,0 +1,65 @@
+"""Time to add the metrics of a run history to a PROV document.
+
+Usage: python benchmarks/prov_context.py [METRIC_COUNT]
+
+"copied" builds every element with to_prov() and copies it into the
+document, as ProvContext did before records were built directly. "direct"
+adds the same metrics with ProvContext.add_element.
+"""
+import datetime
+import sys
+import time
+from typing import Callable
+
+import prov.model
+
+from mlflow2prov.domain.model import Metric
+from mlflow2prov.prov.model import ProvContext
+
+DEFAULT_METRIC_COUNT = 50_000
+METRIC_NAMES = 10
+
+
+def add_copied(document: prov.model.ProvDocument, metric: Metric) -> None:
+    element = metric.to_prov()
+    record = document.new_record(
+        element._prov_type, element.identifier, element.attributes
+    )
+    document.add_record(record)
+
+
+def measure(metrics: list[Metric], add: Callable[[Metric], object]) -> float:
+    start = time.perf_counter()
+    for metric in metrics:
+        add(metric)
+    return time.perf_counter() - start
+
+
+def main(metric_count: int) -> None:
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    metrics = [
+        Metric(
+            run_id="0" * 32,
+            name=f"metric-{n % METRIC_NAMES}",
+            value=float(n),
+            timestamp=timestamp,
+            step=n // METRIC_NAMES,
+        )
+        for n in range(metric_count)
+    ]
+    # identifiers are memoized, warm them up for both variants alike
+    for metric in metrics:
+        metric.prov_identifier
+
+    document = prov.model.ProvDocument()
+    copied = measure(metrics, lambda metric: add_copied(document, metric))
+    context = ProvContext(prov.model.ProvDocument())
+    direct = measure(metrics, context.add_element)
+
+    print(f"{metric_count} metrics")
+    print(f"copied {copied:>8.2f} s")
+    print(f"direct {direct:>8.2f} s  ({1 - direct / copied:.0%} less)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_METRIC_COUNT)
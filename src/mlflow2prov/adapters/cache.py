@@ -0,0 +1,151 @@
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, ClassVar
+
+log = logging.getLogger(__name__)
+
+# writes are committed in batches, so that concurrent writers only
+# briefly hold the write lock of the database
+COMMIT_INTERVAL = 256
+
+
+@dataclass
+class CacheStatistics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def update(self, other: "CacheStatistics") -> None:
+        self.hits += other.hits
+        self.misses += other.misses
+        self.evictions += other.evictions
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses, "
+            f"{self.hit_rate:.1%} hit rate, {self.evictions} evictions"
+        )
+
+
+class SqliteCache:
+    """Tables of keyed payloads in a SQLite file, shared by concurrent users.
+
+    Subclasses declare their tables and the column types and serialize their
+    payloads. The least recently used entries are evicted once a table
+    exceeds `max_entries`.
+    """
+
+    name: ClassVar[str] = "cache"
+    tables: ClassVar[tuple[str, ...]] = ()
+    key_column: ClassVar[str] = "key"
+    payload_type: ClassVar[str] = "BLOB"
+
+    def __init__(self, path: Path, max_entries: int | None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.statistics = CacheStatistics()
+        self.connection = self.connect()
+        self.closed = False
+        self.pending = 0
+        # access times are written back in batches instead of per lookup
+        self.touched: dict[str, set[str]] = {table: set() for table in self.tables}
+
+    def connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        for table in self.tables:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"{self.key_column} TEXT PRIMARY KEY, "
+                f"payload {self.payload_type} NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)"
+            )
+        connection.commit()
+        return connection
+
+    def __getstate__(self) -> dict[str, Any]:
+        # connections cannot be shared across processes, reconnect instead
+        return {"path": self.path, "max_entries": self.max_entries}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get(self, table: str, key: str) -> Any:
+        row = self.connection.execute(
+            f"SELECT payload FROM {table} WHERE {self.key_column} = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.statistics.misses += 1
+            return None
+        self.statistics.hits += 1
+        self.touched[table].add(key)
+        return row[0]
+
+    def _put(self, table: str, key: str, payload: Any) -> None:
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO {table} ({self.key_column}, payload, accessed) "
+            "VALUES (?, ?, julianday('now'))",
+            (key, payload),
+        )
+        self.pending += 1
+        if self.pending >= COMMIT_INTERVAL:
+            self.connection.commit()
+            self.pending = 0
+
+    def evict(self) -> None:
+        if self.max_entries is None:
+            return
+        for table in self.tables:
+            (count,) = self.connection.execute(
+                f"SELECT COUNT(*) FROM {table}"
+            ).fetchone()
+            if count <= self.max_entries:
+                continue
+            self.connection.execute(
+                f"DELETE FROM {table} WHERE {self.key_column} IN "
+                f"(SELECT {self.key_column} FROM {table} "
+                "ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            self.statistics.evictions += count - self.max_entries
+
+    def flush(self) -> None:
+        for table, keys in self.touched.items():
+            self.connection.executemany(
+                f"UPDATE {table} SET accessed = julianday('now') "
+                f"WHERE {self.key_column} = ?",
+                ((key,) for key in keys),
+            )
+            keys.clear()
+        self.evict()
+        self.connection.commit()
+        self.pending = 0
+
+    def clear(self) -> None:
+        for table in self.tables:
+            self.connection.execute(f"DELETE FROM {table}")
+        self.connection.commit()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.flush()
+        self.connection.close()
+        self.closed = True
+        log.info(f"{self.name} {self.path}: {self.statistics}")
@@ -0,0 +1,89 @@
+import datetime
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from mlflow2prov.adapters.cache import SqliteCache
+from mlflow2prov.domain.model import Commit, User
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "mlflow2prov" / "git.sqlite"
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+
+def serialize_user(user: User | None) -> dict[str, Any] | None:
+    if user is None:
+        return None
+    return {"name": user.name, "email": user.email, "prov_role": user.prov_role}
+
+
+def deserialize_user(obj: dict[str, Any] | None) -> User | None:
+    if obj is None:
+        return None
+    return User(name=obj["name"], email=obj["email"], prov_role=obj["prov_role"])
+
+
+def serialize_commit(commit: Commit) -> str:
+    return json.dumps(
+        {
+            "title": commit.title,
+            "message": commit.message,
+            "author": serialize_user(commit.author),
+            "committer": serialize_user(commit.committer),
+            "parents": commit.parents,
+            "authored_at": commit.authored_at.isoformat(),
+            "committed_at": commit.committed_at.isoformat(),
+        }
+    )
+
+
+def deserialize_commit(sha: str, payload: str) -> Commit:
+    obj = json.loads(payload)
+    return Commit(
+        sha=sys.intern(sha),
+        title=obj["title"],
+        message=obj["message"],
+        author=deserialize_user(obj["author"]),
+        committer=deserialize_user(obj["committer"]),
+        parents=[sys.intern(parent) for parent in obj["parents"]],
+        authored_at=datetime.datetime.fromisoformat(obj["authored_at"]),
+        committed_at=datetime.datetime.fromisoformat(obj["committed_at"]),
+    )
+
+
+class GitObjectCache(SqliteCache):
+    """Content-addressed cache of parsed commits and their name-status diffs.
+
+    Entries are keyed by commit SHA and never become stale, so a cache file can
+    be shared by any number of clones and forks of the same history. The least
+    recently used entries are evicted once a table exceeds `max_entries`.
+    """
+
+    name = "git object cache"
+    tables = ("commits", "diffs")
+    key_column = "sha"
+    payload_type = "TEXT"
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int | None = DEFAULT_MAX_ENTRIES,
+    ):
+        super().__init__(path, max_entries)
+
+    def get_commit(self, sha: str) -> Commit | None:
+        payload = self._get("commits", sha)
+        return deserialize_commit(sha, payload) if payload is not None else None
+
+    def put_commit(self, commit: Commit) -> None:
+        self._put("commits", commit.sha, serialize_commit(commit))
+
+    def get_diff(self, sha: str) -> list[tuple[str, str]] | None:
+        """Return the (change type, path) pairs of a commit against its first parent."""
+        payload = self._get("diffs", sha)
+        if payload is None:
+            return None
+        return [(change_type, path) for change_type, path in json.loads(payload)]
+
+    def put_diff(self, sha: str, changes: list[tuple[str, str]]) -> None:
+        self._put("diffs", sha, json.dumps(changes))
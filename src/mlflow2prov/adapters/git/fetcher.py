@@ -1,19 +1,76 @@
-from collections.abc import Iterator
-from dataclasses import dataclass
-from itertools import zip_longest
+import logging
+import re
+import sys
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from pathlib import Path
+from typing import Any
 
 import git
+import git.compat
+import git.diff
+import git.exc
 import git.repo
 
+from mlflow2prov.adapters.cache import CacheStatistics
+from mlflow2prov.adapters.git.cache import GitObjectCache
 from mlflow2prov.domain.constants import ChangeType, ProvRole
 from mlflow2prov.domain.model import Commit, File, FileRevision, User
 
+log = logging.getLogger(__name__)
+
+# *magic* sha of the empty tree, used to diff commits without parents
+EMPTY_TREE_SHA = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+SHA_PATTERN = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+
+@dataclass
+class HistoryWindow:
+    # commit dates in any format understood by git, e.g. "2023-01-31"
+    since: str | None = None
+    until: str | None = None
+    max_count: int | None = None
+    # refs to walk instead of all refs
+    refs: list[str] | None = None
+
+    def is_bounded(self) -> bool:
+        return any(
+            option is not None
+            for option in (self.since, self.until, self.max_count, self.refs)
+        )
+
+    def options(self, limit: bool = True) -> dict[str, Any]:
+        options = {"since": self.since, "until": self.until}
+        if limit:
+            options["max_count"] = self.max_count
+        return {key: val for key, val in options.items() if val is not None}
+
 
 @dataclass
 class GitFetcher:
     path: Path | None = None
     repo: git.repo.Repo | None = None
+    # restrict extraction to the ancestry of these commits
+    commits: set[str] | None = None
+    # restrict file and revision extraction to these paths or file names
+    paths: set[str] | None = None
+    window: HistoryWindow = field(default_factory=HistoryWindow)
+    cache: GitObjectCache | None = None
+    # stream the log of each file history instead of reading it at once,
+    # memory use no longer grows with the length of a file history
+    stream_logs: bool = False
+    # write a commit-graph file if the repository has none
+    generate_commit_graph: bool = False
+    # set when the repository has a commit-graph file, enables walks that
+    # rely on generation numbers and changed-path filters
+    commit_graph: bool = False
+    # extract the submodules of each repository as separate repositories
+    follow_submodules: bool = False
+    # number of processes extracting repositories in parallel
+    workers: int | None = None
+    # types of the resources to extract, all of them if None
+    resource_types: set[type] | None = None
 
     def __enter__(self):
         return self
@@ -26,12 +83,115 @@ class GitFetcher:
     def get_from_local_path(self, path: Path) -> None:
         self.path = path
         self.repo = git.repo.Repo(path)
+        if self.generate_commit_graph and not has_commit_graph(self.repo):
+            write_commit_graph(self.repo)
+        self.commit_graph = has_commit_graph(self.repo)
+
+    def fetch_repositories(
+        self, paths: Iterable[Path]
+    ) -> Iterator[tuple[Path, Iterable[Commit | File | FileRevision]]]:
+        paths = discover_repositories(paths, self.follow_submodules)
+
+        if len(paths) == 1 or self.workers == 1:
+            for path in paths:
+                if self.repo:
+                    self.repo.close()
+                self.get_from_local_path(path)
+                yield path, self.fetch_all()
+            return
+
+        # every repository is extracted by a copy of this fetcher
+        fetchers = [replace(self, path=None, repo=None) for _ in paths]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for path, (resources, statistics) in zip(
+                paths, executor.map(fetch_repository, fetchers, paths)
+            ):
+                if self.cache and statistics:
+                    self.cache.statistics.update(statistics)
+                resources.reverse()
+                yield path, resources
+
+    def restrict_to(self, commits: Iterable[str], paths: Iterable[str]) -> None:
+        self.commits = set(commits)
+        self.paths = set(paths)
+
+    def fetches(self, resource_type: type) -> bool:
+        return self.resource_types is None or resource_type in self.resource_types
 
     def fetch_all(self) -> Iterator[Commit | File | FileRevision]:
         if self.repo:
-            yield from extract_commits(self.repo)
-            yield from extract_files(self.repo)
-            yield from extract_revisions(self.repo)
+            if self.fetches(Commit):
+                yield from extract_commits(
+                    self.repo,
+                    commits=self.commits,
+                    window=self.window,
+                    cache=self.cache,
+                )
+            if self.fetches(File):
+                yield from extract_files(
+                    self.repo,
+                    commits=self.commits,
+                    paths=self.paths,
+                    window=self.window,
+                    cache=self.cache,
+                    commit_graph=self.commit_graph,
+                )
+            if self.fetches(FileRevision):
+                yield from extract_revisions(
+                    self.repo,
+                    commits=self.commits,
+                    paths=self.paths,
+                    window=self.window,
+                    streaming=self.stream_logs,
+                    commit_graph=self.commit_graph,
+                )
+
+
+def fetch_repository(
+    fetcher: GitFetcher, path: Path
+) -> tuple[list[Commit | File | FileRevision], CacheStatistics | None]:
+    # runs in a worker process, the cache reconnects when unpickled
+    with fetcher:
+        fetcher.get_from_local_path(path)
+        resources = list(fetcher.fetch_all())
+
+    statistics = None
+    if fetcher.cache:
+        fetcher.cache.close()
+        statistics = fetcher.cache.statistics
+
+    # revisions reference their predecessor, pickle predecessors first
+    # to keep the recursion of pickle shallow for long file histories
+    resources.reverse()
+    return resources, statistics
+
+
+def discover_repositories(
+    paths: Iterable[Path], follow_submodules: bool = False
+) -> list[Path]:
+    repositories = []
+    for path in paths:
+        if path in repositories:
+            continue
+        repositories.append(path)
+        if not follow_submodules:
+            continue
+
+        with git.repo.Repo(path) as repo:
+            if repo.bare:
+                continue
+            submodules = []
+            for submodule in repo.submodules:
+                if not submodule.module_exists():
+                    log.warning(f"skipping uninitialized submodule {submodule.path}")
+                    continue
+                submodules.append(Path(submodule.abspath))
+
+        for submodule in discover_repositories(submodules, follow_submodules):
+            if submodule not in repositories:
+                repositories.append(submodule)
+
+    return repositories
 
 
 def get_author(commit: git.Commit) -> User:
@@ -50,85 +210,382 @@ def get_committer(commit: git.Commit) -> User:
     )
 
 
-def parse_log(log: str):
-    # split at line breaks, strip whitespace, remove empty lines
-    lines = [line.strip() for line in log.split("\n") if line]
+def parse_log(log: str | Iterable[str]) -> Iterator[tuple[str, str, str]]:
+    # accept the complete log or a stream of its lines
+    lines = log.split("\n") if isinstance(log, str) else log
 
-    # every second line contains the SHA1 of a commit
-    hexshas = lines[::2]
+    sha = ""
+    for line in lines:
+        # strip whitespace, skip empty lines
+        line = line.strip()
+        if not line:
+            continue
+        # commit lines contain the SHA1 of a commit
+        if SHA_PATTERN.fullmatch(line):
+            sha = line
+            continue
+        # every other line contains a type, aswell as a file path
+        fields = line.split()
+        yield fields[1], sha, fields[0][0]
 
-    # every other line contains a type, aswell as a file path
-    types = [line.split()[0][0] for line in lines[1::2]]
-    paths = [line.split()[1][:] for line in lines[1::2]]
 
-    # zip all three together
-    return zip(paths, hexshas, types)
+def stream_lines(repo: git.repo.Repo, command: str, *args, **kwargs) -> Iterator[str]:
+    # read the output of a git command line by line instead of all at once,
+    # the process is killed if the stream is not consumed to the end
+    proc = getattr(repo.git, command)(*args, as_process=True, **kwargs)
+    for line in proc.stdout:
+        yield line.decode(git.compat.defenc)
+    proc.wait()
 
 
-def extract_commits(repo: git.repo.Repo) -> Iterator[Commit]:
-    commit: git.Commit
-    for commit in repo.iter_commits("--all"):
-        yield Commit(
-            sha=commit.hexsha,
-            title=commit.summary,  # type:ignore
-            message=commit.message,  # type:ignore
-            author=get_author(commit),
-            committer=get_committer(commit),
-            parents=[parent.hexsha for parent in commit.parents],
-            authored_at=commit.authored_datetime,
-            committed_at=commit.committed_datetime,
-        )
+def commit_graph_files(repo: git.repo.Repo) -> list[Path]:
+    # single file as written by `git gc`, or a chain of incremental files
+    info = Path(repo.common_dir) / "objects" / "info"
+    return [info / "commit-graph", info / "commit-graphs" / "commit-graph-chain"]
 
 
-def extract_files(repo: git.repo.Repo) -> Iterator[File]:
-    for commit in repo.iter_commits("--all"):
-        # choose the parent commit to diff against
-        # use *magic* empty tree sha for commits without parents
-        parent = (
-            commit.parents[0]
-            if commit.parents
-            else "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
-        )
+def has_commit_graph(repo: git.repo.Repo) -> bool:
+    return any(path.is_file() for path in commit_graph_files(repo))
+
+
+def write_commit_graph(repo: git.repo.Repo) -> None:
+    # generation numbers speed up ancestry walks,
+    # changed-path bloom filters speed up path-limited walks
+    repo.git.commit_graph("write", "--reachable", "--changed-paths")
+
+
+def is_commit(repo: git.repo.Repo, sha: str) -> bool:
+    try:
+        repo.git.rev_parse("--verify", "--quiet", f"{sha}^{{commit}}")
+    except git.exc.GitCommandError:
+        return False
+    return True
+
+
+def revision_range(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None,
+    window: HistoryWindow | None = None,
+) -> list[str]:
+    # walk all refs unless the walk is restricted to the ancestry of
+    # given commits, commits unknown to the repository are skipped
+    if commits is None:
+        return list(window.refs) if window and window.refs else ["--all"]
+    return [sha for sha in sorted(commits) if is_commit(repo, sha)]
+
+
+def commits_in_window(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None,
+    window: HistoryWindow,
+) -> set[str]:
+    rev = revision_range(repo, commits, window)
+    if not rev:
+        return set()
+    return set(repo.git.rev_list(*rev, **window.options()).split())
+
+
+def is_relevant_path(path: str, paths: Iterable[str] | None) -> bool:
+    # runs reference their entry point either by path or by file name
+    if paths is None:
+        return True
+    return path in paths or Path(path).name in paths
+
+
+def glob_escape(pattern: str) -> str:
+    return re.sub(r"([\\*?\[])", r"\\\1", pattern)
 
-        # diff against parent
-        diff = commit.diff(parent, R=True)
 
+def pathspecs(paths: Iterable[str]) -> list[str]:
+    # pathspecs matching the same paths as is_relevant_path
+    specs = []
+    for path in sorted(set(paths)):
+        if not path:
+            continue
+        specs.append(f":(literal){path}")
+        if "/" not in path:
+            specs.append(f":(glob)**/{glob_escape(path)}")
+    return specs
+
+
+def commits_touching(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None,
+    paths: Iterable[str],
+    window: HistoryWindow | None = None,
+) -> set[str]:
+    # superset of the commits whose first-parent diff touches one of the
+    # paths, determined by a single path-limited walk instead of a diff per
+    # commit, the commit limit is applied by the walk of the caller
+    rev = revision_range(repo, commits, window)
+    specs = pathspecs(paths)
+    if not rev or not specs:
+        return set()
+    options = window.options(limit=False) if window else {}
+    touching = set(
+        repo.git.rev_list(*rev, "--full-history", "--", *specs, **options).split()
+    )
+    # merges are diffed against their first parent only, keep all of them
+    merges = repo.git.rev_list(*rev, "--min-parents=2", **options).split()
+    return touching.union(merges)
+
+
+def iter_commits(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None = None,
+    window: HistoryWindow | None = None,
+) -> Iterator[git.Commit]:
+    rev = revision_range(repo, commits, window)
+    # an empty range must not fall back to the active branch
+    if rev:
+        yield from repo.iter_commits(rev, **(window.options() if window else {}))
+
+
+def iter_shas(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None = None,
+    window: HistoryWindow | None = None,
+) -> Iterator[str]:
+    # same walk as iter_commits without instantiating commit objects
+    rev = revision_range(repo, commits, window)
+    if rev:
+        options = window.options() if window else {}
+        for line in stream_lines(repo, "rev_list", *rev, **options):
+            yield line.strip()
+
+
+def parse_commit(commit: git.Commit) -> Commit:
+    return Commit(
+        sha=sys.intern(commit.hexsha),
+        title=commit.summary,  # type:ignore
+        message=commit.message,  # type:ignore
+        author=get_author(commit),
+        committer=get_committer(commit),
+        parents=[sys.intern(parent.hexsha) for parent in commit.parents],
+        authored_at=commit.authored_datetime,
+        committed_at=commit.committed_datetime,
+    )
+
+
+def parse_changes(commit: git.Commit) -> list[tuple[str, str]]:
+    # choose the parent commit to diff against
+    # use *magic* empty tree sha for commits without parents
+    parent = commit.parents[0] if commit.parents else EMPTY_TREE_SHA
+
+    # diff against parent
+    diff = commit.diff(parent, R=True)
+
+    return [
+        (change_type, diff_item.b_path or diff_item.a_path)
+        for change_type in git.diff.DiffIndex.change_type
+        for diff_item in diff.iter_change_type(change_type)  # type: ignore
+    ]
+
+
+def extract_commits(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None = None,
+    window: HistoryWindow | None = None,
+    cache: GitObjectCache | None = None,
+) -> Iterator[Commit]:
+    # parents outside of the window are kept as dangling references
+    if cache is None:
+        for commit in iter_commits(repo, commits, window):
+            yield parse_commit(commit)
+        return
+
+    for sha in iter_shas(repo, commits, window):
+        parsed = cache.get_commit(sha)
+        if parsed is None:
+            parsed = parse_commit(repo.commit(sha))
+            cache.put_commit(parsed)
+        yield parsed
+
+
+def extract_files(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None = None,
+    paths: Iterable[str] | None = None,
+    window: HistoryWindow | None = None,
+    cache: GitObjectCache | None = None,
+    commit_graph: bool = False,
+) -> Iterator[File]:
+    # skip diffing commits that cannot touch a relevant path
+    only = (
+        commits_touching(repo, commits, paths, window)
+        if commit_graph and paths is not None
+        else None
+    )
+    for sha, changes in iter_changes(repo, commits, window, cache, only):
         # only consider files that have been added to the repository
         # disregard modifications and deletions
-        for diff_item in diff.iter_change_type(ChangeType.ADDED):
+        for change_type, path in changes:
+            if change_type != ChangeType.ADDED:
+                continue
+            if not is_relevant_path(path, paths):
+                continue
             # path for new files is stored in diff b_path
             yield File(
-                name=Path(diff_item.b_path).name,
-                path=diff_item.b_path,
-                commit=commit.hexsha,
+                name=sys.intern(Path(path).name),
+                path=sys.intern(path),
+                commit=sys.intern(sha),
             )
 
 
-def extract_revisions(repo: git.repo.Repo) -> Iterator[FileRevision]:
-    for file in extract_files(repo):
-        revs = []
+def files_in_window(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None = None,
+    paths: Iterable[str] | None = None,
+    window: HistoryWindow | None = None,
+    commit_graph: bool = False,
+) -> list[File]:
+    # files touched by the commits of the window, files added before the
+    # window belong to the commit that last added them, found outside of it
+    only = (
+        commits_touching(repo, commits, paths, window)
+        if commit_graph and paths is not None
+        else None
+    )
+    added: list[File] = []
+    touched: dict[str, str] = {}
+    for sha, changes in iter_changes(repo, commits, window, only=only):
+        for change_type, path in changes:
+            if not is_relevant_path(path, paths):
+                continue
+            if change_type == ChangeType.ADDED:
+                added.append(
+                    File(
+                        name=sys.intern(Path(path).name),
+                        path=sys.intern(path),
+                        commit=sys.intern(sha),
+                    )
+                )
+            else:
+                touched.setdefault(path, sha)
 
-        for path, sha, status in parse_log(
-            repo.git.log(
-                "--all",
-                "--follow",
-                "--name-status",
-                "--pretty=format:%H",
-                "--",
-                file.path,
+    files = list(added)
+    known = {file.path for file in added}
+    for path, sha in touched.items():
+        if path in known:
+            continue
+        # renames count as additions of the new path
+        adding = repo.git.log(
+            "-1", "--no-renames", "--diff-filter=A", "--format=%H", sha, "--", path
+        ).strip()
+        if not adding:
+            log.warning(f"skipping revisions of {path}, its addition is unknown")
+            continue
+        files.append(
+            File(
+                name=sys.intern(Path(path).name),
+                path=sys.intern(path),
+                commit=sys.intern(adding),
             )
-        ):
-            revs.append(
-                FileRevision(
-                    name=Path(path).name,
-                    path=path,
-                    commit=sha,
-                    status=status,
-                    file=file,
-                )
+        )
+    return files
+
+
+def iter_changes(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None = None,
+    window: HistoryWindow | None = None,
+    cache: GitObjectCache | None = None,
+    only: set[str] | None = None,
+) -> Iterator[tuple[str, list[tuple[str, str]]]]:
+    if cache is None:
+        for commit in iter_commits(repo, commits, window):
+            if only is not None and commit.hexsha not in only:
+                continue
+            yield commit.hexsha, parse_changes(commit)
+        return
+
+    for sha in iter_shas(repo, commits, window):
+        if only is not None and sha not in only:
+            continue
+        changes = cache.get_diff(sha)
+        if changes is None:
+            changes = parse_changes(repo.commit(sha))
+            cache.put_diff(sha, changes)
+        yield sha, changes
+
+
+def extract_revisions(
+    repo: git.repo.Repo,
+    commits: Iterable[str] | None = None,
+    paths: Iterable[str] | None = None,
+    window: HistoryWindow | None = None,
+    streaming: bool = False,
+    commit_graph: bool = False,
+) -> Iterator[FileRevision]:
+    revisions = revision_range(repo, commits, window)
+    if not revisions:
+        return
+
+    # revisions are limited to the same commits as commit and file
+    # extraction, the per-file log cannot apply the commit limit itself
+    in_window = (
+        commits_in_window(repo, commits, window)
+        if window and window.is_bounded()
+        else None
+    )
+    options = window.options(limit=False) if window else {}
+
+    # files added before the window may still be modified inside of it
+    files = (
+        files_in_window(repo, commits, paths, window, commit_graph)
+        if in_window is not None
+        else extract_files(
+            repo,
+            commits=commits,
+            paths=paths,
+            window=window,
+            commit_graph=commit_graph,
+        )
+    )
+    for file in files:
+        args = (
+            *revisions,
+            "--follow",
+            "--name-status",
+            "--pretty=format:%H",
+            "--",
+            file.path,
+        )
+        log = (
+            stream_lines(repo, "log", *args, **options)
+            if streaming
+            else repo.git.log(*args, **options)
+        )
+
+        # the log lists revisions newest first, each revision remembers its
+        # predecessor (previous revision) which is the next one in the log
+        rev = None
+        for path, sha, status in parse_log(log):
+            # names, paths and shas repeat across revisions, keep one copy
+            prev = FileRevision(
+                name=sys.intern(Path(path).name),
+                path=sys.intern(path),
+                commit=sys.intern(sha),
+                status=sys.intern(status),
+                file=file,
             )
+            if rev is not None:
+                yield from link_revision(rev, prev, in_window)
+            rev = prev
+        if rev is not None:
+            yield from link_revision(rev, None, in_window)
+
 
-        # revisions remeber their predecessor (previous revision)
-        for rev, prev in zip_longest(revs, revs[1:]):
-            rev.previous = prev
-            yield rev
+def link_revision(
+    rev: FileRevision,
+    prev: FileRevision | None,
+    in_window: set[str] | None,
+) -> Iterator[FileRevision]:
+    # predecessors outside of the window are not referenced
+    if in_window is not None:
+        if rev.commit not in in_window:
+            return
+        if prev and prev.commit not in in_window:
+            prev = None
+    rev.previous = prev
+    yield rev
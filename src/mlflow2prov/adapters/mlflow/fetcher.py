@@ -1,9 +1,10 @@
-import itertools
 import logging
 import os
+import sys
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Iterator
+from typing import Any, Iterator
 
 import mlflow
 import mlflow.entities.model_registry
@@ -13,11 +14,14 @@ import mlflow.utils.mlflow_tags
 import requests
 
 from mlflow2prov.domain.model import (
+    LAZY_RUN_FIELDS,
+    AbstractRunLoader,
     Artifact,
     Experiment,
     ExperimentTag,
+    LazyField,
     LifecycleStage,
-    Metric,
+    MetricStore,
     ModelArtifact,
     Param,
     RegisteredModel,
@@ -30,7 +34,10 @@ from mlflow2prov.domain.model import (
     RunTag,
     User,
 )
-from mlflow2prov.utils.time_utils import unix_timestamp_to_datetime
+from mlflow2prov.utils.time_utils import (
+    unix_timestamp_to_datetime,
+    unix_timestamps_to_datetimes,
+)
 
 log = logging.getLogger(__name__)
 
@@ -38,6 +45,12 @@ log = logging.getLogger(__name__)
 @dataclass
 class MLflowFetcher:
     tracking_uri: str | None = None
+    # populate the metrics, params, tags and artifacts of runs on first access
+    lazy: bool = False
+    # number of runs whose fields are loaded together
+    batch_size: int = 1
+    # types of the resources to fetch, all of them if None
+    resource_types: set[type] | None = None
     mlflow_client: mlflow.MlflowClient = field(init=False)
 
     def __post_init__(self) -> None:
@@ -81,20 +94,27 @@ class MLflowFetcher:
         log.error(f"failed to fetch {fetch_name} from {self.tracking_uri}")
         log.error(f"error: {error}")
 
+    def fetches(self, resource_type: type) -> bool:
+        return self.resource_types is None or resource_type in self.resource_types
+
     def fetch_all(
         self,
     ) -> Iterator[Experiment | Run | RegisteredModel]:
-        yield from itertools.chain(
-            self.fetch_experiments(),
-            self.fetch_runs(),
-            self.fetch_models(),
-        )
+        if self.fetches(Experiment):
+            yield from self.fetch_experiments()
+        if self.fetches(Run):
+            yield from self.fetch_runs()
+        if self.fetches(RegisteredModel):
+            yield from self.fetch_models()
 
     def fetch_experiments(self) -> Iterator[Experiment]:
         for experiment in mlflow.search_experiments(
             view_type=mlflow.entities.ViewType.ALL,
             order_by=["experiment_id ASC"],
         ):
+            created_at, last_updated = unix_timestamps_to_datetimes(
+                (experiment.creation_time, experiment.last_update_time)
+            )
             yield Experiment(
                 experiment_id=experiment.experiment_id,
                 name=experiment.name,
@@ -111,13 +131,29 @@ class MLflowFetcher:
                     )
                     for tag_key, tag_value in experiment.tags.items()
                 ],
-                created_at=unix_timestamp_to_datetime(experiment.creation_time),
-                last_updated=unix_timestamp_to_datetime(experiment.last_update_time),
+                created_at=created_at,
+                last_updated=last_updated,
+            )
+
+    def search_runs(self, exps: list[str]) -> Iterator[mlflow.entities.Run]:
+        # search results are requested page by page, a page is dropped once
+        # its runs are fetched
+        page_token = None
+        while exps:
+            page = self.mlflow_client.search_runs(
+                exps,
+                run_view_type=mlflow.entities.ViewType.ALL,
+                order_by=["start_time ASC"],
+                page_token=page_token,
             )
+            yield from page
+            page_token = page.token
+            if not page_token:
+                break
 
     def fetch_runs(self, exps: list[str] | None = None) -> Iterator[Run]:
-        run: mlflow.entities.Run
-        for run in mlflow.search_runs(  # type: ignore
+        loader = MLflowRunLoader(self, self.batch_size) if self.lazy else None
+        for run in self.search_runs(
             [
                 experiment.experiment_id
                 for experiment in mlflow.search_experiments(
@@ -126,87 +162,37 @@ class MLflowFetcher:
                 )
             ]
             if exps is None
-            else exps,
-            run_view_type=mlflow.entities.ViewType.ALL,
-            output_format="list",
-            order_by=["start_time ASC"],
+            else exps
         ):
             if run != None:
+                # identifiers and names repeat across the metrics, params and
+                # tags of a run, keep a single copy of each string
+                run_id = sys.intern(run.info.run_id)
+                if loader is None:
+                    fields = self.fetch_run_fields(run, run_id)
+                else:
+                    loader.add(run_id)
+                    fields = {
+                        name: LazyField(loader, run_id, name)
+                        for name in LAZY_RUN_FIELDS
+                    }
+                start_time, end_time = unix_timestamps_to_datetimes(
+                    (run.info.start_time, run.info.end_time)
+                )
                 yield Run(
-                    run_id=run.info.run_id,
+                    run_id=run_id,
                     name=str(run.info.run_name),
-                    experiment_id=run.info.experiment_id,
+                    experiment_id=sys.intern(run.info.experiment_id),
                     user=User.from_username_str(run.info.user_id)
                     if run.info.user_id
                     else None,
                     status=RunStatus.from_string(run.info.status),
-                    start_time=unix_timestamp_to_datetime(run.info.start_time),
-                    end_time=unix_timestamp_to_datetime(run.info.end_time),
+                    start_time=start_time,
+                    end_time=end_time,
                     lifecycle_stage=LifecycleStage.from_string(
                         run.info.lifecycle_stage
                     ),
                     artifact_uri=run.info.artifact_uri,
-                    metrics=[
-                        Metric(
-                            run_id=run.info.run_id,
-                            name=metric.key,
-                            value=metric.value,
-                            timestamp=unix_timestamp_to_datetime(metric.timestamp),
-                            step=metric.step,
-                        )
-                        for metric in run.data._metric_objs
-                    ],
-                    params=[
-                        Param(run_id=run.info.run_id, name=param_key, value=param_value)
-                        for param_key, param_value in run.data.params.items()
-                    ],
-                    tags=[
-                        RunTag(
-                            run_id=run.info.run_id,
-                            name=tag_key.strip(),
-                            value=tag_value.strip(),
-                        )
-                        for tag_key, tag_value in run.data.tags.items()
-                    ],
-                    artifacts=[
-                        Artifact(
-                            run_id=run.info.run_id,
-                            path=artifact.path,
-                            is_dir=artifact.is_dir,
-                            file_size=artifact.file_size,
-                        )
-                        for artifact in self.mlflow_client.list_artifacts(
-                            run.info.run_id
-                        )
-                    ],
-                    model_artifacts=[
-                        ModelArtifact(
-                            run_id=run.info.run_id,
-                            path=artifact.path,
-                            is_dir=artifact.is_dir,
-                            file_size=artifact.file_size,
-                            artifact=Artifact(
-                                run_id=run.info.run_id,
-                                path=artifact.path,
-                                is_dir=artifact.is_dir,
-                                file_size=artifact.file_size,
-                            ),
-                        )
-                        for artifact in self.mlflow_client.list_artifacts(
-                            run.info.run_id
-                        )
-                        for file in os.listdir(
-                            os.path.join(
-                                urllib.parse.unquote(
-                                    urllib.parse.urlparse(
-                                        str(run.info.artifact_uri)
-                                    ).path
-                                ),
-                                artifact.path,
-                            )
-                        )
-                        if file.endswith("MLmodel")
-                    ],
                     note=run.data.tags.get(
                         mlflow.utils.mlflow_tags.MLFLOW_RUN_NOTE, None
                     ),
@@ -227,8 +213,68 @@ class MLflowFetcher:
                     source_git_repo_url=run.data.tags.get(
                         mlflow.utils.mlflow_tags.MLFLOW_GIT_REPO_URL, None
                     ),
+                    **fields,
                 )
 
+    def fetch_run_fields(self, run: mlflow.entities.Run, run_id: str) -> dict[str, Any]:
+        # the fields of LAZY_RUN_FIELDS, artifacts are listed by the server
+        artifacts = self.mlflow_client.list_artifacts(run_id)
+
+        return {
+            "metrics": MetricStore.from_points(
+                run_id,
+                (
+                    (metric.key, metric.value, metric.timestamp, metric.step)
+                    for metric in run.data._metric_objs
+                ),
+            ),
+            "params": [
+                Param(run_id=run_id, name=sys.intern(param_key), value=param_value)
+                for param_key, param_value in run.data.params.items()
+            ],
+            "tags": [
+                RunTag(
+                    run_id=run_id,
+                    name=sys.intern(tag_key.strip()),
+                    value=tag_value.strip(),
+                )
+                for tag_key, tag_value in run.data.tags.items()
+            ],
+            "artifacts": [
+                Artifact(
+                    run_id=run_id,
+                    path=artifact.path,
+                    is_dir=artifact.is_dir,
+                    file_size=artifact.file_size,
+                )
+                for artifact in artifacts
+            ],
+            "model_artifacts": [
+                ModelArtifact(
+                    run_id=run_id,
+                    path=artifact.path,
+                    is_dir=artifact.is_dir,
+                    file_size=artifact.file_size,
+                    artifact=Artifact(
+                        run_id=run_id,
+                        path=artifact.path,
+                        is_dir=artifact.is_dir,
+                        file_size=artifact.file_size,
+                    ),
+                )
+                for artifact in artifacts
+                for file in os.listdir(
+                    os.path.join(
+                        urllib.parse.unquote(
+                            urllib.parse.urlparse(str(run.info.artifact_uri)).path
+                        ),
+                        artifact.path,
+                    )
+                )
+                if file.endswith("MLmodel")
+            ],
+        }
+
     def fetch_models(
         self,
     ) -> Iterator[RegisteredModel]:
@@ -290,3 +336,56 @@ class MLflowFetcher:
                     for tag_key, tag_value in registered_model.tags.items()
                 ],
             )
+
+
+class MLflowRunLoader(AbstractRunLoader):
+    """Loads the lazy fields of fetched runs on first access.
+
+    The first access to a field of a run loads all lazy fields of that run and
+    of the next `batch_size - 1` runs not loaded yet. Only the ids of pending
+    runs are kept, the runs of a batch are fetched again and their artifacts
+    listed concurrently.
+    """
+
+    def __init__(self, fetcher: MLflowFetcher, batch_size: int = 1):
+        self.fetcher = fetcher
+        self.batch_size = max(batch_size, 1)
+        # ids of the runs not loaded yet, in fetch order
+        self.pending: dict[str, None] = {}
+        # run_id -> fields loaded but not handed out yet
+        self.loaded: dict[str, dict[str, Any]] = {}
+
+    def add(self, run_id: str) -> None:
+        self.pending[run_id] = None
+
+    def fetch(self, run_id: str) -> dict[str, Any]:
+        run = self.fetcher.mlflow_client.get_run(run_id)
+        return self.fetcher.fetch_run_fields(run, run_id)
+
+    def load(self, run_id: str, name: str) -> Any:
+        if run_id not in self.loaded:
+            self.load_batch(run_id)
+
+        fields = self.loaded[run_id]
+        value = fields.pop(name)
+        if not fields:
+            del self.loaded[run_id]
+        return value
+
+    def load_batch(self, run_id: str) -> None:
+        batch = [run_id]
+        for other in self.pending:
+            if len(batch) == self.batch_size:
+                break
+            if other != run_id:
+                batch.append(other)
+        for other in batch:
+            self.pending.pop(other, None)
+
+        if len(batch) == 1:
+            self.loaded[run_id] = self.fetch(run_id)
+            return
+
+        with ThreadPoolExecutor(max_workers=len(batch)) as executor:
+            for other, fields in zip(batch, executor.map(self.fetch, batch)):
+                self.loaded[other] = fields
@@ -1,13 +1,49 @@
 import abc
+import copy
+import pickle
+import sqlite3
 from collections import defaultdict
+from collections.abc import Iterator
+from enum import Enum
+from pathlib import Path, PurePath
 from typing import Any, Type, TypeVar
 
+from mlflow2prov.domain.model import (
+    Commit,
+    Experiment,
+    FileRevision,
+    RegisteredModel,
+    Run,
+)
+
 R = TypeVar("R")
 
+# attributes resources are looked up by when compiling the graph,
+# filters on other attributes fall back to a scan of the resource type
+DEFAULT_INDEXES: dict[type, tuple[str, ...]] = {
+    Commit: ("sha",),
+    FileRevision: ("name", "status"),
+    Experiment: ("experiment_id", "lifecycle_stage"),
+    Run: ("run_id", "experiment_id", "lifecycle_stage"),
+    RegisteredModel: ("name",),
+}
+
+# fields referencing another resource, stored as a reference to the row of
+# that resource so that chains of predecessors are stored only once
+REFERENCE_FIELDS: dict[type, str] = {FileRevision: "previous"}
+
+# number of resources buffered before they are inserted
+BATCH_SIZE = 1024
+
+# types of the values stored in the lookup table as they are, values of other
+# types are stored as their repr and never looked up
+LOOKUP_TYPES = (str, int, float, bytes, type(None))
 
-class AbstractRepository(abc.ABC):
-    def add(self, resource: R) -> None:
-        self._add(resource)
+
+class AbstractReadRepository(abc.ABC):
+    # resources of streamed repositories are read from disk on every access,
+    # they are probed through the indexed attributes instead of being listed
+    streamed: bool = False
 
     def get(self, resource_type: Type[R], **filters: Any) -> R | None:
         resource = self._get(resource_type, **filters)
@@ -17,9 +53,8 @@ class AbstractRepository(abc.ABC):
         resources = self._list_all(resource_type, **filters)
         return resources
 
-    @abc.abstractmethod
-    def _add(self, resource: R) -> None:
-        raise NotImplementedError
+    def iter_all(self, resource_type: Type[R], **filters: Any) -> Iterator[R]:
+        yield from self.list_all(resource_type, **filters)
 
     @abc.abstractmethod
     def _get(self, resource_type: Type[R], **filters: Any) -> R | None:
@@ -34,32 +69,359 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
 
+class AbstractRepository(AbstractReadRepository):
+    def add(self, resource: R) -> None:
+        self._add(resource)
+
+    @abc.abstractmethod
+    def _add(self, resource: R) -> None:
+        raise NotImplementedError
+
+
 class InMemoryRepository(AbstractRepository):
-    def __init__(self):
+    def __init__(self, indexes: dict[type, tuple[str, ...]] | None = None):
         super().__init__()
         self.repo = defaultdict(list)
+        self.indexes = DEFAULT_INDEXES if indexes is None else indexes
+        # (resource type, attribute) -> attribute value -> resources in
+        # insertion order, indexed attributes must not change after adding
+        self.index: dict[tuple[type, str], dict[Any, list[Any]]] = {}
 
     def _add(self, resource: R) -> None:  # type: ignore
-        self.repo[type(resource)].append(resource)
+        resource_type = type(resource)
+        self.repo[resource_type].append(resource)
+        for key in self.indexes.get(resource_type, ()):
+            index = self.index.setdefault((resource_type, key), {})
+            index.setdefault(getattr(resource, key), []).append(resource)
+
+    def _candidates(
+        self, resource_type: Type[R], filters: dict[str, Any]
+    ) -> tuple[list[R], dict[str, Any]]:
+        # narrow down to the resources matching the first indexed filter
+        for key, val in filters.items():
+            if key not in self.indexes.get(resource_type, ()):
+                continue
+            try:
+                resources = self.index.get((resource_type, key), {}).get(val, [])
+            except TypeError:  # unhashable filter value
+                continue
+            rest = {k: v for k, v in filters.items() if k != key}
+            return resources, rest
+        return self.repo.get(resource_type, []), filters
 
     def _get(self, resource_type: Type[R], **filters: Any) -> R | None:
+        resources, filters = self._candidates(resource_type, filters)
         return next(
             (
                 r
-                for r in self.repo.get(resource_type, [])
+                for r in resources
                 if all(getattr(r, key) == val for key, val in filters.items())
             ),
             None,
         )
 
     def _list_all(self, resource_type: Type[R], **filters: Any) -> list[R]:
+        resources, filters = self._candidates(resource_type, filters)
         return [
             r
-            for r in self.repo.get(resource_type, [])
+            for r in resources
             if all(getattr(r, key) == val for key, val in filters.items())
         ]
 
+    def iter_resources(self) -> Iterator[Any]:
+        # all resources, in insertion order per resource type
+        for resources in list(self.repo.values()):
+            yield from resources
+
     def __eq__(self, other):
         if isinstance(self, other.__class__):
             return self.repo == other.repo
         return False
+
+
+class CompositeRepository(AbstractReadRepository):
+    # read-only view on several repositories, lookups are answered by the
+    # first repository containing a matching resource
+    def __init__(self, repositories: list[AbstractReadRepository]):
+        super().__init__()
+        self.repositories = repositories
+        self.streamed = all(repository.streamed for repository in repositories)
+
+    def _get(self, resource_type: Type[R], **filters: Any) -> R | None:
+        for repository in self.repositories:
+            resource = repository.get(resource_type, **filters)
+            if resource is not None:
+                return resource
+        return None
+
+    def _list_all(self, resource_type: Type[R], **filters: Any) -> list[R]:
+        return [
+            r
+            for repository in self.repositories
+            for r in repository.list_all(resource_type, **filters)
+        ]
+
+    def iter_all(self, resource_type: Type[R], **filters: Any) -> Iterator[R]:
+        for repository in self.repositories:
+            yield from repository.iter_all(resource_type, **filters)
+
+    def __eq__(self, other):
+        if isinstance(self, other.__class__):
+            return self.repositories == other.repositories
+        return False
+
+
+def type_name(resource_type: type) -> str:
+    return f"{resource_type.__module__}.{resource_type.__qualname__}"
+
+
+def lookup_value(value: Any) -> Any:
+    # values that compare equal are stored equal, e.g. 1 and 1.0, lookups may
+    # match more resources than the filters, e.g. a path and its string, the
+    # filters are checked again on the loaded resources
+    if isinstance(value, Enum):
+        value = value.value
+    elif isinstance(value, PurePath):
+        value = str(value)
+    return value
+
+
+class SqliteDatabase:
+    """On-disk storage shared by the repositories of a SQLite unit of work.
+
+    Resources are pickled into rows of one table, values of the attributes in
+    DEFAULT_INDEXES go into a lookup table. Inserts are buffered and written
+    in batches, nothing is visible to other connections before a commit.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        # position is the insertion order, resources that are only
+        # referenced by other resources have none and are never listed
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS resources ("
+            "seq INTEGER PRIMARY KEY, position INTEGER, namespace TEXT NOT NULL, "
+            "type TEXT NOT NULL, ref INTEGER, payload BLOB NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS resources_type "
+            "ON resources (namespace, type, position)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS lookup ("
+            "namespace TEXT NOT NULL, type TEXT NOT NULL, key TEXT NOT NULL, "
+            "value, seq INTEGER NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS lookup_value "
+            "ON lookup (namespace, type, key, value)"
+        )
+        self.connection.commit()
+        self.reset()
+
+    def reset(self) -> None:
+        (self.next_seq,) = self.connection.execute(
+            "SELECT COALESCE(MAX(seq), 0) + 1 FROM resources"
+        ).fetchone()
+        (self.next_position,) = self.connection.execute(
+            "SELECT COALESCE(MAX(position), 0) + 1 FROM resources"
+        ).fetchone()
+        self.rows: list[tuple] = []
+        self.lookups: list[tuple] = []
+        # id -> (seq, resource) of buffered and referenced resources, holding
+        # the resources keeps their ids from being reused
+        self.identities: dict[int, tuple[int, Any]] = {}
+        # id -> (seq, namespace, resource) of referenced resources not added yet
+        self.unadded: dict[int, tuple[int, str, Any]] = {}
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def take_seq(self) -> int:
+        seq = self.next_seq
+        self.next_seq += 1
+        return seq
+
+    def reference(self, namespace: str, resource: Any) -> int:
+        if id(resource) in self.identities:
+            return self.identities[id(resource)][0]
+        seq = self.take_seq()
+        self.identities[id(resource)] = (seq, resource)
+        self.unadded[id(resource)] = (seq, namespace, resource)
+        return seq
+
+    def add(self, namespace: str, resource: Any) -> None:
+        if id(resource) in self.unadded:
+            seq = self.unadded.pop(id(resource))[0]
+        else:
+            seq = self.take_seq()
+            self.identities[id(resource)] = (seq, resource)
+        self.write(namespace, resource, seq, self.next_position)
+        self.next_position += 1
+
+    def write(self, namespace: str, resource: Any, seq: int, position: int | None):
+        resource_type = type(resource)
+        name = type_name(resource_type)
+
+        ref = None
+        field = REFERENCE_FIELDS.get(resource_type)
+        if field and getattr(resource, field) is not None:
+            ref = self.reference(namespace, getattr(resource, field))
+            resource = copy.copy(resource)
+            setattr(resource, field, None)
+
+        payload = pickle.dumps(resource, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows.append((seq, position, namespace, name, ref, payload))
+        if position is not None:
+            for key in DEFAULT_INDEXES.get(resource_type, ()):
+                value = lookup_value(getattr(resource, key))
+                if not isinstance(value, LOOKUP_TYPES):
+                    value = repr(value)
+                self.lookups.append((namespace, name, key, value, seq))
+
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        self.connection.executemany(
+            "INSERT INTO resources (seq, position, namespace, type, ref, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            self.rows,
+        )
+        self.connection.executemany(
+            "INSERT INTO lookup (namespace, type, key, value, seq) "
+            "VALUES (?, ?, ?, ?, ?)",
+            self.lookups,
+        )
+        self.rows.clear()
+        self.lookups.clear()
+        # written resources are no longer held, later references to them
+        # store a copy instead
+        self.identities = {
+            key: self.identities[key] for key in self.unadded if key in self.identities
+        }
+
+    def commit(self) -> None:
+        # referenced resources that were never added are stored unlisted
+        while self.unadded:
+            key = next(iter(self.unadded))
+            seq, namespace, resource = self.unadded.pop(key)
+            self.write(namespace, resource, seq, None)
+        self.flush()
+        self.connection.commit()
+        self.identities.clear()
+
+    def rollback(self) -> None:
+        self.connection.rollback()
+        self.reset()
+
+    def select(
+        self, namespace: str, resource_type: Type[R] | None, filters: dict[str, Any]
+    ) -> Iterator[R]:
+        self.flush()
+        key = next(
+            (
+                k
+                for k in filters
+                if k in DEFAULT_INDEXES.get(resource_type, ())
+                and isinstance(lookup_value(filters[k]), LOOKUP_TYPES)
+            ),
+            None,
+        )
+        if resource_type is None:
+            cursor = self.connection.execute(
+                "SELECT seq, ref, payload FROM resources "
+                "WHERE namespace = ? AND position IS NOT NULL "
+                "ORDER BY position",
+                (namespace,),
+            )
+        elif key is None:
+            cursor = self.connection.execute(
+                "SELECT seq, ref, payload FROM resources "
+                "WHERE namespace = ? AND type = ? AND position IS NOT NULL "
+                "ORDER BY position",
+                (namespace, type_name(resource_type)),
+            )
+        else:
+            cursor = self.connection.execute(
+                "SELECT r.seq, r.ref, r.payload FROM lookup l "
+                "JOIN resources r ON r.seq = l.seq "
+                "WHERE l.namespace = ? AND l.type = ? AND l.key = ? AND l.value IS ? "
+                "ORDER BY r.position",
+                (namespace, type_name(resource_type), key, lookup_value(filters[key])),
+            )
+
+        # resources are loaded once per selection, so that revisions share
+        # their predecessors like the resources that were added
+        loaded: dict[int, Any] = {}
+        pending = {entry[0]: entry[2] for entry in self.unadded.values()}
+        for seq, ref, payload in cursor:
+            resource = self.load(seq, ref, payload, loaded, pending)
+            if all(getattr(resource, k) == v for k, v in filters.items()):
+                yield resource
+
+    def load(
+        self,
+        seq: int,
+        ref: int | None,
+        payload: bytes,
+        loaded: dict[int, Any],
+        pending: dict[int, Any],
+    ):
+        # pending maps the seq of referenced resources that are not written
+        # yet to the resource itself
+        if seq in loaded:
+            return loaded[seq]
+        resource = loaded[seq] = pickle.loads(payload)
+
+        # follow references iteratively, chains can be arbitrarily long
+        while ref is not None:
+            field = REFERENCE_FIELDS[type(resource)]
+            if ref in loaded or ref in pending:
+                setattr(resource, field, loaded.get(ref, pending.get(ref)))
+                break
+            next_ref, payload = self.connection.execute(
+                "SELECT ref, payload FROM resources WHERE seq = ?", (ref,)
+            ).fetchone()
+            target = loaded[ref] = pickle.loads(payload)
+            setattr(resource, field, target)
+            resource, ref = target, next_ref
+
+        return loaded[seq]
+
+
+class SqliteRepository(AbstractRepository):
+    streamed = True
+
+    def __init__(self, database: SqliteDatabase, namespace: str):
+        super().__init__()
+        self.database = database
+        self.namespace = namespace
+
+    def _add(self, resource: R) -> None:  # type: ignore
+        self.database.add(self.namespace, resource)
+
+    def _get(self, resource_type: Type[R], **filters: Any) -> R | None:
+        return next(self.iter_all(resource_type, **filters), None)
+
+    def _list_all(self, resource_type: Type[R], **filters: Any) -> list[R]:
+        return list(self.iter_all(resource_type, **filters))
+
+    def iter_all(self, resource_type: Type[R], **filters: Any) -> Iterator[R]:
+        # stream resources instead of loading all of them at once
+        yield from self.database.select(self.namespace, resource_type, filters)
+
+    def iter_resources(self) -> Iterator[Any]:
+        # all resources, in insertion order
+        yield from self.database.select(self.namespace, None, {})
+
+    def __eq__(self, other):
+        if isinstance(self, other.__class__):
+            return (
+                self.database.path == other.database.path
+                and self.namespace == other.namespace
+            )
+        return False
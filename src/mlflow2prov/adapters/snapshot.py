@@ -0,0 +1,178 @@
+import datetime
+import mmap
+import os
+import pickle
+import struct
+from collections import deque
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from mlflow2prov.adapters.repository import REFERENCE_FIELDS
+
+# file layout: magic, format version, then length-prefixed pickled records,
+# the first record holds the metadata, every other record one resource
+SNAPSHOT_MAGIC = b"MLF2PROV"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct(">8sH")
+LENGTH = struct.Struct(">I")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def reference(resource: Any) -> Any:
+    field = REFERENCE_FIELDS.get(type(resource))
+    return getattr(resource, field) if field else None
+
+
+def write_record(file: BinaryIO, record: Any) -> None:
+    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    file.write(LENGTH.pack(len(payload)))
+    file.write(payload)
+
+
+def write_resource(
+    file: BinaryIO,
+    location: str,
+    resource: Any,
+    listed: bool,
+    seq: int | None,
+    ref: int | None,
+) -> None:
+    # the referenced resource is stored by sequence number, not pickled along
+    field = REFERENCE_FIELDS.get(type(resource))
+    if field is None:
+        write_record(file, (location, listed, seq, ref, resource))
+        return
+    target = getattr(resource, field)
+    setattr(resource, field, None)
+    try:
+        write_record(file, (location, listed, seq, ref, resource))
+    finally:
+        setattr(resource, field, target)
+
+
+def write_snapshot(
+    path: Path, repositories: Iterable[tuple[str, Iterable[Any]]]
+) -> None:
+    """Write the resources of each location to a snapshot file.
+
+    Every resource is written as one record, a reference to another resource
+    is stored as the sequence number of the referenced record.
+    """
+    repositories = [(location, list(resources)) for location, resources in repositories]
+    listed = {id(r) for _, resources in repositories for r in resources}
+    referenced = {
+        id(reference(r))
+        for _, resources in repositories
+        for r in resources
+        if reference(r) is not None
+    }
+    # id -> sequence number of referenced and unlisted resources
+    seqs: dict[int, int] = {}
+
+    def write(file: BinaryIO, location: str, resource: Any, is_listed: bool):
+        target = reference(resource)
+        ref = seqs.setdefault(id(target), len(seqs)) if target is not None else None
+        seq = None
+        if id(resource) in referenced or not is_listed:
+            seq = seqs.setdefault(id(resource), len(seqs))
+        write_resource(file, location, resource, is_listed, seq, ref)
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION))
+        write_record(
+            file,
+            {
+                "locations": [location for location, _ in repositories],
+                "created_at": datetime.datetime.now(datetime.timezone.utc),
+            },
+        )
+        for location, resources in repositories:
+            for resource in resources:
+                # referenced resources that were never added themselves are
+                # written unlisted, oldest first, before their first reference
+                hidden = []
+                target = reference(resource)
+                while (
+                    target is not None
+                    and id(target) not in listed
+                    and id(target) not in seqs
+                ):
+                    hidden.append(target)
+                    target = reference(target)
+                for target in reversed(hidden):
+                    write(file, location, target, False)
+                write(file, location, resource, True)
+
+
+def iter_records(path: Path) -> Iterator[Any]:
+    # the file is memory-mapped, records are unpickled one at a time
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            raise SnapshotError(f"{path} is not a snapshot")
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with data:
+        magic, version = HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"{path} is not a snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}")
+
+        offset = HEADER.size
+        while offset < len(data):
+            (length,) = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            yield pickle.loads(data[offset : offset + length])
+            offset += length
+
+
+def read_metadata(path: Path) -> dict[str, Any]:
+    records = iter_records(path)
+    try:
+        return next(records)
+    finally:
+        records.close()
+
+
+def read_snapshot(path: Path) -> Iterator[tuple[str, Any]]:
+    """Stream the (location, resource) pairs of a snapshot in written order.
+
+    A resource is only passed on once the resource it references has been
+    read, the resources following it wait as well to keep the order.
+    """
+    records = iter_records(path)
+    next(records)
+
+    # seq -> resource of referenced resources
+    resources: dict[int, Any] = {}
+    # seq -> entries of the resources referencing a resource not read yet
+    waiting: dict[int, list[list[Any]]] = {}
+    # entries [location, resource, listed, unresolved] in written order
+    queue: deque[list[Any]] = deque()
+
+    for location, listed, seq, ref, resource in records:
+        entry = [location, resource, listed, False]
+        if ref is not None:
+            if ref in resources:
+                setattr(resource, REFERENCE_FIELDS[type(resource)], resources[ref])
+            else:
+                entry[3] = True
+                waiting.setdefault(ref, []).append(entry)
+        if seq is not None:
+            resources[seq] = resource
+            for other in waiting.pop(seq, []):
+                setattr(other[1], REFERENCE_FIELDS[type(other[1])], resource)
+                other[3] = False
+        queue.append(entry)
+
+        while queue and not queue[0][3]:
+            location, resource, listed, _ = queue.popleft()
+            if listed:
+                yield location, resource
+
+    if queue:
+        raise SnapshotError(f"{path} references missing resources")
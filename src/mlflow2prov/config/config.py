@@ -51,10 +51,14 @@ class Config:
 
             for name, literal in options.items():
                 if isinstance(literal, bool):
-                    args.append(f"--{name}")
+                    if literal:
+                        args.append(f"--{name}")
                 elif isinstance(literal, str):
                     args.append(f"--{name}")
                     args.append(literal)
+                elif isinstance(literal, int):
+                    args.append(f"--{name}")
+                    args.append(str(literal))
                 elif isinstance(literal, list):
                     for lit in literal:
                         args.append(f"--{name}")
@@ -1,28 +1,70 @@
 from __future__ import annotations
 
+import abc
+import csv
 import datetime
+import functools
 import logging
 import re
+import sys
 import urllib.parse
+from array import array
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
+from typing import IO, Any, ClassVar
 
 import prov.model
 
 from mlflow2prov.domain.constants import ProvType
-from mlflow2prov.utils.prov_utils import document_factory, qualified_name
+from mlflow2prov.utils.prov_utils import element_document, qualified_name
+from mlflow2prov.utils.time_utils import (
+    datetime_to_unix_timestamp,
+    unix_timestamp_to_datetime,
+    unix_timestamps_to_datetimes,
+)
 
 log = logging.getLogger(__name__)
 
+# number of identifiers and derived activities kept by the memoized
+# conversions, models convert the same objects several times in a row
+MEMO_SIZE = 2**16
 
-@dataclass
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def memoized_identifier(kind: str, **fields: str) -> prov.model.QualifiedName:
+    # domain objects are mutable and slotted, identifiers are memoized by
+    # the values they are built from instead of on the objects themselves
+    query = "&".join(
+        f"{key}={urllib.parse.quote_plus(value, safe='')}"
+        for key, value in fields.items()
+    )
+    return qualified_name(f"{kind}?{query}")
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def memoized_activity(
+    activity_type: type[Creation] | type[Deletion],
+    uid: str,
+    resource_type: str,
+    start_time: datetime,
+    end_time: datetime | None,
+) -> Creation | Deletion:
+    return activity_type(
+        uid=uid, resource_type=resource_type, start_time=start_time, end_time=end_time
+    )
+
+
+@dataclass(slots=True)
 class User:
     name: str
     email: str
     username: str = ""
     prov_role: str | None = None
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_AGENT
+
     def __post_init__(self):
         self.email = self.email.lower()
 
@@ -39,13 +81,10 @@ class User:
 
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-        email = urllib.parse.quote_plus(self.email, safe="", encoding=None, errors=None)
-
-        return qualified_name(f"User?name={name}&email={email}")
+        return memoized_identifier("User", name=self.name, email=self.email)
 
-    def to_prov(self) -> prov.model.ProvAgent:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("email", self.email),
             ("username", self.username),
@@ -53,77 +92,73 @@ class User:
             (prov.model.PROV_TYPE, ProvType.USER),
         ]
 
+    def to_prov(self) -> prov.model.ProvAgent:
         return prov.model.ProvAgent(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class File:
     name: str
     path: str
     commit: str
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-        path = urllib.parse.quote_plus(self.path, safe="", encoding=None, errors=None)
-        commit = urllib.parse.quote_plus(
-            self.commit, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "File", name=self.name, path=self.path, commit=self.commit
         )
 
-        return qualified_name(f"File?name={name}&path={path}&commit={commit}")
-
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("path", self.path),
             ("commit", self.commit),
             (prov.model.PROV_TYPE, ProvType.FILE),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class FileRevision(File):
     status: str
     file: File | None = None
     previous: FileRevision | None = None
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-        path = urllib.parse.quote_plus(self.path, safe="", encoding=None, errors=None)
-        commit = urllib.parse.quote_plus(
-            self.commit, safe="", encoding=None, errors=None
-        )
-        status = urllib.parse.quote_plus(
-            self.status, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "FileRevision",
+            name=self.name,
+            path=self.path,
+            commit=self.commit,
+            status=self.status,
         )
 
-        return qualified_name(
-            f"FileRevision?name={name}&path={path}&commit={commit}&status={status}"
-        )
-
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("path", self.path),
             ("status", self.status),
             (prov.model.PROV_TYPE, ProvType.FILE_REVISION),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(),
-            self.prov_identifier,
-            prov_attributes,
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Commit:
     sha: str
     title: str
@@ -134,14 +169,14 @@ class Commit:
     authored_at: datetime
     committed_at: datetime
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ACTIVITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        sha = urllib.parse.quote_plus(self.sha, safe="", encoding=None, errors=None)
-
-        return qualified_name(f"Commit?sha={sha}")
+        return memoized_identifier("Commit", sha=self.sha)
 
-    def to_prov(self) -> prov.model.ProvActivity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("sha", self.sha),
             ("title", self.title),
             ("message", self.message),
@@ -152,12 +187,13 @@ class Commit:
             (prov.model.PROV_TYPE, ProvType.COMMIT),
         ]
 
+    def to_prov(self) -> prov.model.ProvActivity:
         return prov.model.ProvActivity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Creation:
     uid: str
     resource_type: str
@@ -166,30 +202,31 @@ class Creation:
         None  # also allow None, because a run may be still running
     )
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ACTIVITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        uid = urllib.parse.quote_plus(self.uid, safe="", encoding=None, errors=None)
-        resource_type = urllib.parse.quote_plus(
-            self.resource_type, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "Creation", uid=self.uid, resource_type=self.resource_type
         )
 
-        return qualified_name(f"Creation?uid={uid}&resource_type={resource_type}")
-
-    def to_prov(self) -> prov.model.ProvActivity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("uid", self.uid),
             (prov.model.PROV_ATTR_STARTTIME, self.start_time),
             (prov.model.PROV_ATTR_ENDTIME, self.end_time) if self.end_time else None,
             (prov.model.PROV_TYPE, ProvType.CREATION),
         ]
 
+    def to_prov(self) -> prov.model.ProvActivity:
         return prov.model.ProvActivity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
     @classmethod
     def from_experiment(cls, experiment: Experiment) -> Creation:
-        return cls(
+        return memoized_activity(
+            cls,
             uid=experiment.experiment_id,
             resource_type=ProvType.EXPERIMENT,
             start_time=experiment.created_at,
@@ -198,7 +235,8 @@ class Creation:
 
     @classmethod
     def from_run(cls, run: Run) -> Creation:
-        return cls(
+        return memoized_activity(
+            cls,
             uid=run.run_id,
             resource_type=ProvType.RUN,
             start_time=run.start_time,
@@ -207,7 +245,8 @@ class Creation:
 
     @classmethod
     def from_registered_model(cls, registered_model: RegisteredModel) -> Creation:
-        return cls(
+        return memoized_activity(
+            cls,
             uid=registered_model.name,
             resource_type=ProvType.REGISTERED_MODEL,
             start_time=registered_model.created_at,
@@ -220,7 +259,8 @@ class Creation:
     def from_registered_model_version(
         cls, registered_model_version: RegisteredModelVersion
     ) -> Creation:
-        return cls(
+        return memoized_activity(
+            cls,
             uid=f"{registered_model_version.name}-version-{registered_model_version.version}",
             resource_type=ProvType.REGISTERED_MODEL_VERSION,
             start_time=registered_model_version.created_at,
@@ -230,37 +270,38 @@ class Creation:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Deletion:
     uid: str
     resource_type: str
     start_time: datetime
     end_time: datetime | None  # also allow None, because a run may be still running
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ACTIVITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        uid = urllib.parse.quote_plus(self.uid, safe="", encoding=None, errors=None)
-        resource_type = urllib.parse.quote_plus(
-            self.resource_type, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "Deletion", uid=self.uid, resource_type=self.resource_type
         )
 
-        return qualified_name(f"Deletion?uid={uid}&resource_type={resource_type}")
-
-    def to_prov(self) -> prov.model.ProvActivity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("uid", self.uid),
             (prov.model.PROV_ATTR_STARTTIME, self.start_time),
             (prov.model.PROV_ATTR_ENDTIME, self.end_time),
             (prov.model.PROV_TYPE, ProvType.DELETION),
         ]
 
+    def to_prov(self) -> prov.model.ProvActivity:
         return prov.model.ProvActivity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
     @classmethod
     def from_experiment(cls, experiment: Experiment) -> Deletion:
-        return cls(
+        return memoized_activity(
+            cls,
             uid=experiment.experiment_id,
             resource_type=ProvType.EXPERIMENT,
             start_time=experiment.last_updated,
@@ -269,7 +310,8 @@ class Deletion:
 
     @classmethod
     def from_run(cls, run: Run) -> Deletion:
-        return cls(
+        return memoized_activity(
+            cls,
             uid=run.run_id,
             resource_type=ProvType.RUN,
             start_time=run.end_time if run.end_time else run.start_time,
@@ -280,7 +322,8 @@ class Deletion:
     def from_registered_model_version(
         cls, registered_model_version: RegisteredModelVersion
     ) -> Deletion:
-        return cls(
+        return memoized_activity(
+            cls,
             uid=f"{registered_model_version.name}-version-{registered_model_version.version}",
             resource_type=ProvType.REGISTERED_MODEL_VERSION,
             start_time=registered_model_version.last_updated_at,
@@ -288,7 +331,7 @@ class Deletion:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Experiment:
     experiment_id: str
     name: str
@@ -299,14 +342,13 @@ class Experiment:
     created_at: datetime
     last_updated: datetime
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        experiment_id = urllib.parse.quote_plus(
-            self.experiment_id, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "Experiment", experiment_id=self.experiment_id, name=self.name
         )
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-
-        return qualified_name(f"Experiment?experiment_id={experiment_id}&name={name}")
 
     @property
     def creation(self) -> Creation:
@@ -316,8 +358,8 @@ class Experiment:
     def deletion(self) -> Deletion:
         return Deletion.from_experiment(self)
 
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("experiment_id", self.experiment_id),
             ("name", self.name),
             ("artifact_location", self.artifact_location),
@@ -326,12 +368,79 @@ class Experiment:
             (prov.model.PROV_TYPE, ProvType.COLLECTION),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+# run fields that a loader may populate on first access
+LAZY_RUN_FIELDS = ("metrics", "params", "tags", "artifacts", "model_artifacts")
+
+
+class AbstractRunLoader(abc.ABC):
+    @abc.abstractmethod
+    def load(self, run_id: str, name: str) -> Any:
+        """Return the value of the run field `name` of the run `run_id`."""
+        raise NotImplementedError
+
+
+def loaded(value: Any) -> Any:
+    return value
+
+
+class LazyField:
+    """Run field that is populated by a loader on first access.
+
+    The field behaves like the sequence it stands for. Pickling a lazy field
+    loads it and stores the loaded value instead.
+    """
+
+    __slots__ = ("loader", "run_id", "name", "value")
+
+    def __init__(self, loader: AbstractRunLoader, run_id: str, name: str):
+        self.loader: AbstractRunLoader | None = loader
+        self.run_id = run_id
+        self.name = name
+        self.value: Any = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loader is None
+
+    def get(self) -> Any:
+        if self.loader is not None:
+            self.value = self.loader.load(self.run_id, self.name)
+            self.loader = None
+        return self.value
+
+    def __bool__(self) -> bool:
+        return bool(self.get())
+
+    def __len__(self) -> int:
+        return len(self.get() or ())
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.get() or ())
+
+    def __getitem__(self, index: int) -> Any:
+        return (self.get() or [])[index]
+
+    def __eq__(self, other):
+        if isinstance(other, LazyField):
+            other = other.get()
+        return self.get() == other
+
+    def __reduce__(self):
+        return loaded, (self.get(),)
+
+    def __repr__(self) -> str:
+        if self.loader is None:
+            return repr(self.value)
+        return f"LazyField(run_id={self.run_id!r}, name={self.name!r})"
+
+
+@dataclass(slots=True)
 class Run:
     run_id: str
     name: str
@@ -342,11 +451,11 @@ class Run:
     end_time: datetime | None
     lifecycle_stage: LifecycleStage | None
     artifact_uri: str | None
-    metrics: list[Metric] | None
-    params: list[Param] | None
-    tags: list[RunTag] | None
-    artifacts: list[Artifact] | None
-    model_artifacts: list[ModelArtifact] | None
+    metrics: list[Metric] | MetricStore | LazyField | None
+    params: list[Param] | LazyField | None
+    tags: list[RunTag] | LazyField | None
+    artifacts: list[Artifact] | LazyField | None
+    model_artifacts: list[ModelArtifact] | LazyField | None
     note: str | None
     source_type: SourceType | None
     source_name: str | None
@@ -354,14 +463,11 @@ class Run:
     source_git_branch: str | None
     source_git_repo_url: str | None
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        run_id = urllib.parse.quote_plus(
-            self.run_id, safe="", encoding=None, errors=None
-        )
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-
-        return qualified_name(f"Run?run_id={run_id}&name={name}")
+        return memoized_identifier("Run", run_id=self.run_id, name=self.name)
 
     @property
     def creation(self) -> Creation:
@@ -371,8 +477,8 @@ class Run:
     def deletion(self) -> Deletion:
         return Deletion.from_run(self)
 
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("run_id", self.run_id),
             ("name", self.name),
             ("status", RunStatus.to_string(self.status)),
@@ -385,12 +491,13 @@ class Run:
             (prov.model.PROV_TYPE, ProvType.COLLECTION),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Metric:
     run_id: str
     name: str
@@ -398,20 +505,16 @@ class Metric:
     timestamp: datetime
     step: int
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        run_id = urllib.parse.quote_plus(
-            self.run_id, safe="", encoding=None, errors=None
-        )
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-        step = urllib.parse.quote_plus(
-            str(self.step), safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "Metric", run_id=self.run_id, name=self.name, step=str(self.step)
         )
 
-        return qualified_name(f"Metric?run_id={run_id}&name={name}&step={step}")
-
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("value", self.value),
             ("timestamp", self.timestamp),
@@ -419,94 +522,339 @@ class Metric:
             (prov.model.PROV_TYPE, ProvType.METRIC),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
-class Param:
+@dataclass(slots=True)
+class MetricSummary:
     run_id: str
     name: str
-    value: str
+    count: int
+    min: float
+    max: float
+    last: float
+    first_step: int
+    last_step: int
+    # file holding the summarized series, if it is written
+    series: str | None = None
+
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
 
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        run_id = urllib.parse.quote_plus(
-            self.run_id, safe="", encoding=None, errors=None
-        )
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
+        return memoized_identifier("Metric", run_id=self.run_id, name=self.name)
 
-        return qualified_name(f"Param?run_id={run_id}&name={name}")
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
+            ("name", self.name),
+            ("count", self.count),
+            ("min", self.min),
+            ("max", self.max),
+            ("last", self.last),
+            ("first_step", self.first_step),
+            ("last_step", self.last_step),
+            ("series", self.series) if self.series else None,
+            (prov.model.PROV_TYPE, ProvType.METRIC),
+        ]
 
     def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+        return prov.model.ProvEntity(
+            element_document(), self.prov_identifier, self.prov_attributes()
+        )
+
+
+class MetricStore:
+    """Columnar metric history of a run.
+
+    Metric points are kept in typed arrays, one entry per point: the code of
+    the metric name, the value, the step and the timestamp in milliseconds as
+    reported by the tracking server. Iterating the store yields `Metric`
+    objects that are created on access.
+    """
+
+    __slots__ = (
+        "run_id",
+        "names",
+        "name_codes",
+        "codes",
+        "values",
+        "steps",
+        "timestamps",
+    )
+
+    def __init__(self, run_id: str, names: Iterable[str] = ()):
+        self.run_id = run_id
+        self.names: list[str] = [sys.intern(name) for name in names]
+        # name -> code, the position of the name in names
+        self.name_codes: dict[str, int] = {}
+        for code, name in enumerate(self.names):
+            self.name_codes.setdefault(name, code)
+        self.codes = array("I")
+        self.values = array("d")
+        self.steps = array("q")
+        self.timestamps = array("q")
+
+    @classmethod
+    def from_points(
+        cls, run_id: str, points: Iterable[tuple[str, float, int, int]]
+    ) -> MetricStore:
+        store = cls(run_id)
+        for name, value, timestamp, step in points:
+            store.append(name, value, timestamp, step)
+        return store
+
+    @classmethod
+    def from_metrics(cls, run_id: str, metrics: Iterable[Metric]) -> MetricStore:
+        return cls.from_points(
+            run_id,
+            (
+                (
+                    metric.name,
+                    metric.value,
+                    datetime_to_unix_timestamp(metric.timestamp),
+                    metric.step,
+                )
+                for metric in metrics
+            ),
+        )
+
+    def code(self, name: str) -> int:
+        code = self.name_codes.get(name)
+        if code is None:
+            code = self.name_codes[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return code
+
+    def append(self, name: str, value: float, timestamp: int, step: int) -> None:
+        self.codes.append(self.code(name))
+        self.values.append(value)
+        self.steps.append(step)
+        self.timestamps.append(timestamp or 0)
+
+    def metric(self, index: int) -> Metric:
+        return Metric(
+            run_id=self.run_id,
+            name=self.names[self.codes[index]],
+            value=self.values[index],
+            timestamp=unix_timestamp_to_datetime(self.timestamps[index]),
+            step=self.steps[index],
+        )
+
+    def last_indexes(self) -> dict[int, int]:
+        """Return the index of the latest step, then timestamp, per name code."""
+        latest: dict[int, tuple[int, int, int]] = {}
+        for index, (code, step, timestamp) in enumerate(
+            zip(self.codes, self.steps, self.timestamps)
+        ):
+            key = (step, timestamp, index)
+            if code not in latest or key > latest[code]:
+                latest[code] = key
+        return {code: index for code, (_, _, index) in sorted(latest.items())}
+
+    def last_values(self) -> dict[str, float]:
+        """Return the value of the latest step, then timestamp, per metric name."""
+        return {
+            self.names[code]: self.values[index]
+            for code, index in self.last_indexes().items()
+        }
+
+    def last_metrics(self) -> list[Metric]:
+        """Return the point of the latest step, then timestamp, per metric name."""
+        return [self.metric(index) for index in self.last_indexes().values()]
+
+    def summaries(self, series: str | None = None) -> list[MetricSummary]:
+        """Return count, extrema, last value and step range per metric name.
+
+        The columns are read in a single pass, no `Metric` is created.
+        """
+        counts: dict[int, int] = {}
+        minima: dict[int, float] = {}
+        maxima: dict[int, float] = {}
+        first_steps: dict[int, int] = {}
+        for code, value, step in zip(self.codes, self.values, self.steps):
+            if code in counts:
+                counts[code] += 1
+                minima[code] = min(minima[code], value)
+                maxima[code] = max(maxima[code], value)
+                first_steps[code] = min(first_steps[code], step)
+            else:
+                counts[code] = 1
+                minima[code] = maxima[code] = value
+                first_steps[code] = step
+
+        return [
+            MetricSummary(
+                run_id=self.run_id,
+                name=self.names[code],
+                count=counts[code],
+                min=minima[code],
+                max=maxima[code],
+                last=self.values[index],
+                first_step=first_steps[code],
+                last_step=self.steps[index],
+                series=series,
+            )
+            for code, index in self.last_indexes().items()
+        ]
+
+    def write_csv(self, fp: IO[str]) -> None:
+        """Write the points as CSV rows of name, step, timestamp and value."""
+        writer = csv.writer(fp)
+        writer.writerow(("name", "step", "timestamp", "value"))
+        writer.writerows(
+            zip(
+                (self.names[code] for code in self.codes),
+                self.steps,
+                self.timestamps,
+                self.values,
+            )
+        )
+
+    def downsample(self, max_points: int) -> MetricStore:
+        """Return a store with at most `max_points` evenly spaced points per name.
+
+        The first and the last point of every metric are always kept.
+        """
+        if max_points < 1:
+            raise ValueError("max_points must be at least 1")
+
+        positions: dict[int, list[int]] = {}
+        for index, code in enumerate(self.codes):
+            positions.setdefault(code, []).append(index)
+
+        kept = []
+        for indexes in positions.values():
+            if len(indexes) <= max_points:
+                kept += indexes
+            elif max_points == 1:
+                kept.append(indexes[-1])
+            else:
+                stride = (len(indexes) - 1) / (max_points - 1)
+                kept += [indexes[round(n * stride)] for n in range(max_points)]
+        kept.sort()
+
+        store = MetricStore(self.run_id, self.names)
+        store.codes.extend(self.codes[index] for index in kept)
+        store.values.extend(self.values[index] for index in kept)
+        store.steps.extend(self.steps[index] for index in kept)
+        store.timestamps.extend(self.timestamps[index] for index in kept)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> Metric:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("metric index out of range")
+        return self.metric(index)
+
+    def __iter__(self) -> Iterator[Metric]:
+        # timestamps are converted for all points at once
+        for index, timestamp in enumerate(self.datetimes()):
+            yield Metric(
+                run_id=self.run_id,
+                name=self.names[self.codes[index]],
+                value=self.values[index],
+                timestamp=timestamp,
+                step=self.steps[index],
+            )
+
+    def datetimes(self) -> list[datetime]:
+        return unix_timestamps_to_datetimes(self.timestamps)
+
+    def __eq__(self, other):
+        if isinstance(other, MetricStore):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MetricStore(run_id={self.run_id!r}, points={len(self)})"
+
+
+@dataclass(slots=True)
+class Param:
+    run_id: str
+    name: str
+    value: str
+
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
+    @property
+    def prov_identifier(self) -> prov.model.QualifiedName:
+        return memoized_identifier("Param", run_id=self.run_id, name=self.name)
+
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("value", self.value),
             (prov.model.PROV_TYPE, ProvType.PARAM),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Artifact:
     run_id: str
     path: str
     is_dir: bool
     file_size: int  # in bytes
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        run_id = urllib.parse.quote_plus(
-            self.run_id, safe="", encoding=None, errors=None
-        )
-        path = urllib.parse.quote_plus(self.path, safe="", encoding=None, errors=None)
-
-        return qualified_name(f"Artifact?run_id={run_id}&path={path}")
+        return memoized_identifier("Artifact", run_id=self.run_id, path=self.path)
 
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("path", self.path),
             ("is_dir", self.is_dir),
             ("file_size", self.file_size),
             (prov.model.PROV_TYPE, ProvType.ARTIFACT),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelArtifact(Artifact):
     artifact: Artifact | None = None
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        run_id = urllib.parse.quote_plus(
-            self.run_id, safe="", encoding=None, errors=None
-        )
-        path = urllib.parse.quote_plus(self.path, safe="", encoding=None, errors=None)
-
-        return qualified_name(f"ModelArtifact?run_id={run_id}&path={path}")
+        return memoized_identifier("ModelArtifact", run_id=self.run_id, path=self.path)
 
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("path", self.path),
             ("is_dir", self.is_dir),
             ("file_size", self.file_size),
             (prov.model.PROV_TYPE, ProvType.MODEL_ARTIFACT),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class RegisteredModel:
     name: str
     created_at: datetime
@@ -516,18 +864,18 @@ class RegisteredModel:
     versions: list[RegisteredModelVersion]
     tags: list[RegisteredModelTag]
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-
-        return qualified_name(f"RegisteredModel?name={name}")
+        return memoized_identifier("RegisteredModel", name=self.name)
 
     @property
     def creation(self) -> Creation:
         return Creation.from_registered_model(self)
 
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("created_at", self.created_at),
             ("last_updated_at", self.last_updated_at),
@@ -536,12 +884,13 @@ class RegisteredModel:
             (prov.model.PROV_TYPE, ProvType.COLLECTION),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class RegisteredModelVersion:
     name: str
     version: str
@@ -557,15 +906,14 @@ class RegisteredModelVersion:
     tags: list[RegisteredModelVersionTag] | None
     run_link: str | None
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-        version = urllib.parse.quote_plus(
-            self.version, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "RegisteredModelVersion", name=self.name, version=self.version
         )
 
-        return qualified_name(f"RegisteredModelVersion?name={name}&version={version}")
-
     @property
     def creation(self) -> Creation:
         return Creation.from_registered_model_version(self)
@@ -574,8 +922,8 @@ class RegisteredModelVersion:
     def deletion(self) -> Deletion:
         return Deletion.from_registered_model_version(self)
 
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("version", self.version),
             ("created_at", self.created_at),
@@ -597,124 +945,119 @@ class RegisteredModelVersion:
             (prov.model.PROV_TYPE, ProvType.COLLECTION),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Tag:
     name: str
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ExperimentTag(Tag):
     experiment_id: str
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
-        experiment_id = urllib.parse.quote_plus(
-            self.experiment_id, safe="", encoding=None, errors=None
-        )
-
-        return qualified_name(
-            f"ExperimentTag?experiment_id={experiment_id}&name={name}"
+        return memoized_identifier(
+            "ExperimentTag", experiment_id=self.experiment_id, name=self.name
         )
 
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("value", self.value),
             (prov.model.PROV_TYPE, ProvType.EXPERIMENT_TAG),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class RunTag(Tag):
     run_id: str
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        run_id = urllib.parse.quote_plus(
-            self.run_id, safe="", encoding=None, errors=None
-        )
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
+        return memoized_identifier("RunTag", run_id=self.run_id, name=self.name)
 
-        return qualified_name(f"RunTag?run_id={run_id}&name={name}")
-
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("value", self.value),
             (prov.model.PROV_TYPE, ProvType.RUN_TAG),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class RegisteredModelTag(Tag):
     registered_model_name: str
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        registered_model_name = urllib.parse.quote_plus(
-            self.registered_model_name, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "RegisteredModelTag",
+            registered_model_name=self.registered_model_name,
+            name=self.name,
         )
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
 
-        return qualified_name(
-            f"RegisteredModelTag?registered_model_name={registered_model_name}&name={name}"
-        )
-
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("value", self.value),
             (prov.model.PROV_TYPE, ProvType.REGISTERED_MODEL_TAG),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class RegisteredModelVersionTag(Tag):
     registered_model_name: str
     registered_model_version: str
 
+    prov_type: ClassVar[prov.model.QualifiedName] = prov.model.PROV_ENTITY
+
     @property
     def prov_identifier(self) -> prov.model.QualifiedName:
-        registered_model_name = urllib.parse.quote_plus(
-            self.registered_model_name, safe="", encoding=None, errors=None
-        )
-        registered_model_version = urllib.parse.quote_plus(
-            self.registered_model_version, safe="", encoding=None, errors=None
+        return memoized_identifier(
+            "RegisteredModelVersionTag",
+            registered_model_name=self.registered_model_name,
+            registered_model_version=self.registered_model_version,
+            name=self.name,
         )
-        name = urllib.parse.quote_plus(self.name, safe="", encoding=None, errors=None)
 
-        return qualified_name(
-            f"RegisteredModelVersionTag?registered_model_name={registered_model_name}&registered_model_version={registered_model_version}&name={name}"
-        )
-
-    def to_prov(self) -> prov.model.ProvEntity:
-        prov_attributes = [
+    def prov_attributes(self) -> list[tuple[Any, Any] | None]:
+        return [
             ("name", self.name),
             ("value", self.value),
             (prov.model.PROV_TYPE, ProvType.REGISTERED_MODEL_VERSION_TAG),
         ]
 
+    def to_prov(self) -> prov.model.ProvEntity:
         return prov.model.ProvEntity(
-            document_factory(), self.prov_identifier, prov_attributes
+            element_document(), self.prov_identifier, self.prov_attributes()
         )
 
 
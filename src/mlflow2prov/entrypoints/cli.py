@@ -5,15 +5,23 @@ import click
 import prov.model
 
 from mlflow2prov import __version__
+from mlflow2prov.adapters.git.cache import DEFAULT_MAX_ENTRIES, GitObjectCache
+from mlflow2prov.adapters.git.fetcher import HistoryWindow
+from mlflow2prov.adapters.snapshot import SnapshotError
 from mlflow2prov.config.config import Config
 from mlflow2prov.dependencies import Dependencies
+from mlflow2prov.domain.model import Run
 from mlflow2prov.log import create_logger
+from mlflow2prov.prov.cache import DEFAULT_MAX_FRAGMENTS, FragmentCache
+from mlflow2prov.prov.model import MODEL_NAMES, MetricGranularity
 from mlflow2prov.prov.operations import (
     SerializationFormat,
     StatisticsFormat,
     StatisticsResolution,
 )
+from mlflow2prov.prov.query import GIT, MLFLOW
 from mlflow2prov.service_layer import services
+from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork, SqliteUnitOfWork
 
 
 def enable_logging(ctx: click.Context, _, enable: bool):
@@ -127,7 +135,8 @@ def cli(ctx: click.Context):
 
 
 @cli.result_callback()
-def process_commands(processors):
+@click.pass_obj
+def process_commands(deps: Dependencies, processors):
     """Execute the chain of commands.
 
     This function is called after all subcommands have been chained together. It executes the chain of commands by piping the output of one command into the input of the next command. Subcommands can be processors that transform the stream of values or generators that add new values to the stream.
@@ -140,47 +149,415 @@ def process_commands(processors):
     for processor in processors:
         it = processor(it)
 
-    # Evaluate stream and throw away items
-    for _ in it:
-        pass
+    # Evaluate stream and throw away items, the unit of work is closed
+    # when the chain ends, also if a command fails
+    try:
+        for _ in it:
+            pass
+    finally:
+        deps.uow.close()
 
 
 @cli.command("extract")
 @click.option(
     "--repository_path",
-    "repository_path",
+    "repository_paths",
     type=click.Path(exists=True, dir_okay=True, path_type=pathlib.Path),
-    required=True,
-    help="Git repository path.",
+    multiple=True,
+    help="Git repository path, can be given multiple times.",
 )
 @click.option(
     "--mlflow_url",
     "mlflow_url",
     type=str,
-    required=True,
+    default=None,
     help="MLflow tracking server URL.",
 )
+@click.option(
+    "--run_relevant_only",
+    is_flag=True,
+    help="Only extract commits and files referenced by MLflow runs.",
+)
+@click.option(
+    "--lazy_runs",
+    is_flag=True,
+    help="Load metrics, params, tags and artifacts of runs on first access.",
+)
+@click.option(
+    "--run_batch_size",
+    "run_batch_size",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of runs whose lazy fields are loaded together.",
+)
+@click.option(
+    "--since",
+    "since",
+    type=str,
+    default=None,
+    help="Only extract commits more recent than the given date.",
+)
+@click.option(
+    "--until",
+    "until",
+    type=str,
+    default=None,
+    help="Only extract commits older than the given date.",
+)
+@click.option(
+    "--max_count",
+    "max_count",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Maximum number of commits to extract.",
+)
+@click.option(
+    "--ref",
+    "refs",
+    multiple=True,
+    type=str,
+    help="Git ref to extract the history of (defaults to all refs).",
+)
+@click.option(
+    "--git_cache",
+    "git_cache",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="SQLite file caching parsed Git commits and diffs across runs.",
+)
+@click.option(
+    "--git_cache_max_entries",
+    "git_cache_max_entries",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_ENTRIES,
+    show_default=True,
+    help="Maximum number of commits and diffs kept in the Git cache.",
+)
+@click.option(
+    "--stream_logs",
+    is_flag=True,
+    help="Stream the Git log of each file instead of reading it at once.",
+)
+@click.option(
+    "--write_commit_graph",
+    is_flag=True,
+    help="Write a Git commit-graph file to speed up history walks if missing.",
+)
+@click.option(
+    "--follow_submodules",
+    is_flag=True,
+    help="Also extract the submodules of each Git repository.",
+)
+@click.option(
+    "--git_workers",
+    "git_workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes extracting Git repositories in parallel.",
+)
+@click.option(
+    "--model",
+    "models",
+    multiple=True,
+    type=click.Choice(MODEL_NAMES),
+    help="PROV model to build (defaults to all models), "
+    "resources no selected model needs are not fetched.",
+)
+@click.option(
+    "--compile_workers",
+    "compile_workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes building the PROV graph in parallel.",
+)
+@click.option(
+    "--fragment_cache",
+    "fragment_cache",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="SQLite file caching the PROV records of model instances across runs.",
+)
+@click.option(
+    "--fragment_cache_max_entries",
+    "fragment_cache_max_entries",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_FRAGMENTS,
+    show_default=True,
+    help="Maximum number of model instances kept in the fragment cache.",
+)
+@click.option(
+    "--metric_granularity",
+    "metric_granularity",
+    default=str(MetricGranularity.PER_STEP),
+    type=click.Choice(MetricGranularity.values()),
+    show_default=True,
+    help="Metric entities of a run: one per step, one per metric for its last "
+    "step or one per metric summarizing its steps.",
+)
+@click.option(
+    "--metric_series",
+    "metric_series",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="Directory to write the summarized metric series of each run to.",
+)
+@click.option(
+    "--database",
+    "database",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="SQLite file to store extracted resources in instead of memory.",
+)
+@click.option(
+    "--to_snapshot",
+    "to_snapshot",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="Save the extracted resources to a snapshot file.",
+)
+@click.option(
+    "--from_snapshot",
+    "from_snapshot",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="Load the resources from a snapshot file instead of extracting them.",
+)
+@click.option(
+    "--from_graph",
+    "from_graph",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="Update a previously extracted document instead of building it anew.",
+)
+@click.option(
+    "--previous_snapshot",
+    "previous_snapshot",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="Snapshot of the resources the document to update was built from.",
+)
+@click.option(
+    "--stream_to",
+    "stream_to",
+    type=str,
+    default=None,
+    help="Write the document to a file while it is built instead of passing it on "
+    "(specify '-' to write to <stdout>).",
+)
+@click.option(
+    "--stream_format",
+    "stream_format",
+    default=str(SerializationFormat.JSON),
+    type=click.Choice([str(SerializationFormat.JSON), str(SerializationFormat.PROVN)]),
+    show_default=True,
+    help="Serialization format of the streamed document.",
+)
 @click.pass_obj
 @generator
-def extract(deps: Dependencies, repository_path: pathlib.Path, mlflow_url: str):
+def extract(
+    deps: Dependencies,
+    repository_paths: tuple[pathlib.Path, ...] = (),
+    mlflow_url: str | None = None,
+    run_relevant_only: bool = False,
+    lazy_runs: bool = False,
+    run_batch_size: int = 1,
+    since: str | None = None,
+    until: str | None = None,
+    max_count: int | None = None,
+    refs: list[str] | None = None,
+    git_cache: pathlib.Path | None = None,
+    git_cache_max_entries: int = DEFAULT_MAX_ENTRIES,
+    stream_logs: bool = False,
+    write_commit_graph: bool = False,
+    follow_submodules: bool = False,
+    git_workers: int | None = None,
+    models: tuple[str, ...] = (),
+    compile_workers: int = 1,
+    fragment_cache: pathlib.Path | None = None,
+    fragment_cache_max_entries: int = DEFAULT_MAX_FRAGMENTS,
+    metric_granularity: str = str(MetricGranularity.PER_STEP),
+    metric_series: pathlib.Path | None = None,
+    database: pathlib.Path | None = None,
+    to_snapshot: pathlib.Path | None = None,
+    from_snapshot: pathlib.Path | None = None,
+    from_graph: pathlib.Path | None = None,
+    previous_snapshot: pathlib.Path | None = None,
+    stream_to: str | None = None,
+    stream_format: str = str(SerializationFormat.JSON),
+):
     """
     Extract a provenance document from an ML experiment project based on its Git repository and MLflow tracking server.
     """
 
-    services.fetch_git_from_path(
-        path=repository_path, uow=deps.uow, git_fetcher=deps.git_fetcher
-    )
-    services.fetch_mlflow(
-        url=mlflow_url, uow=deps.uow, mlflow_fetcher=deps.mlflow_fetcher
-    )
+    if fragment_cache and compile_workers > 1:
+        raise click.UsageError(
+            "--fragment_cache cannot be combined with --compile_workers."
+        )
+    if stream_to and compile_workers > 1:
+        raise click.UsageError("--stream_to cannot be combined with --compile_workers.")
+    if bool(from_graph) != bool(previous_snapshot):
+        raise click.UsageError(
+            "--from_graph and --previous_snapshot must be given together."
+        )
+    if from_graph and (stream_to or compile_workers > 1):
+        raise click.UsageError(
+            "--from_graph cannot be combined with --stream_to or --compile_workers."
+        )
+    granularity = MetricGranularity.from_string(metric_granularity)
+    if metric_series:
+        if granularity != MetricGranularity.SUMMARY:
+            raise click.BadParameter(
+                "Metric series are only written for summaries.",
+                param_hint="--metric_series",
+            )
+        metric_series.mkdir(parents=True, exist_ok=True)
+
+    # chained extract commands writing to the same database share it
+    if database and not (
+        isinstance(deps.uow, SqliteUnitOfWork) and deps.uow.path == database
+    ):
+        if database.exists():
+            raise click.BadParameter(
+                f"{database} already exists.", param_hint="--database"
+            )
+        # commands earlier in the chain are done with their unit of work
+        deps.uow.close()
+        deps.uow = SqliteUnitOfWork(database)
+    if from_snapshot:
+        if repository_paths or mlflow_url:
+            raise click.UsageError(
+                "--from_snapshot cannot be combined with "
+                "--repository_path or --mlflow_url."
+            )
+        try:
+            locations = services.load_snapshot(path=from_snapshot, uow=deps.uow)
+        except SnapshotError as err:
+            raise click.BadParameter(str(err), param_hint="--from_snapshot")
+    elif not repository_paths or not mlflow_url:
+        raise click.UsageError(
+            "Missing option --repository_path and --mlflow_url or --from_snapshot."
+        )
+    else:
+        deps.git_fetcher.window = HistoryWindow(
+            since=since,
+            until=until,
+            max_count=max_count,
+            refs=list(refs) if refs else None,
+        )
+        deps.git_fetcher.stream_logs = stream_logs
+        deps.git_fetcher.generate_commit_graph = write_commit_graph
+        deps.git_fetcher.follow_submodules = follow_submodules
+        deps.git_fetcher.workers = git_workers
+        deps.mlflow_fetcher.lazy = lazy_runs
+        deps.mlflow_fetcher.batch_size = run_batch_size
+        if models:
+            deps.git_fetcher.resource_types = services.required_resource_types(
+                list(models), GIT
+            )
+            deps.mlflow_fetcher.resource_types = services.required_resource_types(
+                list(models), MLFLOW
+            )
+            # restricting git to the runs needs the runs
+            if run_relevant_only:
+                deps.mlflow_fetcher.resource_types.add(Run)
 
-    doc = services.compile_graph(
-        uow=deps.uow, locations=[str(repository_path), mlflow_url]
+        services.fetch_mlflow(
+            url=mlflow_url, uow=deps.uow, mlflow_fetcher=deps.mlflow_fetcher
+        )
+        if run_relevant_only:
+            services.restrict_git_to_runs(
+                url=mlflow_url, uow=deps.uow, git_fetcher=deps.git_fetcher
+            )
+        # caches are closed on errors as well, closing flushes and evicts
+        object_cache = (
+            GitObjectCache(path=git_cache, max_entries=git_cache_max_entries)
+            if git_cache
+            else None
+        )
+        deps.git_fetcher.cache = object_cache
+        try:
+            git_locations = services.fetch_git_from_paths(
+                paths=list(repository_paths),
+                uow=deps.uow,
+                git_fetcher=deps.git_fetcher,
+            )
+        finally:
+            deps.git_fetcher.cache = None
+            if object_cache:
+                object_cache.close()
+        if object_cache:
+            click.echo(f"Git cache: {object_cache.statistics}", err=True)
+        locations = [*git_locations, mlflow_url]
+
+    if to_snapshot:
+        services.save_snapshot(path=to_snapshot, uow=deps.uow, locations=locations)
+
+    cache = (
+        FragmentCache(path=fragment_cache, max_entries=fragment_cache_max_entries)
+        if fragment_cache
+        else None
     )
-
-    doc = services.transform(document=doc)
-
-    yield doc
+    try:
+        if stream_to:
+            services.stream_graph(
+                locations=locations,
+                uow=deps.uow,
+                filename=stream_to,
+                format=SerializationFormat.from_string(stream_format),
+                models=list(models) or None,
+                metric_granularity=granularity,
+                metric_series=metric_series,
+                cache=cache,
+            )
+        elif from_graph:
+            # only the resources that differ from the previous snapshot are
+            # compiled and patched into the document
+            previous_uow = InMemoryUnitOfWork()
+            try:
+                previous_locations = services.load_snapshot(
+                    path=previous_snapshot, uow=previous_uow
+                )
+            except SnapshotError as err:
+                raise click.BadParameter(str(err), param_hint="--previous_snapshot")
+            if previous_locations != locations:
+                raise click.BadParameter(
+                    "The snapshot was taken for other locations.",
+                    param_hint="--previous_snapshot",
+                )
+            resources, previous = services.changed_resources(
+                previous_uow=previous_uow, uow=deps.uow, locations=locations
+            )
+            doc = services.update_graph(
+                document=services.read(filename=str(from_graph)),
+                locations=locations,
+                uow=deps.uow,
+                resources=resources,
+                previous=previous,
+                models=list(models) or None,
+                metric_granularity=granularity,
+                metric_series=metric_series,
+                cache=cache,
+            )
+        else:
+            doc = services.compile_graph(
+                uow=deps.uow,
+                locations=locations,
+                workers=compile_workers,
+                models=list(models) or None,
+                metric_granularity=granularity,
+                metric_series=metric_series,
+                cache=cache,
+            )
+    finally:
+        if cache:
+            cache.close()
+    if cache:
+        click.echo(f"Fragment cache: {cache.statistics}", err=True)
+
+    if not stream_to:
+        yield services.transform(document=doc)
 
 
 @cli.command("load")
@@ -0,0 +1,171 @@
+import dataclasses
+import datetime
+import functools
+import hashlib
+import pickle
+from pathlib import Path
+from typing import Any
+
+import prov.model
+
+from mlflow2prov import __version__
+from mlflow2prov.adapters.cache import SqliteCache
+from mlflow2prov.domain.model import LazyField, MetricStore
+from mlflow2prov.prov.model import ProvContext
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "mlflow2prov" / "fragments.sqlite"
+DEFAULT_MAX_FRAGMENTS = 1_000_000
+
+# records as (type, identifier, attributes), the arguments of new_record
+Fragment = list[
+    tuple[
+        prov.model.QualifiedName,
+        prov.model.QualifiedName | None,
+        list[tuple[prov.model.QualifiedName, Any]],
+    ]
+]
+
+
+def fingerprint(hasher: Any, value: Any) -> None:
+    # feeds the content of a model input to the hasher, lazy fields are
+    # loaded and metric stores are hashed column by column
+    if isinstance(value, LazyField):
+        value = value.get()
+    if isinstance(value, MetricStore):
+        fingerprint(hasher, (value.run_id, value.names))
+        for column in (value.codes, value.values, value.steps, value.timestamps):
+            hasher.update(f"{column.typecode}{len(column)}:".encode())
+            hasher.update(column.tobytes())
+    elif dataclasses.is_dataclass(value):
+        hasher.update(f"{type(value).__name__}(".encode())
+        for f in dataclasses.fields(value):
+            attribute = getattr(value, f.name)
+            if hasattr(attribute, "prov_identifier"):
+                # referenced resources are hashed by what their element holds,
+                # not by their own references, e.g. the history of a revision
+                attribute = (
+                    attribute.prov_identifier,
+                    attribute.prov_attributes(),
+                )
+            fingerprint(hasher, attribute)
+        hasher.update(b")")
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"[{len(value)}:".encode())
+        for item in value:
+            fingerprint(hasher, item)
+    elif isinstance(value, datetime.datetime):
+        # the repr of time zones may hold their address
+        hasher.update(f"datetime:{value.isoformat()};".encode())
+    else:
+        hasher.update(f"{type(value).__name__}:{value!r};".encode())
+
+
+@functools.cache
+def namespace(prefix: str, uri: str) -> prov.model.Namespace:
+    return prov.model.Namespace(prefix, uri)
+
+
+def encode(value: Any) -> Any:
+    # a pickled qualified name carries every name created in its namespace,
+    # names and literals are stored as plain tuples instead
+    if isinstance(value, prov.model.QualifiedName):
+        return ("qname", value.namespace.prefix, value.namespace.uri, value.localpart)
+    if isinstance(value, prov.model.Literal):
+        return ("literal", value.value, encode(value.datatype), value.langtag)
+    if isinstance(value, prov.model.Identifier):
+        return ("identifier", value.uri)
+    return value
+
+
+def decode(value: Any) -> Any:
+    # attribute values of records are never tuples themselves
+    if not isinstance(value, tuple):
+        return value
+    kind, *parts = value
+    if kind == "qname":
+        prefix, uri, localpart = parts
+        return namespace(prefix, uri)[localpart]
+    if kind == "literal":
+        literal, datatype, langtag = parts
+        return prov.model.Literal(literal, decode(datatype), langtag)
+    return prov.model.Identifier(*parts)
+
+
+def fragment(document: prov.model.ProvDocument) -> Fragment:
+    return [
+        (record.get_type(), record.identifier, record.attributes)
+        for record in document.get_records()
+    ]
+
+
+class FragmentCache(SqliteCache):
+    """Cache of the PROV records built by model instances.
+
+    Entries are keyed by a hash of the model, the options of the context and
+    the content of the instance's inputs, so an entry never becomes stale.
+    Instances whose inputs did not change since an earlier extraction load
+    their records instead of building them. The least recently used entries
+    are evicted once the cache exceeds `max_entries`.
+    """
+
+    name = "fragment cache"
+    tables = ("fragments",)
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int | None = DEFAULT_MAX_FRAGMENTS,
+    ):
+        super().__init__(path, max_entries)
+
+    def key(self, model: type, args: tuple[Any, ...], context: ProvContext) -> str:
+        # records also depend on the version of the models and on how the
+        # context builds metrics
+        hasher = hashlib.sha256(
+            f"{__version__}:{model.__name__}:{context.metric_granularity}:".encode()
+        )
+        fingerprint(hasher, args)
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Fragment | None:
+        payload = self._get("fragments", key)
+        if payload is None:
+            return None
+        return [
+            (
+                decode(record_type),
+                decode(identifier),
+                [(decode(name), decode(value)) for name, value in attributes],
+            )
+            for record_type, identifier, attributes in pickle.loads(payload)
+        ]
+
+    def put(self, key: str, records: Fragment) -> None:
+        payload = [
+            (
+                encode(record_type),
+                encode(identifier),
+                [(encode(name), encode(value)) for name, value in attributes],
+            )
+            for record_type, identifier, attributes in records
+        ]
+        self._put(
+            "fragments", key, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+    def build(self, model: type, args: tuple[Any, ...], context: ProvContext) -> None:
+        # builds the instance into a context of its own, its records are
+        # merged into the shared context whether they are built or loaded
+        if context.metric_series is not None:
+            # written series are not part of the records, they are not cached
+            model(*args, shared_context=context).build_prov_model()
+            return
+
+        key = self.key(model, args, context)
+        records = self.get(key)
+        if records is None:
+            own = dataclasses.replace(context, document=prov.model.ProvDocument())
+            records = fragment(model(*args, shared_context=own).build_prov_model())
+            self.put(key, records)
+        for record in records:
+            context.add_record(*record)
@@ -1,54 +1,165 @@
+import functools
 import logging
-from dataclasses import dataclass, field
-from typing import Any, Iterable, Type
+import pathlib
+import urllib.parse
+from dataclasses import InitVar, dataclass, field
+from enum import Enum
+from typing import Any, ClassVar, Iterable, Type
 
 import prov.model
 
-from mlflow2prov.adapters.repository import InMemoryRepository
+from mlflow2prov.adapters.repository import AbstractReadRepository, InMemoryRepository
 from mlflow2prov.domain.constants import ChangeType, ProvRole
 from mlflow2prov.domain.model import (
     Commit,
     Experiment,
     FileRevision,
+    LazyField,
     LifecycleStage,
+    Metric,
+    MetricStore,
+    MetricSummary,
     RegisteredModel,
     RegisteredModelVersion,
     RegisteredModelVersionStage,
     Run,
 )
+from mlflow2prov.prov.query import (
+    GIT,
+    MLFLOW,
+    Expand,
+    Join,
+    Lookup,
+    QueryPlan,
+    QueryPlanner,
+    Scan,
+    Unnest,
+)
+from mlflow2prov.utils.prov_utils import qualified_name
 
 log = logging.getLogger(__name__)
 
 DEFAULT_NAMESPACE = prov.model.Namespace("ex", "example.org")
 
 
+@functools.cache
+def attribute_name(name: str) -> prov.model.QualifiedName:
+    # plain attribute names of the domain objects are in the default namespace
+    return qualified_name(name)
+
+
+class MetricGranularity(Enum):
+    PER_STEP = "per-step"
+    LAST = "last"
+    SUMMARY = "summary"
+
+    def __str__(self) -> str:
+        return self.value
+
+    @staticmethod
+    def from_string(granularity_str: str) -> "MetricGranularity":
+        if granularity_str in ("per-step", "Per-Step", "PER-STEP"):
+            return MetricGranularity.PER_STEP
+        elif granularity_str in ("last", "Last", "LAST"):
+            return MetricGranularity.LAST
+        elif granularity_str in ("summary", "Summary", "SUMMARY"):
+            return MetricGranularity.SUMMARY
+        else:
+            raise NotImplementedError
+
+    @staticmethod
+    def to_string(granularity: "MetricGranularity") -> str:
+        return str(granularity)
+
+    @classmethod
+    def values(cls):
+        return list(cls._value2member_map_.keys())
+
+
 @dataclass
 class ProvContext:
     document: prov.model.ProvDocument
     namespace: str | None = None
+    # metric entities per step, per name for the last step or per name
+    # summarizing the steps, the series of summaries is written to a CSV
+    # file per run in metric_series if it is set
+    metric_granularity: MetricGranularity = MetricGranularity.PER_STEP
+    metric_series: pathlib.Path | None = None
+    # records already in the document, elements by identifier and relations
+    # by type and endpoints, so that none of them is inserted twice
+    elements: dict[prov.model.QualifiedName, prov.model.ProvElement] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    relations: dict[
+        tuple[
+            Type[prov.model.ProvRelation],
+            prov.model.QualifiedName,
+            prov.model.QualifiedName,
+        ],
+        prov.model.ProvRelation,
+    ] = field(default_factory=dict, init=False, repr=False, compare=False)
 
     def add_element(
         self,
         dataclass_instance,
     ) -> prov.model.ProvRecord:
-        element = self.convert_to_prov_element(dataclass_instance)
-
         # Add the namespace to the element if it is provided, but
         # namespace can only be set for ProvBundles and ProvDocuments
         # if self.namespace:
         #     element.add_namespace(self.namespace)
 
-        return self.document.add_record(element)
+        return self.convert_to_prov_element(dataclass_instance)
 
     def convert_to_prov_element(
         self,
         dataclass_instance,
     ) -> prov.model.ProvElement:
-        element = dataclass_instance.to_prov()
+        # the record is built once, directly in the document, instead of
+        # building it with to_prov() first and copying it into the document
+        identifier = dataclass_instance.prov_identifier
+        attributes = [
+            (attribute_name(key) if isinstance(key, str) else key, value)
+            for key, value in filter(None, dataclass_instance.prov_attributes())
+        ]
+
+        element = self.elements.get(identifier)
+        if element is None:
+            element = self.document.new_record(
+                dataclass_instance.prov_type, identifier, attributes
+            )
+            self.elements[identifier] = element
+        else:
+            # attributes are sets, merging them is what unified() would do
+            element.add_attributes(attributes)
 
-        return self.document.new_record(
-            element._prov_type, element.identifier, element.attributes
-        )
+        return element
+
+    def add_record(
+        self,
+        record_type: prov.model.QualifiedName,
+        identifier: prov.model.QualifiedName | None,
+        attributes: list[tuple[prov.model.QualifiedName, Any]],
+    ) -> None:
+        # records built by another context, e.g. loaded from a cache, are
+        # merged into the indexed records like the ones built here
+        record_class = prov.model.PROV_REC_CLS[record_type]
+        index: dict[Any, Any]
+        if issubclass(record_class, prov.model.ProvRelation):
+            values = dict(attributes)
+            key: Any = (
+                record_class,
+                values.get(record_class.FORMAL_ATTRIBUTES[0]),  # type: ignore
+                values.get(record_class.FORMAL_ATTRIBUTES[1]),  # type: ignore
+            )
+            index = self.relations
+        else:
+            key, index = identifier, self.elements
+
+        record = index.get(key)
+        if record is None:
+            index[key] = self.document.new_record(record_type, identifier, attributes)
+        else:
+            record.add_attributes(attributes)
 
     def add_relation(
         self,
@@ -57,13 +168,17 @@ class ProvContext:
         relationship_type: Type[prov.model.ProvRelation],
         attributes: dict[str, Any] | None = None,
     ) -> None:
-        if not attributes:
-            attributes = dict()
-
         source = self.add_element(source_dataclass_instance)
         target = self.add_element(target_dataclass_instance)
 
-        relationship = self.document.new_record(
+        key = (relationship_type, source.identifier, target.identifier)
+        relation = self.relations.get(key)
+        if relation is not None:
+            if attributes:
+                relation.add_attributes(attributes)
+            return
+
+        self.relations[key] = self.document.new_record(
             relationship_type._prov_type,
             prov.model.QualifiedName(
                 DEFAULT_NAMESPACE, f"relation:{source.identifier}:{target.identifier}"
@@ -72,11 +187,33 @@ class ProvContext:
                 relationship_type.FORMAL_ATTRIBUTES[0]: source,  # type: ignore
                 relationship_type.FORMAL_ATTRIBUTES[1]: target,  # type: ignore
             },
+            attributes,
         )
 
-        relationship.add_attributes(attributes)
 
-        self.document.add_record(relationship)
+def run_metrics(run: Run, context: ProvContext) -> Iterable[Metric | MetricSummary]:
+    # metric entities of a run at the granularity of the context, shared by
+    # every model adding the metrics of a run
+    metrics = run.metrics
+    granularity = context.metric_granularity
+    if not metrics or granularity == MetricGranularity.PER_STEP:
+        return metrics or []
+
+    if isinstance(metrics, LazyField):
+        metrics = metrics.get()
+    if not isinstance(metrics, MetricStore):
+        metrics = MetricStore.from_metrics(run.run_id, metrics)
+    if granularity == MetricGranularity.LAST:
+        return metrics.last_metrics()
+    if context.metric_series is None:
+        return metrics.summaries()
+
+    path = context.metric_series / (
+        f"{urllib.parse.quote_plus(run.run_id, safe='')}.csv"
+    )
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        metrics.write_csv(f)
+    return metrics.summaries(series=str(path))
 
 
 @dataclass
@@ -85,25 +222,29 @@ class FileAdditionModel:
     parent: Commit | None
     revision: FileRevision
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
-
-    @staticmethod
+    # context of a shared document the model appends its records to
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan("revision", GIT, FileRevision, (("status", ChangeType.ADDED),)),
+            Lookup("commit", GIT, Commit, "sha", "revision.commit", required=True),
+            Expand("parent", GIT, Commit, "sha", "commit.parents"),
+        ),
+        select=("commit", "parent", "revision"),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[Commit, Commit | None, FileRevision]]:
-        for revision in git_repository.list_all(
-            resource_type=FileRevision, status=ChangeType.ADDED
-        ):
-            commit = git_repository.get(resource_type=Commit, sha=revision.commit)
-            if commit:
-                for parent in [
-                    git_repository.get(resource_type=Commit, sha=sha)
-                    for sha in commit.parents
-                ]:
-                    yield commit, parent, revision
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.commit)
@@ -168,31 +309,35 @@ class FileModificationModel:
     revision: FileRevision
     previous: FileRevision | None
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
-
-    @staticmethod
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan("revision", GIT, FileRevision, (("status", ChangeType.MODIFIED),)),
+            Lookup("commit", GIT, Commit, "sha", "revision.commit", required=True),
+            Expand("parent", GIT, Commit, "sha", "commit.parents"),
+        ),
+        select=("commit", "parent", "revision", "revision.previous"),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[Commit, Commit | None, FileRevision, FileRevision | None]]:
-        for revision in git_repository.list_all(
-            resource_type=FileRevision, status=ChangeType.MODIFIED
-        ):
-            commit = git_repository.get(resource_type=Commit, sha=revision.commit)
-            if commit:
-                for parent in [
-                    git_repository.get(resource_type=Commit, sha=sha)
-                    for sha in commit.parents
-                ]:
-                    yield commit, parent, revision, revision.previous
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.commit)
         self.context.add_element(self.revision)
         self.context.add_element(self.revision.file)
-        self.context.add_element(self.previous)
+        if self.previous:
+            self.context.add_element(self.previous)
         self.context.add_element(self.commit.author)
         self.context.add_element(self.commit.committer)
 
@@ -230,21 +375,24 @@ class FileModificationModel:
         self.context.add_relation(
             self.revision, self.commit.author, prov.model.ProvAttribution
         )
-        self.context.add_relation(
-            self.revision,
-            self.previous,
-            prov.model.ProvDerivation,
-            {str(prov.model.PROV_TYPE): "prov:Revision"},
-        )
-        self.context.add_relation(
-            self.commit,
-            self.previous,
-            prov.model.ProvUsage,
-            {
-                str(prov.model.PROV_ATTR_STARTTIME): self.commit.authored_at,
-                str(prov.model.PROV_ROLE): ProvRole.PREVIOUS_REVISION,
-            },
-        )
+        # the previous revision is unknown if it lies outside of the
+        # extracted history window
+        if self.previous:
+            self.context.add_relation(
+                self.revision,
+                self.previous,
+                prov.model.ProvDerivation,
+                {str(prov.model.PROV_TYPE): "prov:Revision"},
+            )
+            self.context.add_relation(
+                self.commit,
+                self.previous,
+                prov.model.ProvUsage,
+                {
+                    str(prov.model.PROV_ATTR_STARTTIME): self.commit.authored_at,
+                    str(prov.model.PROV_ROLE): ProvRole.PREVIOUS_REVISION,
+                },
+            )
 
         return self.context.document
 
@@ -255,25 +403,28 @@ class FileDeletionModel:
     parent: Commit | None
     revision: FileRevision
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
-
-    @staticmethod
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan("revision", GIT, FileRevision, (("status", ChangeType.DELETED),)),
+            Lookup("commit", GIT, Commit, "sha", "revision.commit", required=True),
+            Expand("parent", GIT, Commit, "sha", "commit.parents"),
+        ),
+        select=("commit", "parent", "revision"),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[Commit, Commit | None, FileRevision]]:
-        for revision in git_repository.list_all(
-            resource_type=FileRevision, status=ChangeType.DELETED
-        ):
-            commit = git_repository.get(resource_type=Commit, sha=revision.commit)
-            if commit:
-                for parent in [
-                    git_repository.get(resource_type=Commit, sha=sha)
-                    for sha in commit.parents
-                ]:
-                    yield commit, parent, revision
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.commit)
@@ -321,17 +472,24 @@ class FileDeletionModel:
 class ExperimentAdditionModel:
     experiment: Experiment
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(document=prov.model.ProvDocument())
-
-    @staticmethod
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(Scan("experiment", MLFLOW, Experiment),),
+        select=("experiment",),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[Experiment]]:
-        for experiment in mlflow_repository.list_all(resource_type=Experiment):
-            yield (experiment,)
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.experiment)
@@ -395,34 +553,50 @@ class ExperimentDeletionModel:
     experiment: Experiment
     run: Run | None
     context: ProvContext = field(init=False)
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan(
+                "experiment",
+                MLFLOW,
+                Experiment,
+                (("lifecycle_stage", LifecycleStage.DELETED),),
+            ),
+            Join(
+                "run",
+                MLFLOW,
+                Run,
+                "experiment_id",
+                "experiment.experiment_id",
+                outer=True,
+            ),
+        ),
+        select=("experiment", "run"),
+    )
 
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
 
-    @staticmethod
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[Experiment, Run | None]]:
-        for experiment in mlflow_repository.list_all(
-            resource_type=Experiment, lifecycle_stage=LifecycleStage.DELETED
-        ):
-            runs = mlflow_repository.list_all(
-                resource_type=Run, experiment_id=experiment.experiment_id
-            )
-            for run in [*runs, None]:
-                yield experiment, run
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.experiment)
         if self.experiment.tags:
             for experiment_tag in self.experiment.tags:
                 self.context.add_element(experiment_tag)
+        metrics = list(run_metrics(self.run, self.context)) if self.run else []
         if self.run:
             self.context.add_element(self.run)
-            if self.run.metrics:
-                for metric in self.run.metrics:
-                    self.context.add_element(metric)
+            for metric in metrics:
+                self.context.add_element(metric)
             if self.run.params:
                 for param in self.run.params:
                     self.context.add_element(param)
@@ -480,22 +654,19 @@ class ExperimentDeletionModel:
                     str(prov.model.PROV_ROLE): ProvRole.DELETED_RUN,
                 },
             )
-            if self.run.metrics:
-                for metric in self.run.metrics:
-                    self.context.add_relation(
-                        self.run, metric, prov.model.ProvMembership
-                    )
-                    self.context.add_relation(
-                        metric,
-                        self.run.deletion,
-                        prov.model.ProvInvalidation,
-                        {
-                            str(
-                                prov.model.PROV_ATTR_STARTTIME
-                            ): self.experiment.deletion.start_time,
-                            str(prov.model.PROV_ROLE): ProvRole.DELETED_RUN,
-                        },
-                    )
+            for metric in metrics:
+                self.context.add_relation(self.run, metric, prov.model.ProvMembership)
+                self.context.add_relation(
+                    metric,
+                    self.run.deletion,
+                    prov.model.ProvInvalidation,
+                    {
+                        str(
+                            prov.model.PROV_ATTR_STARTTIME
+                        ): self.experiment.deletion.start_time,
+                        str(prov.model.PROV_ROLE): ProvRole.DELETED_RUN,
+                    },
+                )
             if self.run.params:
                 for param in self.run.params:
                     self.context.add_relation(
@@ -575,31 +746,41 @@ class RunAdditionModel:
     commit: Commit | None
     file_revision: FileRevision | None
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
-
-    @staticmethod
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan("run", MLFLOW, Run),
+            Lookup(
+                "experiment", MLFLOW, Experiment, "experiment_id", "run.experiment_id"
+            ),
+            Lookup("commit", GIT, Commit, "sha", "run.source_git_commit"),
+            Lookup("file_revision", GIT, FileRevision, "name", "run.source_name"),
+        ),
+        select=("run", "experiment", "commit", "file_revision"),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[Run, Experiment | None, Commit | None, FileRevision | None]]:
-        for run in mlflow_repository.list_all(resource_type=Run):
-            experiment = mlflow_repository.get(
-                resource_type=Experiment, experiment_id=run.experiment_id
-            )
-            commit = git_repository.get(resource_type=Commit, sha=run.source_git_commit)
-            file_revision = git_repository.get(
-                resource_type=FileRevision, name=run.source_name
-            )
-            yield run, experiment, commit, file_revision
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
+
+    def metrics(self) -> Iterable[Metric | MetricSummary]:
+        return run_metrics(self.run, self.context)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
+        metrics = list(self.metrics())
         self.context.add_element(self.run)
         self.context.add_element(self.experiment)
-        if self.run.metrics:
-            for metric in self.run.metrics:
-                self.context.add_element(metric)
+        for metric in metrics:
+            self.context.add_element(metric)
         if self.run.params:
             for param in self.run.params:
                 self.context.add_element(param)
@@ -631,23 +812,18 @@ class RunAdditionModel:
             },
         )
         self.context.add_relation(self.run, self.run.user, prov.model.ProvAttribution)
-        if self.run.metrics:
-            for metric in self.run.metrics:
-                self.context.add_relation(self.run, metric, prov.model.ProvMembership)
-                self.context.add_relation(
-                    metric,
-                    self.run.creation,
-                    prov.model.ProvGeneration,
-                    {
-                        str(
-                            prov.model.PROV_ATTR_STARTTIME
-                        ): self.run.creation.start_time,
-                        str(prov.model.PROV_ROLE): ProvRole.ADDED_RUN,
-                    },
-                )
-                self.context.add_relation(
-                    metric, self.run.user, prov.model.ProvAttribution
-                )
+        for metric in metrics:
+            self.context.add_relation(self.run, metric, prov.model.ProvMembership)
+            self.context.add_relation(
+                metric,
+                self.run.creation,
+                prov.model.ProvGeneration,
+                {
+                    str(prov.model.PROV_ATTR_STARTTIME): self.run.creation.start_time,
+                    str(prov.model.PROV_ROLE): ProvRole.ADDED_RUN,
+                },
+            )
+            self.context.add_relation(metric, self.run.user, prov.model.ProvAttribution)
         if self.run.params:
             for param in self.run.params:
                 self.context.add_relation(self.run, param, prov.model.ProvMembership)
@@ -746,26 +922,33 @@ class RunAdditionModel:
 class RunDeletionModel:
     run: Run
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
-
-    @staticmethod
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan("run", MLFLOW, Run, (("lifecycle_stage", LifecycleStage.DELETED),)),
+        ),
+        select=("run",),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[Run]]:
-        for run in mlflow_repository.list_all(
-            resource_type=Run, lifecycle_stage=LifecycleStage.DELETED
-        ):
-            yield (run,)
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         if self.run.deletion:
+            metrics = list(run_metrics(self.run, self.context))
             self.context.add_element(self.run)
-            if self.run.metrics:
-                for metric in self.run.metrics:
-                    self.context.add_element(metric)
+            for metric in metrics:
+                self.context.add_element(metric)
             if self.run.params:
                 for param in self.run.params:
                     self.context.add_element(param)
@@ -793,22 +976,19 @@ class RunDeletionModel:
                     str(prov.model.PROV_ROLE): ProvRole.DELETED_RUN,
                 },
             )
-            if self.run.metrics:
-                for metric in self.run.metrics:
-                    self.context.add_relation(
-                        self.run, metric, prov.model.ProvMembership
-                    )
-                    self.context.add_relation(
-                        metric,
-                        self.run.deletion,
-                        prov.model.ProvInvalidation,
-                        {
-                            str(
-                                prov.model.PROV_ATTR_STARTTIME
-                            ): self.run.deletion.start_time,
-                            str(prov.model.PROV_ROLE): ProvRole.DELETED_RUN,
-                        },
-                    )
+            for metric in metrics:
+                self.context.add_relation(self.run, metric, prov.model.ProvMembership)
+                self.context.add_relation(
+                    metric,
+                    self.run.deletion,
+                    prov.model.ProvInvalidation,
+                    {
+                        str(
+                            prov.model.PROV_ATTR_STARTTIME
+                        ): self.run.deletion.start_time,
+                        str(prov.model.PROV_ROLE): ProvRole.DELETED_RUN,
+                    },
+                )
             if self.run.params:
                 for param in self.run.params:
                     self.context.add_relation(
@@ -884,19 +1064,24 @@ class RunDeletionModel:
 class RegisteredModelAdditionModel:
     registered_model: RegisteredModel
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
-
-    @staticmethod
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(Scan("registered_model", MLFLOW, RegisteredModel),),
+        select=("registered_model",),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[RegisteredModel]]:
-        for registered_model in mlflow_repository.list_all(
-            resource_type=RegisteredModel
-        ):
-            yield (registered_model,)
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.registered_model)
@@ -964,23 +1149,28 @@ class RegisteredModelVersionAdditionModel:
     registered_model_version: RegisteredModelVersion
     run: Run | None
     context: ProvContext = field(init=False)
-
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
-
-    @staticmethod
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan("registered_model", MLFLOW, RegisteredModel),
+            Unnest("registered_model_version", "registered_model.versions"),
+            Lookup("run", MLFLOW, Run, "run_id", "registered_model_version.run_id"),
+        ),
+        select=("registered_model", "registered_model_version", "run"),
+    )
+
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
+
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[RegisteredModel, RegisteredModelVersion, Run | None]]:
-        for registered_model in mlflow_repository.list_all(
-            resource_type=RegisteredModel
-        ):
-            for registered_model_version in registered_model.versions:
-                run = mlflow_repository.get(
-                    resource_type=Run, run_id=registered_model_version.run_id
-                )
-                yield registered_model, registered_model_version, run
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.registered_model)
@@ -1084,24 +1274,36 @@ class RegisteredModelVersionAdditionModel:
 class RegisteredModelVersionDeletionModel:
     registered_model_version: RegisteredModelVersion
     context: ProvContext = field(init=False)
+    shared_context: InitVar[ProvContext | None] = None
+    plan: ClassVar[QueryPlan] = QueryPlan(
+        steps=(
+            Scan("registered_model", MLFLOW, RegisteredModel),
+            Unnest(
+                "registered_model_version",
+                "registered_model.versions",
+                (
+                    (
+                        "registered_model_version_stage",
+                        RegisteredModelVersionStage.DELETED_INTERNAL,
+                    ),
+                ),
+            ),
+        ),
+        select=("registered_model_version",),
+    )
 
-    def __post_init__(self):
-        self.context = ProvContext(prov.model.ProvDocument())
+    def __post_init__(self, shared_context: ProvContext | None):
+        if shared_context is None:
+            shared_context = ProvContext(prov.model.ProvDocument())
+        self.context = shared_context
 
-    @staticmethod
+    @classmethod
     def query(
-        git_repository: InMemoryRepository,
-        mlflow_repository: InMemoryRepository,
+        cls,
+        git_repository: AbstractReadRepository,
+        mlflow_repository: AbstractReadRepository,
     ) -> Iterable[tuple[RegisteredModelVersion]]:
-        for registered_model in mlflow_repository.list_all(
-            resource_type=RegisteredModel,
-        ):
-            for registered_model_version in registered_model.versions:
-                if (
-                    registered_model_version.registered_model_version_stage
-                    == RegisteredModelVersionStage.DELETED_INTERNAL
-                ):
-                    yield (registered_model_version,)
+        return QueryPlanner(git_repository, mlflow_repository).execute(cls.plan)
 
     def build_prov_model(self) -> prov.model.ProvDocument:
         self.context.add_element(self.registered_model_version)
@@ -1168,24 +1370,33 @@ class CallableModel:
         | RegisteredModelVersionDeletionModel
     ]
     document: prov.model.ProvDocument = field(init=False)
+    context: ProvContext = field(init=False)
 
     def __post_init__(self):
         self.document = prov.model.ProvDocument()
+        self.context = ProvContext(self.document)
 
     def __call__(
         self,
         repositories: list[InMemoryRepository],
+        planner: QueryPlanner | None = None,
+        context: ProvContext | None = None,
     ):
-        query_result = self.model.query(
-            git_repository=repositories[0],  # type: ignore
-            mlflow_repository=repositories[1],  # type: ignore
-        )
-
+        # a planner shared by several models shares its hash tables
+        if planner is None:
+            planner = QueryPlanner(repositories[0], repositories[1])
+        # a context shared by several models accumulates all of their records
+        if context is None:
+            context = self.context
+        query_result = planner.execute(self.model.plan)
+
+        # all instances append their records to the document of the context,
+        # no instance builds a document of its own that would be copied
         for args in query_result:
-            m = self.model(*args)  # type: ignore
-            self.document.update(m.build_prov_model())
+            m = self.model(*args, shared_context=context)  # type: ignore
+            m.build_prov_model()
 
-        return self.document
+        return context.document
 
 
 MODELS = [
@@ -1200,3 +1411,14 @@ MODELS = [
     CallableModel(RegisteredModelVersionAdditionModel),
     CallableModel(RegisteredModelVersionDeletionModel),
 ]
+
+MODEL_NAMES = [prov_model.model.__name__ for prov_model in MODELS]
+
+
+def select_models(names: Iterable[str] | None = None) -> list[CallableModel]:
+    if names is None:
+        return MODELS
+    names = set(names)
+    if unknown := names.difference(MODEL_NAMES):
+        raise ValueError(f"Unknown PROV models: {', '.join(sorted(unknown))}")
+    return [prov_model for prov_model in MODELS if prov_model.model.__name__ in names]
@@ -309,6 +309,58 @@ def dedupe(graph: prov.model.ProvDocument) -> prov.model.ProvDocument:
     return document_factory(records)
 
 
+def relation_key(relation: prov.model.ProvRecord) -> tuple[Any, Any, Any]:
+    # relations are merged by type and endpoints, see dedupe
+    return (
+        relation.get_type(),
+        relation.formal_attributes[0][1],
+        relation.formal_attributes[1][1],
+    )
+
+
+def patch(
+    graph: prov.model.ProvDocument,
+    old: prov.model.ProvDocument,
+    new: prov.model.ProvDocument,
+    changed: set[prov.model.QualifiedName],
+) -> prov.model.ProvDocument:
+    # the records of the old fragments are replaced by the new fragments,
+    # records shared with instances that were not built again are kept:
+    # elements taking part in relations outside of the old fragments and the
+    # relations between two of them, unless they belong to a changed resource
+    replaced = {
+        relation_key(relation) for relation in old.get_records(prov.model.ProvRelation)
+    }
+    referenced = set()
+    for relation in graph.get_records(prov.model.ProvRelation):
+        key = relation_key(relation)
+        if key not in replaced:
+            referenced.update(key[1:])
+
+    # shared elements are merged with their new version, their attributes
+    # may come from other instances as well
+    built = {
+        element.identifier
+        for document in (old, new)
+        for element in document.get_records(prov.model.ProvElement)
+    }
+    shared = {
+        identifier
+        for identifier in built
+        if identifier in referenced and identifier not in changed
+    }
+    dropped = built - shared
+
+    def kept(record: prov.model.ProvRecord) -> bool:
+        if record.is_element():
+            return record.identifier not in dropped
+        key = relation_key(record)
+        return key not in replaced or (key[1] in shared and key[2] in shared)
+
+    records = [record for record in graph.get_records() if kept(record)]
+    return dedupe(document_factory(records + list(new.get_records())))
+
+
 def read_duplicated_agent_mapping(fp: pathlib.Path) -> dict[str, list[str]]:
     with open(fp, "rt") as f:
         yaml = ruamel.yaml.YAML(typ="safe")
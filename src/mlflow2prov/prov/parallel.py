@@ -0,0 +1,111 @@
+import multiprocessing
+import pathlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Any
+
+import prov.model
+
+from mlflow2prov.prov.cache import Fragment, fragment
+from mlflow2prov.prov.model import MODELS, CallableModel, MetricGranularity, ProvContext
+from mlflow2prov.prov.query import QueryPlanner
+
+# model instances built by one task of a worker process
+DEFAULT_CHUNK_SIZE = 256
+
+Shard = tuple[int, list[tuple[Any, ...]]]
+
+# shards of the running compilation, forked workers inherit them copy-on-write
+# instead of receiving pickled copies of the resources
+SHARDS: list[Shard] = []
+
+
+def chunked(rows: Iterable[tuple[Any, ...]], size: int) -> Iterator[list[Any]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def shard(
+    planner: QueryPlanner,
+    chunk_size: int,
+    models: list[CallableModel] | None = None,
+) -> list[Shard]:
+    # query tuples are independent, every chunk is built by a single task
+    return [
+        (index, chunk)
+        for index, prov_model in enumerate(MODELS)
+        if models is None or prov_model in models
+        for chunk in chunked(planner.execute(prov_model.model.plan), chunk_size)
+    ]
+
+
+def build_fragment(
+    index: int,
+    rows: list[tuple[Any, ...]],
+    metric_granularity: MetricGranularity = MetricGranularity.PER_STEP,
+    metric_series: pathlib.Path | None = None,
+) -> Fragment:
+    # runs in a worker process, records are returned without their document
+    context = ProvContext(
+        prov.model.ProvDocument(),
+        metric_granularity=metric_granularity,
+        metric_series=metric_series,
+    )
+    for args in rows:
+        MODELS[index].model(*args, shared_context=context).build_prov_model()
+
+    return fragment(context.document)
+
+
+def build_inherited_fragment(
+    position: int,
+    metric_granularity: MetricGranularity = MetricGranularity.PER_STEP,
+    metric_series: pathlib.Path | None = None,
+) -> Fragment:
+    return build_fragment(*SHARDS[position], metric_granularity, metric_series)
+
+
+def build_parallel(
+    planner: QueryPlanner,
+    context: ProvContext,
+    workers: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    models: list[CallableModel] | None = None,
+) -> None:
+    global SHARDS
+
+    shards = shard(planner, chunk_size, models)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        SHARDS = shards
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        )
+        tasks = executor.map(
+            build_inherited_fragment,
+            range(len(shards)),
+            repeat(context.metric_granularity),
+            repeat(context.metric_series),
+        )
+    else:
+        # without fork every task ships its query tuples to the worker
+        executor = ProcessPoolExecutor(max_workers=workers)
+        tasks = executor.map(
+            build_fragment,
+            [index for index, _ in shards],
+            [rows for _, rows in shards],
+            repeat(context.metric_granularity),
+            repeat(context.metric_series),
+        )
+
+    # fragments are added in shard order, records built by several shards
+    # are merged on insertion like the ones built in a single process
+    try:
+        with executor:
+            for fragment in tasks:
+                for record in fragment:
+                    context.add_record(*record)
+    finally:
+        SHARDS = []
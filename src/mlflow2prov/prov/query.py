@@ -0,0 +1,410 @@
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any
+
+from mlflow2prov.adapters.repository import DEFAULT_INDEXES, AbstractReadRepository
+
+GIT = "git"
+MLFLOW = "mlflow"
+
+# results of index probes into streamed repositories that are kept, e.g.
+# the experiment looked up by every run of that experiment
+PROBE_CACHE_SIZE = 1024
+
+
+def resolve(binding: dict[str, Any], path: str) -> Any:
+    # "run.source_git_commit" resolves attribute source_git_commit of the
+    # resource bound to run, a bare name resolves the bound resource itself
+    name, _, attribute = path.partition(".")
+    value = binding[name]
+    return attrgetter(attribute)(value) if attribute else value
+
+
+def resource_key(resource: Any) -> tuple[type, Any]:
+    # resources are compared by identifier, repositories may return a new
+    # copy of a stored resource on every read
+    return type(resource), resource.prov_identifier
+
+
+def passes(resource: Any, filters: Iterable[tuple[str, Any]]) -> bool:
+    return all(getattr(resource, key) == value for key, value in filters)
+
+
+def flatten(value: Any, path: str) -> list[Any]:
+    # values at an attribute path, the items of collections along the path
+    # are followed one by one
+    values = [value]
+    for attribute in filter(None, path.split(".")):
+        values = [getattr(v, attribute) for v in values if v is not None]
+        values = [
+            item
+            for v in values
+            for item in (v if isinstance(v, (list, tuple, set)) else [v])
+        ]
+    return values
+
+
+@dataclass(frozen=True)
+class Scan:
+    # every resource of a type with equal filter attributes
+    name: str
+    source: str
+    resource_type: type
+    filters: tuple[tuple[str, Any], ...] = ()
+
+    def rows(self, planner: "QueryPlanner", binding: dict[str, Any]) -> Iterable[Any]:
+        return planner.scan(self.source, self.resource_type, self.filters)
+
+
+@dataclass(frozen=True)
+class Lookup:
+    # first resource whose key equals the value at `on`, None if there is
+    # none, tuples without a match are dropped if the lookup is required
+    name: str
+    source: str
+    resource_type: type
+    key: str
+    on: str
+    required: bool = False
+
+    def rows(self, planner: "QueryPlanner", binding: dict[str, Any]) -> Iterable[Any]:
+        matches = planner.matches(
+            self.source, self.resource_type, self.key, resolve(binding, self.on)
+        )
+        if matches:
+            return matches[:1]
+        return [] if self.required else [None]
+
+
+@dataclass(frozen=True)
+class Expand:
+    # one tuple per value of the collection at `on`, each bound to the
+    # first resource with an equal key or None
+    name: str
+    source: str
+    resource_type: type
+    key: str
+    on: str
+
+    def rows(self, planner: "QueryPlanner", binding: dict[str, Any]) -> Iterable[Any]:
+        for value in resolve(binding, self.on) or ():
+            matches = planner.matches(self.source, self.resource_type, self.key, value)
+            yield matches[0] if matches else None
+
+
+@dataclass(frozen=True)
+class Join:
+    # one tuple per resource whose key equals the value at `on`,
+    # an outer join is followed by one tuple without a match
+    name: str
+    source: str
+    resource_type: type
+    key: str
+    on: str
+    outer: bool = False
+
+    def rows(self, planner: "QueryPlanner", binding: dict[str, Any]) -> Iterable[Any]:
+        matches = planner.matches(
+            self.source, self.resource_type, self.key, resolve(binding, self.on)
+        )
+        return [*matches, None] if self.outer else matches
+
+
+@dataclass(frozen=True)
+class Unnest:
+    # one tuple per item of the collection at `on` with equal attributes
+    name: str
+    on: str
+    where: tuple[tuple[str, Any], ...] = ()
+
+    def rows(self, planner: "QueryPlanner", binding: dict[str, Any]) -> Iterable[Any]:
+        return [
+            item for item in resolve(binding, self.on) or () if passes(item, self.where)
+        ]
+
+
+Step = Scan | Lookup | Expand | Join | Unnest
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    steps: tuple[Step, ...]
+    # names or attribute paths of the bound resources making up a tuple
+    select: tuple[str, ...]
+
+
+def resource_types(plans: Iterable[QueryPlan], source: str) -> set[type]:
+    # types of the resources the plans read from a source, items unnested
+    # from a resource are part of that resource
+    return {
+        step.resource_type
+        for plan in plans
+        for step in plan.steps
+        if not isinstance(step, Unnest) and step.source == source
+    }
+
+
+class QueryPlanner:
+    """Executes query plans against the git and mlflow repository.
+
+    Resource lists and hash tables are built on first use and shared by all
+    plans executed by the same planner, e.g. the models of one compile.
+    Streamed repositories are not held in memory, scans read them row by row
+    and lookups on indexed attributes probe the repository instead of a hash
+    table. Lookups on other attributes and the inverse tables of
+    execute_affected still hold the resources of their type.
+    """
+
+    def __init__(
+        self,
+        git_repository: AbstractReadRepository | None,
+        mlflow_repository: AbstractReadRepository | None,
+    ):
+        self.repositories = {GIT: git_repository, MLFLOW: mlflow_repository}
+        self.lists: dict[tuple[str, type], list[Any]] = {}
+        self.tables: dict[tuple[str, type, str], dict[Any, list[Any]]] = {}
+        self.inverse: dict[tuple[str, type, str], dict[Any, list[Any]] | None] = {}
+        self.probes: OrderedDict[tuple[str, type, str, Any], list[Any]] = OrderedDict()
+        # stored resources read in place of the ones with the same key, None
+        # hides a resource, see before
+        self.replaced: dict[tuple[type, Any], Any] = {}
+
+    def before(self, changed: Iterable[Any], previous: Iterable[Any]) -> "QueryPlanner":
+        # planner on the repositories as they were before the changed
+        # resources were stored, previous holds the versions they replaced,
+        # changed resources without a previous version were added
+        planner = QueryPlanner(self.repositories[GIT], self.repositories[MLFLOW])
+        planner.replaced = {resource_key(resource): None for resource in changed}
+        planner.replaced.update(
+            (resource_key(resource), resource) for resource in previous
+        )
+        return planner
+
+    def streamed(self, source: str) -> bool:
+        repository = self.repositories[source]
+        return repository is not None and repository.streamed
+
+    def resources(self, source: str, resource_type: type) -> Iterable[Any]:
+        repository = self.repositories[source]
+        if repository is None:
+            return []
+        if repository.streamed:
+            return self.replace(repository.iter_all(resource_type), resource_type)
+        if (source, resource_type) not in self.lists:
+            self.lists[(source, resource_type)] = list(
+                self.replace(repository.list_all(resource_type), resource_type)
+            )
+        return self.lists[(source, resource_type)]
+
+    def replace(
+        self,
+        resources: Iterable[Any],
+        resource_type: type,
+        filters: tuple[tuple[str, Any], ...] = (),
+    ) -> Iterator[Any]:
+        # replaced resources keep their position, previous versions whose key
+        # changed are appended, both only if they pass the filters the
+        # resources were selected by
+        if not self.replaced:
+            yield from resources
+            return
+        seen = set()
+        for resource in resources:
+            key = resource_key(resource)
+            if key in self.replaced:
+                seen.add(key)
+                resource = self.replaced[key]
+                if resource is None or not passes(resource, filters):
+                    continue
+            yield resource
+        yield from (
+            resource
+            for key, resource in self.replaced.items()
+            if key not in seen
+            and type(resource) is resource_type
+            and passes(resource, filters)
+        )
+
+    def scan(
+        self, source: str, resource_type: type, filters: tuple[tuple[str, Any], ...]
+    ) -> Iterable[Any]:
+        if self.streamed(source):
+            # filtered by the repository, through its index if there is one
+            repository = self.repositories[source]
+            return self.replace(
+                repository.iter_all(resource_type, **dict(filters)),  # type: ignore
+                resource_type,
+                filters,
+            )
+        if not filters:
+            return self.resources(source, resource_type)
+        (key, val), *rest = filters
+        return [
+            r for r in self.matches(source, resource_type, key, val) if passes(r, rest)
+        ]
+
+    def table(self, source: str, resource_type: type, key: str) -> dict[Any, list[Any]]:
+        if (source, resource_type, key) not in self.tables:
+            table: dict[Any, list[Any]] = {}
+            for resource in self.resources(source, resource_type):
+                table.setdefault(getattr(resource, key), []).append(resource)
+            self.tables[(source, resource_type, key)] = table
+        return self.tables[(source, resource_type, key)]
+
+    def probe(
+        self, source: str, resource_type: type, key: str, value: Any
+    ) -> list[Any]:
+        # resources of a streamed repository with an indexed attribute value,
+        # recent results are kept
+        repository = self.repositories[source]
+        probe: tuple[str, type, str, Any] | None = (source, resource_type, key, value)
+        try:
+            if probe in self.probes:
+                self.probes.move_to_end(probe)
+                return self.probes[probe]
+        except TypeError:  # unhashable value
+            probe = None
+        matches = list(
+            self.replace(
+                repository.iter_all(resource_type, **{key: value}),  # type: ignore
+                resource_type,
+                ((key, value),),
+            )
+        )
+        if probe is not None:
+            self.probes[probe] = matches
+            if len(self.probes) > PROBE_CACHE_SIZE:
+                self.probes.popitem(last=False)
+        return matches
+
+    def matches(
+        self, source: str, resource_type: type, key: str, value: Any
+    ) -> list[Any]:
+        # resources in repository order, the first one is what get returns
+        if self.streamed(source) and key in DEFAULT_INDEXES.get(resource_type, ()):
+            return self.probe(source, resource_type, key, value)
+        try:
+            return self.table(source, resource_type, key).get(value, [])
+        except TypeError:  # unhashable key or value
+            return [
+                r
+                for r in self.resources(source, resource_type)
+                if getattr(r, key) == value
+            ]
+
+    def execute(self, plan: QueryPlan) -> Iterator[tuple[Any, ...]]:
+        for binding in self.bind(plan.steps, {}):
+            yield tuple(resolve(binding, path) for path in plan.select)
+
+    def execute_affected(
+        self, plan: QueryPlan, changed: Iterable[Any]
+    ) -> Iterator[tuple[Any, ...]]:
+        # tuples that bind one of the changed resources, as stored in the
+        # repositories, they are bound from the scanned resources that the
+        # changed ones are reachable from
+        changed = list(changed)
+        keys = {resource_key(resource) for resource in changed}
+        scan, *rest = plan.steps
+        if not isinstance(scan, Scan):
+            bindings = self.bind(plan.steps, {})
+        else:
+            bindings = (
+                binding
+                for seed in self.seeds(plan, changed)
+                for binding in self.bind(tuple(rest), {scan.name: seed})
+            )
+
+        for binding in bindings:
+            if any(
+                value is not None and resource_key(value) in keys
+                for value in binding.values()
+            ):
+                yield tuple(resolve(binding, path) for path in plan.select)
+
+    def seeds(self, plan: QueryPlan, changed: list[Any]) -> list[Any]:
+        # resources of the first scan that pass its filters and lead to one
+        # of the changed resources, found backwards along the steps
+        steps = {step.name: step for step in plan.steps}
+        scan = plan.steps[0]
+        seeds: dict[tuple[type, Any], Any] = {}
+        for step in plan.steps:
+            if isinstance(step, Unnest):
+                # items are compared as a whole, they have no key
+                candidates = self.trace(steps, step, changed)
+            else:
+                matching = [r for r in changed if isinstance(r, step.resource_type)]
+                if step is scan:
+                    candidates = matching
+                else:
+                    candidates = self.trace(
+                        steps, step, [getattr(r, step.key) for r in matching]
+                    )
+            for seed in candidates:
+                seeds.setdefault(resource_key(seed), seed)
+
+        return [seed for seed in seeds.values() if passes(seed, scan.filters)]
+
+    def trace(self, steps: dict[str, Step], step: Step, values: list[Any]) -> list[Any]:
+        # resources of the scan that lead to one of the values at the path
+        # step is joined on, unnested items are skipped to their holder
+        if not values:
+            return []
+        name, _, path = step.on.partition(".")
+        upstream = steps[name]
+        while isinstance(upstream, Unnest):
+            name, _, attribute = upstream.on.partition(".")
+            path = ".".join(filter(None, (attribute, path)))
+            upstream = steps[name]
+
+        holders: dict[int, Any] = {}
+        for value in values:
+            for holder in self.holders(
+                upstream.source, upstream.resource_type, path, value
+            ):
+                holders[id(holder)] = holder
+        if isinstance(upstream, Scan):
+            return list(holders.values())
+        return self.trace(
+            steps, upstream, [getattr(h, upstream.key) for h in holders.values()]
+        )
+
+    def holders(
+        self, source: str, resource_type: type, path: str, value: Any
+    ) -> list[Any]:
+        # resources with the value at path, collections along the path are
+        # flattened, e.g. path "parents" of a commit holds each parent sha
+        key = (source, resource_type, path)
+        if key not in self.inverse:
+            table: dict[Any, list[Any]] | None = {}
+            try:
+                for resource in self.resources(source, resource_type):
+                    for v in dict.fromkeys(flatten(resource, path)):
+                        table.setdefault(v, []).append(resource)  # type: ignore
+            except TypeError:  # unhashable values, e.g. unnested items
+                table = None
+            self.inverse[key] = table
+
+        table = self.inverse[key]
+        if table is not None:
+            try:
+                return table.get(value, [])
+            except TypeError:
+                pass
+        return [
+            r
+            for r in self.resources(source, resource_type)
+            if any(v == value for v in flatten(r, path))
+        ]
+
+    def bind(
+        self, steps: tuple[Step, ...], binding: dict[str, Any]
+    ) -> Iterator[dict[str, Any]]:
+        if not steps:
+            yield binding
+            return
+        step, *rest = steps
+        for row in step.rows(self, binding):
+            binding[step.name] = row
+            yield from self.bind(tuple(rest), binding)
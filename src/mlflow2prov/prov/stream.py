@@ -0,0 +1,173 @@
+import itertools
+import json
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterator
+
+import prov.model
+from prov.constants import PROV_N_MAP
+from prov.identifier import Identifier
+from prov.serializers.provjson import decode_json_container, encode_json_container
+
+from mlflow2prov.prov.operations import SerializationFormat, escape
+
+STREAMING_FORMATS = (SerializationFormat.JSON, SerializationFormat.PROVN)
+RELATION_LABELS = {
+    PROV_N_MAP[record_type]
+    for record_type, record_class in prov.model.PROV_REC_CLS.items()
+    if issubclass(record_class, prov.model.ProvRelation)
+}
+
+SCHEMA = """
+CREATE TABLE record (
+    label TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    UNIQUE (label, identifier, entry)
+)
+"""
+
+
+def merge_entries(entries: Iterator[str]) -> dict[str, Any]:
+    # PROV-JSON encoding of the record unified() would build from the records
+    # with equal identifier, attributes with one value are not listed
+    values: dict[str, dict[str, Any]] = {}
+    for entry in entries:
+        for attribute, value in json.loads(entry).items():
+            for v in value if isinstance(value, list) else [value]:
+                values.setdefault(attribute, {})[json.dumps(v, sort_keys=True)] = v
+    return {
+        attribute: next(iter(vs.values())) if len(vs) == 1 else list(vs.values())
+        for attribute, vs in values.items()
+    }
+
+
+def relation_key(relation: prov.model.ProvRelation) -> Identifier:
+    # anonymous relations are keyed by their formal attributes, their anonymous
+    # identifiers are only unique within the document they were encoded from
+    return Identifier(
+        "_:"
+        + ",".join(
+            "-" if value is None else str(value)
+            for _, value in relation.formal_attributes
+        )
+    )
+
+
+@dataclass
+class StreamingWriter:
+    # writes the records of small documents to a file as they are emitted,
+    # records are spooled to a temporary database on disk and records with
+    # equal identifier are merged when the file is assembled on close
+    filename: str
+    format: SerializationFormat = SerializationFormat.JSON
+    prefixes: dict[str, str] = field(default_factory=dict, init=False)
+    spool: sqlite3.Connection = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.format not in STREAMING_FORMATS:
+            raise NotImplementedError(f"Cannot stream {self.format} documents.")
+        # an empty name opens a database in a temporary file
+        self.spool = sqlite3.connect("")
+        self.spool.execute(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.spool.close()
+
+    def emit(self, document: prov.model.ProvDocument) -> None:
+        default = document.get_default_namespace()
+        if default:
+            self.prefixes["default"] = default.uri
+        for namespace in document.namespaces:
+            self.prefixes[namespace.prefix] = namespace.uri
+
+        escaped = escape(document)
+        for relation in escaped.get_records(prov.model.ProvRelation):
+            if relation.identifier is None:
+                relation._identifier = relation_key(relation)
+        container = encode_json_container(escaped)
+        container.pop("prefix", None)
+        self.spool.executemany(
+            "INSERT OR IGNORE INTO record VALUES (?, ?, ?)",
+            (
+                (label, identifier, json.dumps(entry, sort_keys=True))
+                for label, records in container.items()
+                for identifier, record in records.items()
+                for entry in (record if isinstance(record, list) else [record])
+            ),
+        )
+
+    def records(self) -> Iterator[tuple[str, str, dict[str, Any]]]:
+        rows = self.spool.execute(
+            "SELECT label, identifier, entry FROM record "
+            "ORDER BY label, identifier, rowid"
+        )
+        for (label, identifier), group in itertools.groupby(
+            rows, key=lambda row: row[:2]
+        ):
+            yield label, identifier, merge_entries(entry for *_, entry in group)
+
+    def close(self) -> None:
+        try:
+            if self.filename == "-":
+                self.assemble(sys.stdout)
+            else:
+                with open(self.filename, "w", encoding="utf-8") as f:
+                    self.assemble(f)
+        finally:
+            self.spool.close()
+
+    def assemble(self, output: IO[str]) -> None:
+        if self.format == SerializationFormat.JSON:
+            self.assemble_json(output)
+        else:
+            self.assemble_provn(output)
+
+    def assemble_json(self, output: IO[str]) -> None:
+        sections = itertools.count()
+        output.write("{")
+        if self.prefixes:
+            output.write(f'"prefix":{json.dumps(self.prefixes)}')
+            next(sections)
+        anonymous = itertools.count(1)
+        for label, records in itertools.groupby(self.records(), key=lambda r: r[0]):
+            output.write(f"{',' if next(sections) else ''}{json.dumps(label)}:{{")
+            for n, (_, identifier, record) in enumerate(records):
+                # relations are written without identifier like dedupe()
+                # returns them, PROV-JSON needs a key for them nonetheless
+                if label in RELATION_LABELS:
+                    identifier = f"_:id{next(anonymous)}"
+                output.write(f"{',' if n else ''}{json.dumps(identifier)}:")
+                output.write(json.dumps(record))
+            output.write("}")
+        output.write("}")
+
+    def assemble_provn(self, output: IO[str]) -> None:
+        output.write("document\n")
+        prefixes = dict(self.prefixes)
+        if "default" in prefixes:
+            output.write(f"  default <{prefixes.pop('default')}>\n")
+        for prefix, uri in prefixes.items():
+            output.write(f"  prefix {prefix} <{uri}>\n")
+        if self.prefixes:
+            output.write("  \n")
+        for label, identifier, record in self.records():
+            document = prov.model.ProvDocument()
+            decode_json_container(
+                {"prefix": dict(self.prefixes), label: {identifier: record}},
+                document,
+            )
+            (element,) = document.get_records()
+            if element.is_relation():
+                element = prov.model.PROV_REC_CLS[element.get_type()](
+                    document, None, element.attributes
+                )
+            output.write(f"  {element.get_provn()}\n")
+        output.write("endDocument")
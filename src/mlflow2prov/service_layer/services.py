@@ -1,25 +1,33 @@
+import dataclasses
 import logging
 import pathlib
+from typing import Any
 
 import prov.model
 
+from mlflow2prov.adapters import snapshot
 from mlflow2prov.adapters.git.fetcher import GitFetcher
 from mlflow2prov.adapters.mlflow.fetcher import MLflowFetcher
-from mlflow2prov.prov import model, operations
+from mlflow2prov.adapters.repository import REFERENCE_FIELDS, CompositeRepository
+from mlflow2prov.domain.model import Run
+from mlflow2prov.prov import model, operations, parallel
+from mlflow2prov.prov.cache import FragmentCache
 from mlflow2prov.prov.operations import (
     DeserializationFormat,
     SerializationFormat,
     StatisticsFormat,
     StatisticsResolution,
 )
-from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork
+from mlflow2prov.prov.query import QueryPlanner, resource_key, resource_types
+from mlflow2prov.prov.stream import StreamingWriter
+from mlflow2prov.service_layer.unit_of_work import AbstractUnitOfWork
 
 log = logging.getLogger(__name__)
 
 
 def fetch_git_from_path(
     path: pathlib.Path,
-    uow: InMemoryUnitOfWork,
+    uow: AbstractUnitOfWork,
     git_fetcher: GitFetcher,
 ) -> None:
     git_fetcher.get_from_local_path(path=path)
@@ -28,12 +36,32 @@ def fetch_git_from_path(
         for resource in git_fetcher.fetch_all():
             uow.resources[str(path)].add(resource)
 
-    uow.commit()
+        uow.commit()
+
+
+def fetch_git_from_paths(
+    paths: list[pathlib.Path],
+    uow: AbstractUnitOfWork,
+    git_fetcher: GitFetcher,
+) -> list[str]:
+    # every repository, including followed submodules, is stored in its own
+    # location of the unit of work, the locations are returned in order
+    locations = []
+
+    with uow:
+        for path, resources in git_fetcher.fetch_repositories(paths):
+            locations.append(str(path))
+            for resource in resources:
+                uow.resources[str(path)].add(resource)
+
+        uow.commit()
+
+    return locations
 
 
 def fetch_mlflow(
     url: str,
-    uow: InMemoryUnitOfWork,
+    uow: AbstractUnitOfWork,
     mlflow_fetcher: MLflowFetcher,
 ) -> None:
     mlflow_fetcher.tracking_uri = url
@@ -42,23 +70,241 @@ def fetch_mlflow(
         for resource in mlflow_fetcher.fetch_all():
             uow.resources[url].add(resource)
 
-    uow.commit()
+        uow.commit()
+
+
+def save_snapshot(
+    path: pathlib.Path,
+    uow: AbstractUnitOfWork,
+    locations: list[str],
+) -> None:
+    with uow:
+        snapshot.write_snapshot(
+            path,
+            [
+                (location, uow.resources[location].iter_resources())
+                for location in locations
+            ],
+        )
+
+
+def load_snapshot(
+    path: pathlib.Path,
+    uow: AbstractUnitOfWork,
+) -> list[str]:
+    # resources are added to the location they were fetched for, the
+    # locations are returned in the order compile_graph expects them
+    locations = snapshot.read_metadata(path)["locations"]
+
+    with uow:
+        for location, resource in snapshot.read_snapshot(path):
+            uow.resources[location].add(resource)
+
+        uow.commit()
+
+    return locations
+
+
+def restrict_git_to_runs(
+    url: str,
+    uow: AbstractUnitOfWork,
+    git_fetcher: GitFetcher,
+) -> None:
+    # the prov models join git data on the commit and the source file of
+    # each run, everything else in the repository is never referenced
+    runs = uow.resources[url].list_all(Run)
+
+    git_fetcher.restrict_to(
+        commits=(run.source_git_commit for run in runs if run.source_git_commit),
+        paths=(run.source_name for run in runs if run.source_name),
+    )
 
 
 def compile_graph(
     locations: list[str],
-    uow: InMemoryUnitOfWork,
+    uow: AbstractUnitOfWork,
+    workers: int = 1,
+    models: list[str] | None = None,
+    metric_granularity: model.MetricGranularity = model.MetricGranularity.PER_STEP,
+    metric_series: pathlib.Path | None = None,
+    cache: FragmentCache | None = None,
+) -> prov.model.ProvDocument:
+    if workers > 1 and cache is not None:
+        # instances built in worker processes cannot use the cache
+        raise ValueError("A fragment cache cannot be used with several workers.")
+
+    # all but the last location are git repositories, commits referenced by
+    # runs are resolved in whichever repository contains them
+    git_repository = CompositeRepository(
+        [uow.resources[location] for location in locations[:-1]]
+    )
+    mlflow_repository = uow.resources[locations[-1]]
+    # models share the hash tables built by the planner
+    planner = QueryPlanner(git_repository, mlflow_repository)
+
+    # models append to one document, records added by several models are
+    # merged on insertion, so the document is only unified once at the end
+    context = model.ProvContext(
+        prov.model.ProvDocument(),
+        metric_granularity=metric_granularity,
+        metric_series=metric_series,
+    )
+    selected = model.select_models(models)
+    if workers > 1:
+        parallel.build_parallel(planner, context, workers, models=selected)
+    elif cache is not None:
+        for prov_model in selected:
+            for args in planner.execute(prov_model.model.plan):
+                build_instance(prov_model.model, args, context, cache)
+    else:
+        for prov_model in selected:
+            prov_model([git_repository, mlflow_repository], planner, context)
+
+    return operations.dedupe(context.document)
+
+
+def build_instance(
+    model_type: type,
+    args: tuple[Any, ...],
+    context: model.ProvContext,
+    cache: FragmentCache | None = None,
+) -> None:
+    if cache is not None:
+        cache.build(model_type, args, context)
+    else:
+        model_type(*args, shared_context=context).build_prov_model()
+
+
+def update_graph(
+    document: prov.model.ProvDocument,
+    locations: list[str],
+    uow: AbstractUnitOfWork,
+    resources: list[Any],
+    previous: list[Any] | None = None,
+    models: list[str] | None = None,
+    metric_granularity: model.MetricGranularity = model.MetricGranularity.PER_STEP,
+    metric_series: pathlib.Path | None = None,
+    cache: FragmentCache | None = None,
 ) -> prov.model.ProvDocument:
-    document = prov.model.ProvDocument()
+    # resources are the added or changed ones, already stored in the unit of
+    # work, previous holds the changed ones as they were when the document
+    # was built, only the model instances binding one of them are built again
+    previous = previous or []
+    git_repository = CompositeRepository(
+        [uow.resources[location] for location in locations[:-1]]
+    )
+    mlflow_repository = uow.resources[locations[-1]]
+    planner = QueryPlanner(git_repository, mlflow_repository)
+    before = planner.before(resources, previous)
 
-    for prov_model in model.MODELS:
-        model_result = prov_model(
-            [uow.resources[locations[0]], uow.resources[locations[1]]]
+    # the instances built from the previous versions tell which records of
+    # the document are replaced, they never write metric series
+    old, new = (
+        model.ProvContext(
+            prov.model.ProvDocument(),
+            metric_granularity=metric_granularity,
+            metric_series=series,
         )
-        document = operations.merge(graphs=[document, model_result])
-        document = operations.dedupe(graph=document)
+        for series in (None, metric_series)
+    )
+    for prov_model in model.select_models(models):
+        for args in before.execute_affected(prov_model.model.plan, previous):
+            build_instance(prov_model.model, args, old, cache)
+        for args in planner.execute_affected(prov_model.model.plan, resources):
+            build_instance(prov_model.model, args, new, cache)
 
-    return document
+    return operations.patch(
+        document,
+        old.document,
+        new.document,
+        {resource.prov_identifier for resource in [*resources, *previous]},
+    )
+
+
+def same_resource(resource: Any, other: Any) -> bool:
+    # referenced resources are compared by key, comparing them as a whole
+    # would walk the chain of previous revisions recursively
+    field = REFERENCE_FIELDS.get(type(resource))
+    if field is None or type(other) is not type(resource):
+        return resource == other
+    first, second = (
+        reference and resource_key(reference)
+        for reference in (getattr(resource, field), getattr(other, field))
+    )
+    return first == second and all(
+        getattr(resource, f.name) == getattr(other, f.name)
+        for f in dataclasses.fields(resource)
+        if f.name != field
+    )
+
+
+def changed_resources(
+    previous_uow: AbstractUnitOfWork,
+    uow: AbstractUnitOfWork,
+    locations: list[str],
+) -> tuple[list[Any], list[Any]]:
+    # resources added or changed since the previous unit of work was filled,
+    # and the versions of the changed and removed ones stored there, as
+    # update_graph takes them
+    resources, previous = [], []
+    for location in locations:
+        stored = {
+            resource_key(resource): resource
+            for resource in previous_uow.resources[location].iter_resources()
+        }
+        seen = set()
+        for resource in uow.resources[location].iter_resources():
+            key = resource_key(resource)
+            if key in seen:
+                continue
+            seen.add(key)
+            old = stored.pop(key, None)
+            if old is not None and same_resource(resource, old):
+                continue
+            resources.append(resource)
+            if old is not None:
+                previous.append(old)
+        previous.extend(stored.values())
+    return resources, previous
+
+
+def required_resource_types(models: list[str], source: str) -> set[type]:
+    # resources of a source that the selected models read, others are not
+    # fetched at all
+    return resource_types(
+        (prov_model.model.plan for prov_model in model.select_models(models)),
+        source,
+    )
+
+
+def stream_graph(
+    locations: list[str],
+    uow: AbstractUnitOfWork,
+    filename: str,
+    format: SerializationFormat = SerializationFormat.JSON,
+    models: list[str] | None = None,
+    metric_granularity: model.MetricGranularity = model.MetricGranularity.PER_STEP,
+    metric_series: pathlib.Path | None = None,
+    cache: FragmentCache | None = None,
+) -> None:
+    git_repository = CompositeRepository(
+        [uow.resources[location] for location in locations[:-1]]
+    )
+    mlflow_repository = uow.resources[locations[-1]]
+    planner = QueryPlanner(git_repository, mlflow_repository)
+
+    # every model instance builds a document of its own that is written and
+    # dropped right away, the graph is never held in memory as a whole
+    with StreamingWriter(filename=filename, format=format) as writer:
+        for prov_model in model.select_models(models):
+            for args in planner.execute(prov_model.model.plan):
+                context = model.ProvContext(
+                    prov.model.ProvDocument(),
+                    metric_granularity=metric_granularity,
+                    metric_series=metric_series,
+                )
+                build_instance(prov_model.model, args, context, cache)
+                writer.emit(context.document)
 
 
 def transform(
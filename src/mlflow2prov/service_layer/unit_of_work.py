@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import abc
 from collections import defaultdict
+from collections.abc import Mapping
+from pathlib import Path
 
 from mlflow2prov.adapters import repository
 
 
 class AbstractUnitOfWork(abc.ABC):
+    # repositories by location, e.g. a repository path or tracking server url
+    resources: Mapping[str, repository.AbstractRepository]
+
     def __enter__(self) -> AbstractUnitOfWork:
         return self
 
@@ -24,6 +29,9 @@ class AbstractUnitOfWork(abc.ABC):
     def rollback(self):
         raise NotImplementedError
 
+    def close(self):
+        pass
+
     @abc.abstractmethod
     def __eq__(self, other):
         raise NotImplementedError
@@ -49,3 +57,41 @@ class InMemoryUnitOfWork(AbstractUnitOfWork):
         if isinstance(self, other.__class__):
             return self.resources == other.resources
         return False
+
+
+class SqliteRepositories(dict):
+    # creates the repository of a location on first access like a defaultdict
+    def __init__(self, database: repository.SqliteDatabase):
+        super().__init__()
+        self.database = database
+
+    def __missing__(self, namespace: str) -> repository.SqliteRepository:
+        self[namespace] = repository.SqliteRepository(self.database, namespace)
+        return self[namespace]
+
+
+class SqliteUnitOfWork(AbstractUnitOfWork):
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.database = repository.SqliteDatabase(self.path)
+        self.resources = SqliteRepositories(self.database)
+
+    def __enter__(self):
+        return super().__enter__()
+
+    def __exit__(self, *args):
+        super().__exit__(*args)
+
+    def _commit(self):
+        self.database.commit()
+
+    def rollback(self):
+        self.database.rollback()
+
+    def close(self):
+        self.database.close()
+
+    def __eq__(self, other):
+        if isinstance(self, other.__class__):
+            return self.path == other.path
+        return False
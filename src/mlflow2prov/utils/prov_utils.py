@@ -1,3 +1,4 @@
+import functools
 from typing import Sequence
 
 import prov.model
@@ -12,7 +13,18 @@ def document_factory(
     return doc
 
 
-def qualified_name(localpart: str) -> prov.model.QualifiedName:
-    namespace = document_factory().get_default_namespace()
+@functools.cache
+def default_namespace() -> prov.model.Namespace:
+    # one namespace for the whole process instead of one document per name
+    return document_factory().get_default_namespace()
+
+
+@functools.cache
+def element_document() -> prov.model.ProvDocument:
+    # domain objects create their elements on this document, models copy the
+    # elements into their own documents, so it never holds any records
+    return document_factory()
 
-    return prov.model.QualifiedName(namespace=namespace, localpart=localpart)
+
+def qualified_name(localpart: str) -> prov.model.QualifiedName:
+    return prov.model.QualifiedName(namespace=default_namespace(), localpart=localpart)
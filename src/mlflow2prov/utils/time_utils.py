@@ -1,7 +1,9 @@
 import datetime
+from collections.abc import Iterable
 from types import NoneType
 
-import pytz
+UTC = datetime.timezone.utc
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=UTC)
 
 
 def unix_timestamp_to_datetime(msec: int | float | NoneType) -> datetime.datetime:
@@ -12,8 +14,36 @@ def unix_timestamp_to_datetime(msec: int | float | NoneType) -> datetime.datetim
     if msec:
         # If timestamp value is given, we assume it is in UTC time (see also https://github.com/mlflow/mlflow/issues/30#issuecomment-396094191).
         # In the UI, this time may be displayed in local time.
-        return datetime.datetime.fromtimestamp(float(msec or 0.0) / 1000.0).replace(
-            tzinfo=pytz.utc
-        )
+        return EPOCH + datetime.timedelta(milliseconds=msec)
     else:
-        return datetime.datetime.utcfromtimestamp(0.0).replace(tzinfo=pytz.utc)
+        return EPOCH
+
+
+def datetime_to_unix_timestamp(dt: datetime.datetime) -> int:
+    """
+    Converts a datetime object in UTC time to a UNIX/POSIX timestamp in milliseconds.
+    """
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return round((dt - EPOCH).total_seconds() * 1000)
+
+
+def unix_timestamps_to_datetimes(
+    msecs: Iterable[int | float | NoneType],
+) -> list[datetime.datetime]:
+    """
+    Converts UNIX/POSIX timestamps to datetime objects in UTC time in one pass.
+
+    Repeated timestamps, e.g. of metrics logged together, share one datetime.
+    """
+
+    converted: dict[int | float | NoneType, datetime.datetime] = {}
+    datetimes = []
+    for msec in msecs:
+        dt = converted.get(msec)
+        if dt is None:
+            dt = converted[msec] = unix_timestamp_to_datetime(msec)
+        datetimes.append(dt)
+
+    return datetimes
@@ -1,11 +1,18 @@
 import logging
+import pathlib
+import shutil
 import tempfile
 
 import pytest
 from click.testing import CliRunner
 
+from mlflow2prov.adapters.cache import SqliteCache
+from mlflow2prov.adapters.git.cache import GitObjectCache
 from mlflow2prov.entrypoints.cli import cli
 from mlflow2prov.log import LOG_FORMAT, LOG_LEVEL
+from mlflow2prov.prov.cache import FragmentCache
+from mlflow2prov.service_layer.services import read
+from mlflow2prov.service_layer.unit_of_work import SqliteUnitOfWork
 from tests.test_config import expected_config_data, invalid_config_data
 from tests.test_git_fetcher import path_testproject_git_repo
 
@@ -194,3 +201,435 @@ class TestCli:
         )
 
         assert result.exit_code == 0
+
+    def test_extract_run_relevant_only(self):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli,
+            [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--run_relevant_only",
+            ],
+        )
+
+        assert result.exit_code == 0
+
+    def test_extract_with_history_window(self):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli,
+            [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--since",
+                "2023-01-01",
+                "--max_count",
+                "5",
+                "--ref",
+                "HEAD",
+            ],
+        )
+
+        assert result.exit_code == 0
+
+    def test_extract_with_git_cache(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            args = [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--git_cache",
+                f"{tmpdir}/cache.sqlite",
+            ]
+            runner.invoke(cli, args)
+            result = runner.invoke(cli, args)
+
+            assert result.exit_code == 0
+            assert "0 misses" in result.output
+
+    def test_extract_multiple_repositories(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / ".git"
+            shutil.copytree(path_testproject_git_repo, path)
+            result = runner.invoke(
+                cli,
+                [
+                    "extract",
+                    "--repository_path",
+                    f"{path_testproject_git_repo}",
+                    "--repository_path",
+                    f"{path}",
+                    "--mlflow_url",
+                    "http://localhost:5000",
+                    "--follow_submodules",
+                    "--git_workers",
+                    "2",
+                ],
+            )
+
+            assert result.exit_code == 0
+
+    def test_extract_stream_to(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = runner.invoke(
+                cli,
+                [
+                    "extract",
+                    "--repository_path",
+                    f"{path_testproject_git_repo}",
+                    "--mlflow_url",
+                    "http://localhost:5000",
+                    "--stream_to",
+                    f"{tmpdir}/graph.provn",
+                    "--stream_format",
+                    "provn",
+                ],
+            )
+
+            assert result.exit_code == 0
+            with open(f"{tmpdir}/graph.provn") as f:
+                assert f.read().startswith("document")
+
+    def test_extract_with_selected_models(self):
+        runner = CliRunner()
+
+        result = runner.invoke(
+            cli,
+            [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--model",
+                "ExperimentAdditionModel",
+                "--model",
+                "RunAdditionModel",
+            ],
+        )
+
+        assert result.exit_code == 0
+
+    def test_extract_with_unknown_model(self):
+        runner = CliRunner()
+
+        result = runner.invoke(
+            cli,
+            [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--model",
+                "UnknownModel",
+            ],
+        )
+
+        assert result.exit_code != 0
+
+    def test_extract_with_metric_granularity(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = runner.invoke(
+                cli,
+                [
+                    "extract",
+                    "--repository_path",
+                    f"{path_testproject_git_repo}",
+                    "--mlflow_url",
+                    "http://localhost:5000",
+                    "--metric_granularity",
+                    "summary",
+                    "--metric_series",
+                    f"{tmpdir}/series",
+                ],
+            )
+
+            assert result.exit_code == 0
+
+    def test_extract_with_metric_series_per_step(self):
+        runner = CliRunner()
+
+        result = runner.invoke(
+            cli,
+            [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--metric_series",
+                "series",
+            ],
+        )
+
+        assert result.exit_code != 0
+
+    def test_extract_with_fragment_cache(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for _ in range(2):
+                result = runner.invoke(
+                    cli,
+                    [
+                        "extract",
+                        "--repository_path",
+                        f"{path_testproject_git_repo}",
+                        "--mlflow_url",
+                        "http://localhost:5000",
+                        "--fragment_cache",
+                        f"{tmpdir}/fragments.sqlite",
+                    ],
+                )
+
+                assert result.exit_code == 0
+            assert "Fragment cache: " in result.output
+            assert " 0 misses" in result.output
+
+    def test_extract_closes_caches_on_error(self, mocker):
+        runner = CliRunner()
+        close = mocker.spy(SqliteCache, "close")
+        mocker.patch(
+            "mlflow2prov.service_layer.services.compile_graph",
+            side_effect=RuntimeError,
+        )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = runner.invoke(
+                cli,
+                [
+                    "extract",
+                    "--repository_path",
+                    f"{path_testproject_git_repo}",
+                    "--mlflow_url",
+                    "http://localhost:5000",
+                    "--git_cache",
+                    f"{tmpdir}/git.sqlite",
+                    "--fragment_cache",
+                    f"{tmpdir}/fragments.sqlite",
+                ],
+            )
+
+        assert isinstance(result.exception, RuntimeError)
+        assert [type(call.args[0]) for call in close.call_args_list] == [
+            GitObjectCache,
+            FragmentCache,
+        ]
+
+    def test_extract_with_fragment_cache_and_compile_workers(self):
+        runner = CliRunner()
+
+        result = runner.invoke(
+            cli,
+            [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--fragment_cache",
+                "fragments.sqlite",
+                "--compile_workers",
+                "2",
+            ],
+        )
+
+        assert result.exit_code != 0
+
+    def test_extract_stream_to_and_compile_workers(self):
+        runner = CliRunner()
+
+        result = runner.invoke(
+            cli,
+            [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--stream_to",
+                "-",
+                "--compile_workers",
+                "2",
+            ],
+        )
+
+        assert result.exit_code != 0
+        assert "--stream_to cannot be combined" in result.output
+
+    def test_extract_with_database(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            args = [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--database",
+                f"{tmpdir}/resources.sqlite",
+            ]
+            result = runner.invoke(cli, args)
+
+            assert result.exit_code == 0
+            assert pathlib.Path(f"{tmpdir}/resources.sqlite").exists()
+
+            result = runner.invoke(cli, args)
+
+            assert result.exit_code != 0
+            assert "already exists" in result.output
+
+    def test_extract_closes_database(self, mocker):
+        runner = CliRunner()
+        close = mocker.spy(SqliteUnitOfWork, "close")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            args = [
+                "extract",
+                "--repository_path",
+                f"{path_testproject_git_repo}",
+                "--mlflow_url",
+                "http://localhost:5000",
+                "--database",
+            ]
+            result = runner.invoke(cli, [*args, f"{tmpdir}/resources.sqlite"])
+
+            assert result.exit_code == 0
+            assert close.call_count == 1
+
+            mocker.patch(
+                "mlflow2prov.service_layer.services.compile_graph",
+                side_effect=RuntimeError,
+            )
+            result = runner.invoke(cli, [*args, f"{tmpdir}/other.sqlite"])
+
+            assert isinstance(result.exception, RuntimeError)
+            assert close.call_count == 2
+
+    def test_extract_with_snapshot(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = runner.invoke(
+                cli,
+                [
+                    "extract",
+                    "--repository_path",
+                    f"{path_testproject_git_repo}",
+                    "--mlflow_url",
+                    "http://localhost:5000",
+                    "--to_snapshot",
+                    f"{tmpdir}/resources.snapshot",
+                ],
+            )
+
+            assert result.exit_code == 0
+            assert pathlib.Path(f"{tmpdir}/resources.snapshot").exists()
+
+            result = runner.invoke(
+                cli,
+                ["extract", "--from_snapshot", f"{tmpdir}/resources.snapshot"],
+            )
+
+            assert result.exit_code == 0
+
+            result = runner.invoke(cli, ["extract"])
+
+            assert result.exit_code != 0
+            assert "--from_snapshot" in result.output
+
+    def test_extract_from_graph(self):
+        runner = CliRunner()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            snapshot = f"{tmpdir}/resources.snapshot"
+            result = runner.invoke(
+                cli,
+                [
+                    "extract",
+                    "--repository_path",
+                    f"{path_testproject_git_repo}",
+                    "--mlflow_url",
+                    "http://localhost:5000",
+                    "--to_snapshot",
+                    snapshot,
+                    "save",
+                    "--output",
+                    f"{tmpdir}/graph",
+                ],
+            )
+
+            assert result.exit_code == 0
+
+            args = ["extract", "--from_snapshot", snapshot]
+            result = runner.invoke(
+                cli,
+                [
+                    *args,
+                    "--from_graph",
+                    f"{tmpdir}/graph.json",
+                    "--previous_snapshot",
+                    snapshot,
+                    "save",
+                    "--output",
+                    f"{tmpdir}/updated",
+                ],
+            )
+
+            assert result.exit_code == 0
+
+            # the document is compared after the same read and write round trip
+            result = runner.invoke(
+                cli,
+                [
+                    "load",
+                    "--input",
+                    f"{tmpdir}/graph.json",
+                    "save",
+                    "--output",
+                    f"{tmpdir}/loaded",
+                ],
+            )
+
+            assert result.exit_code == 0
+            assert read(f"{tmpdir}/updated.json") == read(f"{tmpdir}/loaded.json")
+
+            result = runner.invoke(cli, [*args, "--from_graph", f"{tmpdir}/graph.json"])
+
+            assert result.exit_code != 0
+            assert "must be given together" in result.output
+
+            result = runner.invoke(
+                cli,
+                [
+                    *args,
+                    "--from_graph",
+                    f"{tmpdir}/graph.json",
+                    "--previous_snapshot",
+                    snapshot,
+                    "--stream_to",
+                    "-",
+                ],
+            )
+
+            assert result.exit_code != 0
+            assert "--from_graph cannot be combined" in result.output
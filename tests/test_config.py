@@ -40,16 +40,146 @@ expected_schema_data = """
                     "type": "object",
                     "properties": {
                         "repository_path": {
-                            "type": "string"
+                            "anyOf": [
+                                {
+                                    "type": "string"
+                                },
+                                {
+                                    "type": "array",
+                                    "items": {
+                                        "type": "string"
+                                    }
+                                }
+                            ]
                         },
                         "mlflow_url": {
                             "type": "string"
+                        },
+                        "run_relevant_only": {
+                            "type": "boolean"
+                        },
+                        "lazy_runs": {
+                            "type": "boolean"
+                        },
+                        "run_batch_size": {
+                            "type": "integer",
+                            "minimum": 1
+                        },
+                        "since": {
+                            "type": "string"
+                        },
+                        "until": {
+                            "type": "string"
+                        },
+                        "max_count": {
+                            "type": "integer",
+                            "minimum": 0
+                        },
+                        "ref": {
+                            "type": "array",
+                            "items": {
+                                "type": "string"
+                            }
+                        },
+                        "git_cache": {
+                            "type": "string"
+                        },
+                        "git_cache_max_entries": {
+                            "type": "integer",
+                            "minimum": 1
+                        },
+                        "stream_logs": {
+                            "type": "boolean"
+                        },
+                        "write_commit_graph": {
+                            "type": "boolean"
+                        },
+                        "follow_submodules": {
+                            "type": "boolean"
+                        },
+                        "git_workers": {
+                            "type": "integer",
+                            "minimum": 1
+                        },
+                        "model": {
+                            "type": "array",
+                            "items": {
+                                "type": "string",
+                                "enum": [
+                                    "FileAdditionModel",
+                                    "FileModificationModel",
+                                    "FileDeletionModel",
+                                    "ExperimentAdditionModel",
+                                    "ExperimentDeletionModel",
+                                    "RunAdditionModel",
+                                    "RunDeletionModel",
+                                    "RegisteredModelAdditionModel",
+                                    "RegisteredModelVersionAdditionModel",
+                                    "RegisteredModelVersionDeletionModel"
+                                ]
+                            }
+                        },
+                        "compile_workers": {
+                            "type": "integer",
+                            "minimum": 1
+                        },
+                        "fragment_cache": {
+                            "type": "string"
+                        },
+                        "fragment_cache_max_entries": {
+                            "type": "integer",
+                            "minimum": 1
+                        },
+                        "metric_granularity": {
+                            "type": "string",
+                            "enum": [
+                                "per-step",
+                                "last",
+                                "summary"
+                            ]
+                        },
+                        "metric_series": {
+                            "type": "string"
+                        },
+                        "database": {
+                            "type": "string"
+                        },
+                        "to_snapshot": {
+                            "type": "string"
+                        },
+                        "from_snapshot": {
+                            "type": "string"
+                        },
+                        "from_graph": {
+                            "type": "string"
+                        },
+                        "previous_snapshot": {
+                            "type": "string"
+                        },
+                        "stream_to": {
+                            "type": "string"
+                        },
+                        "stream_format": {
+                            "type": "string",
+                            "enum": [
+                                "json",
+                                "provn"
+                            ]
                         }
                     },
                     "additionalProperties": false,
-                    "required": [
-                        "repository_path",
-                        "mlflow_url"
+                    "anyOf": [
+                        {
+                            "required": [
+                                "repository_path",
+                                "mlflow_url"
+                            ]
+                        },
+                        {
+                            "required": [
+                                "from_snapshot"
+                            ]
+                        }
                     ]
                 }
             },
@@ -301,6 +431,20 @@ class TestConfig:
 
             assert parsed_config == expected_parsed_config
 
+    def test_parse_int_and_bool_literals(self):
+        test_config = """
+        - extract:
+                max_count: 10
+                run_relevant_only: false
+        """
+
+        with tempfile.NamedTemporaryFile(mode="r+", encoding="utf-8") as tmpfile:
+            tmpfile.write(test_config)
+            tmpfile.seek(0)
+            config = Config.read(tmpfile.name)
+
+            assert config.parse() == ["extract", "--max_count", "10"]
+
     def test_parse_if_literal_type_unknown(self):
         test_config = """
         - check:
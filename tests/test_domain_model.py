@@ -1,11 +1,16 @@
 import datetime
+import io
+import pickle
 import random
+import sys
 import urllib.parse
 
 import prov.model
+import pytest
 
 from mlflow2prov.domain.constants import ProvRole, ProvType
 from mlflow2prov.domain.model import (
+    AbstractRunLoader,
     Artifact,
     Commit,
     Creation,
@@ -14,8 +19,11 @@ from mlflow2prov.domain.model import (
     ExperimentTag,
     File,
     FileRevision,
+    LazyField,
     LifecycleStage,
     Metric,
+    MetricStore,
+    MetricSummary,
     ModelArtifact,
     Param,
     RegisteredModel,
@@ -29,7 +37,13 @@ from mlflow2prov.domain.model import (
     SourceType,
     User,
 )
-from mlflow2prov.utils.prov_utils import document_factory, qualified_name
+from mlflow2prov.utils.prov_utils import (
+    default_namespace,
+    document_factory,
+    element_document,
+    qualified_name,
+)
+from mlflow2prov.utils.time_utils import unix_timestamp_to_datetime
 from tests.utils import random_suffix
 
 today = datetime.datetime.now()
@@ -38,6 +52,94 @@ next_week = today + datetime.timedelta(days=7)
 tomorrow = today + datetime.timedelta(days=1)
 
 
+class TestSlots:
+    def test_domain_objects_are_slotted(self):
+        user = User(name="name", email="email")
+        revision = FileRevision(name="name", path="path", commit="sha", status="M")
+
+        for obj in (user, revision):
+            assert not hasattr(obj, "__dict__")
+            with pytest.raises(AttributeError):
+                obj.undeclared = None  # type: ignore
+
+        assert all(
+            "__slots__" in vars(cls)
+            for cls in (
+                Artifact,
+                Commit,
+                Experiment,
+                File,
+                FileRevision,
+                Metric,
+                ModelArtifact,
+                Param,
+                Run,
+                RunTag,
+            )
+        )
+
+
+class TestMemoization:
+    def test_identifiers_are_memoized(self):
+        metric = Metric(run_id="run", name="name", value=1.0, timestamp=today, step=1)
+        copy = Metric(run_id="run", name="name", value=2.0, timestamp=today, step=1)
+
+        assert metric.prov_identifier is metric.prov_identifier
+        assert copy.prov_identifier is metric.prov_identifier
+        assert metric.prov_identifier == qualified_name(
+            "Metric?run_id=run&name=name&step=1"
+        )
+
+    def test_identifiers_follow_changed_fields(self):
+        metric = Metric(run_id="run", name="name", value=1.0, timestamp=today, step=1)
+        identifier = metric.prov_identifier
+
+        metric.step = 2
+
+        assert metric.prov_identifier != identifier
+
+    def test_derived_activities_are_memoized(self):
+        creation = Creation(
+            uid="uid", resource_type=ProvType.RUN, start_time=today, end_time=None
+        )
+        deletion = Deletion(
+            uid="uid", resource_type=ProvType.RUN, start_time=today, end_time=today
+        )
+        run = Run(
+            run_id="uid",
+            name="name",
+            experiment_id="experiment",
+            user=None,
+            status=RunStatus.FINISHED,
+            start_time=today,
+            end_time=None,
+            lifecycle_stage=None,
+            artifact_uri=None,
+            metrics=None,
+            params=None,
+            tags=None,
+            artifacts=None,
+            model_artifacts=None,
+            note=None,
+            source_type=None,
+            source_name=None,
+            source_git_commit=None,
+            source_git_branch=None,
+            source_git_repo_url=None,
+        )
+
+        assert run.creation is run.creation
+        assert run.creation == creation
+        run.end_time = today
+        assert run.deletion is run.deletion
+        assert run.deletion == deletion
+
+    def test_namespace_singleton(self):
+        assert default_namespace() is default_namespace()
+        assert element_document() is element_document()
+        assert default_namespace() == document_factory().get_default_namespace()
+
+
 class TestUser:
     def test_email_normalization(self):
         name = f"user-name-{random_suffix()}"
@@ -901,6 +1003,150 @@ class TestMetric:
         assert metric.to_prov() == expected_prov_entity
 
 
+class TestMetricStore:
+    def points(self, count: int) -> list[tuple[str, float, int, int]]:
+        # two metrics, logged alternately
+        return [
+            (f"metric-{n % 2}", float(n), 1_600_000_000_000 + n, n // 2)
+            for n in range(count)
+        ]
+
+    def test_metric_views(self):
+        run_id = f"run-id-{random_suffix()}"
+        points = self.points(6)
+
+        store = MetricStore.from_points(run_id, points)
+
+        assert len(store) == 6
+        assert store.names == ["metric-0", "metric-1"]
+        assert list(store) == [
+            Metric(
+                run_id=run_id,
+                name=name,
+                value=value,
+                timestamp=unix_timestamp_to_datetime(timestamp),
+                step=step,
+            )
+            for name, value, timestamp, step in points
+        ]
+        assert store[-1] == list(store)[-1]
+        assert store == list(store)
+        with pytest.raises(IndexError):
+            store[6]
+
+    def test_codes(self):
+        store = MetricStore.from_points("run", self.points(4)).downsample(1)
+        store.append("metric-1", 4.0, 0, 2)
+        store.append("metric-2", 5.0, 0, 2)
+
+        assert store.names == ["metric-0", "metric-1", "metric-2"]
+        assert list(store.codes) == [0, 1, 1, 2]
+        assert pickle.loads(pickle.dumps(store)).code("metric-2") == 2
+
+    def test_last_values(self):
+        store = MetricStore.from_points("run", self.points(7))
+        store.append("metric-1", 42.0, 0, 0)
+
+        assert store.last_values() == {"metric-0": 6.0, "metric-1": 5.0}
+
+    def test_from_metrics(self):
+        store = MetricStore.from_points("run", self.points(6))
+
+        assert MetricStore.from_metrics("run", list(store)) == store
+
+    def test_last_metrics(self):
+        store = MetricStore.from_points("run", self.points(7))
+        store.append("metric-1", 42.0, 0, 0)
+
+        assert [(m.name, m.value, m.step) for m in store.last_metrics()] == [
+            ("metric-0", 6.0, 3),
+            ("metric-1", 5.0, 2),
+        ]
+
+    def test_summaries(self):
+        store = MetricStore.from_points("run", self.points(7))
+        store.append("metric-1", 42.0, 0, 0)
+
+        assert store.summaries(series="series.csv") == [
+            MetricSummary("run", "metric-0", 4, 0.0, 6.0, 6.0, 0, 3, "series.csv"),
+            MetricSummary("run", "metric-1", 4, 1.0, 42.0, 5.0, 0, 2, "series.csv"),
+        ]
+        assert MetricStore("run").summaries() == []
+
+    def test_write_csv(self):
+        store = MetricStore.from_points("run", self.points(3))
+        fp = io.StringIO()
+
+        store.write_csv(fp)
+
+        assert fp.getvalue().splitlines() == [
+            "name,step,timestamp,value",
+            "metric-0,0,1600000000000,0.0",
+            "metric-1,0,1600000000001,1.0",
+            "metric-0,1,1600000000002,2.0",
+        ]
+
+    def test_downsample(self):
+        store = MetricStore.from_points("run", self.points(200))
+
+        sampled = store.downsample(10)
+
+        assert len(sampled) == 20
+        assert sampled.last_values() == store.last_values()
+        assert [m.step for m in sampled if m.name == "metric-0"][0] == 0
+        assert len(store.downsample(1000)) == 200
+        assert len(store.downsample(1)) == 2
+        with pytest.raises(ValueError):
+            store.downsample(0)
+
+    def test_pickle(self):
+        store = MetricStore.from_points("run", self.points(10))
+
+        assert pickle.loads(pickle.dumps(store)) == store
+
+    def test_memory_per_point(self):
+        store = MetricStore.from_points("run", self.points(10_000))
+
+        columns = (store.codes, store.values, store.steps, store.timestamps)
+        assert sum(sys.getsizeof(column) for column in columns) / len(store) < 40
+
+
+class TestLazyField:
+    class Loader(AbstractRunLoader):
+        def __init__(self):
+            self.calls = 0
+
+        def load(self, run_id: str, name: str):
+            self.calls += 1
+            return [Param(run_id=run_id, name=name, value="value")]
+
+    def test_load_on_first_access(self):
+        loader = self.Loader()
+        field = LazyField(loader, "run", "params")
+
+        assert not field.is_loaded
+        assert "LazyField" in repr(field)
+        assert loader.calls == 0
+
+        assert len(field) == 1
+        assert list(field) == [Param(run_id="run", name="params", value="value")]
+        assert field[0].run_id == "run"
+        assert field.is_loaded
+        assert loader.calls == 1
+
+    def test_eq(self):
+        field = LazyField(self.Loader(), "run", "params")
+
+        assert field == [Param(run_id="run", name="params", value="value")]
+        assert field == LazyField(self.Loader(), "run", "params")
+        assert not field == LazyField(self.Loader(), "other", "params")
+
+    def test_pickle_stores_loaded_value(self):
+        field = LazyField(self.Loader(), "run", "params")
+
+        assert pickle.loads(pickle.dumps(field)) == field.get()
+
+
 class TestParam:
     def test_prov_identifier(self):
         run_id = f"run-id-{random_suffix()}"
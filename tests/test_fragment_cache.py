@@ -0,0 +1,131 @@
+import datetime
+import pathlib
+import tempfile
+
+import prov.model
+
+from mlflow2prov.adapters.cache import CacheStatistics
+from mlflow2prov.domain.model import File, FileRevision, LifecycleStage, MetricStore
+from mlflow2prov.prov import operations
+from mlflow2prov.prov.cache import FragmentCache
+from mlflow2prov.prov.model import (
+    FileAdditionModel,
+    FileModificationModel,
+    MetricGranularity,
+    ProvContext,
+)
+from tests.test_parallel import planner
+from tests.test_prov_model import CountingRunLoader, create_lazy_run
+
+
+class Offset(datetime.tzinfo):
+    # like the time zones of git commits, the repr holds the address
+    def utcoffset(self, dt):
+        return datetime.timedelta(hours=2)
+
+
+class TestFragmentCache:
+    def test_key(self):
+        run = create_lazy_run(CountingRunLoader(), LifecycleStage.ACTIVE)
+        run.metrics = MetricStore.from_points(run.run_id, [("loss", 1.0, 0, 0)])
+        context = ProvContext(prov.model.ProvDocument())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with FragmentCache(pathlib.Path(tmpdir) / "cache.sqlite") as cache:
+                key = cache.key(FileAdditionModel, (run,), context)
+
+                assert cache.key(FileAdditionModel, (run,), context) == key
+                assert cache.key(FileAdditionModel, (None,), context) != key
+                assert (
+                    cache.key(
+                        FileAdditionModel,
+                        (run,),
+                        ProvContext(
+                            prov.model.ProvDocument(),
+                            metric_granularity=MetricGranularity.LAST,
+                        ),
+                    )
+                    != key
+                )
+
+                run.start_time = datetime.datetime(2023, 1, 1, tzinfo=Offset())
+                key = cache.key(FileAdditionModel, (run,), context)
+                run.start_time = datetime.datetime(2023, 1, 1, tzinfo=Offset())
+                assert cache.key(FileAdditionModel, (run,), context) == key
+
+                run.metrics.append("loss", 0.5, 0, 1)
+                assert cache.key(FileAdditionModel, (run,), context) != key
+
+    def test_key_of_revision_history(self):
+        file = File(name="train.py", path="train.py", commit="sha-0")
+        history = [
+            FileRevision("train.py", "train.py", "sha-0", "A", file=file),
+        ]
+        for n in range(1, 2000):
+            history.append(
+                FileRevision(
+                    "train.py",
+                    "train.py",
+                    f"sha-{n}",
+                    "M",
+                    file=file,
+                    previous=history[-1],
+                )
+            )
+        revision = history[-1]
+        context = ProvContext(prov.model.ProvDocument())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with FragmentCache(pathlib.Path(tmpdir) / "cache.sqlite") as cache:
+                # the history behind the previous revision is not hashed
+                key = cache.key(FileModificationModel, (revision,), context)
+                history[0].status = "M"
+                assert cache.key(FileModificationModel, (revision,), context) == key
+
+                revision.previous.status = "D"
+                assert cache.key(FileModificationModel, (revision,), context) != key
+
+    def test_get_and_put(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with FragmentCache(pathlib.Path(tmpdir) / "cache.sqlite") as cache:
+                assert cache.get("key") is None
+
+                cache.put("key", [])
+
+                assert cache.get("key") == []
+                assert cache.statistics == CacheStatistics(hits=1, misses=1)
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "cache.sqlite"
+            with FragmentCache(path, max_entries=2) as cache:
+                for key in ("first", "second", "third"):
+                    cache.put(key, [])
+                cache.flush()
+
+                assert cache.statistics.evictions == 1
+                assert cache.get("first") is None
+                assert cache.get("third") == []
+
+    def test_build(self):
+        rows = list(planner().execute(FileAdditionModel.plan))
+
+        expected = ProvContext(prov.model.ProvDocument())
+        for args in rows:
+            FileAdditionModel(*args, shared_context=expected).build_prov_model()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "cache.sqlite"
+            documents = []
+            for _ in range(2):
+                with FragmentCache(path) as cache:
+                    context = ProvContext(prov.model.ProvDocument())
+                    for args in rows:
+                        cache.build(FileAdditionModel, args, context)
+                    documents.append(operations.dedupe(context.document))
+
+            # the second build loads every instance from the file
+            assert cache.statistics == CacheStatistics(hits=len(rows))
+
+        built = operations.dedupe(expected.document)
+        assert documents == [built, built]
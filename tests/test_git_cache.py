@@ -0,0 +1,91 @@
+import datetime
+import pathlib
+import tempfile
+
+import git.repo
+
+from mlflow2prov.adapters.cache import CacheStatistics
+from mlflow2prov.adapters.git.cache import (
+    GitObjectCache,
+    deserialize_commit,
+    serialize_commit,
+)
+from mlflow2prov.adapters.git.fetcher import extract_commits, extract_files
+from mlflow2prov.domain.model import Commit, User
+from tests.test_git_fetcher import path_testproject_git_repo
+from tests.utils import random_suffix
+
+
+def create_commit() -> Commit:
+    now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=2)))
+    return Commit(
+        sha=f"commit-hash-{random_suffix()}",
+        title=f"commit-title-{random_suffix()}",
+        message=f"commit-message-{random_suffix()}",
+        author=User(name="author", email="author@domain.com", prov_role="Author"),
+        committer=None,
+        parents=[f"commit-hash-{random_suffix()}"],
+        authored_at=now,
+        committed_at=now,
+    )
+
+
+class TestCacheStatistics:
+    def test_hit_rate(self):
+        assert CacheStatistics().hit_rate == 0.0
+        assert CacheStatistics(hits=3, misses=1).hit_rate == 0.75
+
+
+class TestGitObjectCache:
+    def test_serialize_commit(self):
+        commit = create_commit()
+
+        assert deserialize_commit(commit.sha, serialize_commit(commit)) == commit
+
+    def test_get_and_put(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with GitObjectCache(pathlib.Path(tmpdir) / "cache.sqlite") as cache:
+                commit = create_commit()
+
+                assert cache.get_commit(commit.sha) is None
+                assert cache.get_diff(commit.sha) is None
+
+                cache.put_commit(commit)
+                cache.put_diff(commit.sha, [("A", "train.py")])
+
+                assert cache.get_commit(commit.sha) == commit
+                assert cache.get_diff(commit.sha) == [("A", "train.py")]
+                assert cache.statistics == CacheStatistics(hits=2, misses=2)
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "cache.sqlite"
+            with GitObjectCache(path, max_entries=2) as cache:
+                commits = [create_commit() for _ in range(3)]
+                for commit in commits:
+                    cache.put_commit(commit)
+                cache.flush()
+
+                assert cache.statistics.evictions == 1
+                assert cache.get_commit(commits[0].sha) is None
+                assert cache.get_commit(commits[2].sha) == commits[2]
+
+    def test_reuse_across_fetches(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "cache.sqlite"
+
+            with GitObjectCache(path) as cache:
+                commits = list(extract_commits(repo, cache=cache))
+                files = list(extract_files(repo, cache=cache))
+
+                assert cache.statistics.hits == 0
+
+            with GitObjectCache(path) as cache:
+                assert list(extract_commits(repo, cache=cache)) == commits
+                assert list(extract_files(repo, cache=cache)) == files
+                assert cache.statistics.misses == 0
+
+            assert commits == list(extract_commits(repo))
+            assert files == list(extract_files(repo))
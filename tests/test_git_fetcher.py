@@ -1,14 +1,26 @@
 import os
 import pathlib
+import shutil
+import sys
 
+import git
 import git.repo
 
 from mlflow2prov.adapters.git.fetcher import (
     GitFetcher,
+    HistoryWindow,
+    commits_in_window,
+    discover_repositories,
     extract_commits,
     extract_files,
     extract_revisions,
+    has_commit_graph,
+    is_relevant_path,
+    parse_log,
+    pathspecs,
+    revision_range,
 )
+from mlflow2prov.domain.model import Commit
 
 path_testproject_git_repo = pathlib.Path(
     os.path.join(
@@ -56,3 +68,227 @@ class TestGitFetcher:
 
         for resource in fetcher.fetch_all():
             pass
+
+    def test_fetch_all_restricted_to_resource_types(self):
+        fetcher = GitFetcher(resource_types={Commit})
+        fetcher.get_from_local_path(path_testproject_git_repo)
+
+        resources = list(fetcher.fetch_all())
+
+        assert resources
+        assert all(isinstance(resource, Commit) for resource in resources)
+
+    def test_revision_range(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+        sha = repo.head.commit.hexsha
+
+        assert revision_range(repo, None) == ["--all"]
+        assert revision_range(repo, {sha, "unknown-sha"}) == [sha]
+        assert revision_range(repo, set()) == []
+
+    def test_is_relevant_path(self):
+        assert is_relevant_path("src/train.py", None)
+        assert is_relevant_path("src/train.py", {"train.py"})
+        assert is_relevant_path("src/train.py", {"src/train.py"})
+        assert not is_relevant_path("src/train.py", {"conda.yaml"})
+
+    def test_extract_commits_restricted_to_ancestry(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+        head = repo.head.commit
+
+        commits = list(extract_commits(repo, commits={head.hexsha}))
+
+        assert [c.sha for c in commits] == [
+            c.hexsha for c in repo.iter_commits(head.hexsha)
+        ]
+        assert list(extract_commits(repo, commits={"unknown-sha"})) == []
+
+    def test_extract_revisions_restricted_to_paths(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+
+        revisions = list(extract_revisions(repo, commits=None, paths={"train.py"}))
+
+        assert revisions
+        assert all(r.file.name == "train.py" for r in revisions)  # type: ignore
+        assert len(revisions) < len(list(extract_revisions(repo)))
+
+    def test_extract_revisions_interns_strings(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+
+        revisions = list(extract_revisions(repo, commits=None, paths={"train.py"}))
+
+        assert revisions
+        assert all(r.path is sys.intern(r.path) for r in revisions)
+        assert all(r.commit is sys.intern(r.commit) for r in revisions)
+
+    def test_restrict_to(self):
+        fetcher = GitFetcher()
+        fetcher.restrict_to(commits=["a", "b", "a"], paths=["train.py"])
+
+        assert fetcher.commits == {"a", "b"}
+        assert fetcher.paths == {"train.py"}
+
+    def test_history_window_options(self):
+        window = HistoryWindow(since="2023-01-01", max_count=5)
+
+        assert window.is_bounded()
+        assert not HistoryWindow().is_bounded()
+        assert window.options() == {"since": "2023-01-01", "max_count": 5}
+        assert window.options(limit=False) == {"since": "2023-01-01"}
+
+    def test_extract_with_max_count(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+        window = HistoryWindow(max_count=3)
+
+        commits = list(extract_commits(repo, window=window))
+        shas = {c.sha for c in commits}
+
+        assert len(commits) == 3
+        assert commits_in_window(repo, None, window) == shas
+        for f in extract_files(repo, window=window):
+            assert f.commit in shas
+        for r in extract_revisions(repo, window=window):
+            assert r.commit in shas
+            assert r.previous is None or r.previous.commit in shas
+
+    def test_extract_with_window_after_file_addition(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+        window = HistoryWindow(since="2023-01-01")
+        added = repo.git.log("--diff-filter=A", "--format=%H", "--", "train.py")
+
+        assert list(extract_files(repo, window=window)) == []
+        [revision] = list(extract_revisions(repo, window=window))
+        assert revision.path == "train.py"
+        assert revision.status == "M"
+        assert revision.commit in commits_in_window(repo, None, window)
+        assert revision.file.commit == added
+        assert revision.previous is None
+
+    def test_extract_with_refs(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+        head = repo.head.commit
+        window = HistoryWindow(refs=[head.hexsha])
+
+        assert [c.sha for c in extract_commits(repo, window=window)] == [
+            c.hexsha for c in repo.iter_commits(head.hexsha)
+        ]
+
+    def test_extract_with_empty_window(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+        window = HistoryWindow(until="1970-01-02")
+
+        assert list(extract_commits(repo, window=window)) == []
+        assert list(extract_revisions(repo, window=window)) == []
+
+    def test_parse_log(self):
+        sha1, sha2 = "a" * 40, "b" * 40
+        log = f"{sha1}\nM\ttrain.py\n\n{sha2}\nA\ttrain.py\n"
+
+        expected = [("train.py", sha1, "M"), ("train.py", sha2, "A")]
+        assert list(parse_log(log)) == expected
+        assert list(parse_log(iter(log.splitlines(keepends=True)))) == expected
+
+    def test_stream_logs_fetch_all(self):
+        with GitFetcher() as fetcher:
+            fetcher.get_from_local_path(path_testproject_git_repo)
+            expected = list(fetcher.fetch_all())
+        with GitFetcher(stream_logs=True) as fetcher:
+            fetcher.get_from_local_path(path_testproject_git_repo)
+            resources = list(fetcher.fetch_all())
+
+        assert resources == expected
+
+    def test_extract_revisions_streaming(self):
+        repo = git.repo.Repo(path_testproject_git_repo)
+
+        for window in (None, HistoryWindow(max_count=1)):
+            expected = list(extract_revisions(repo, window=window))
+            revisions = list(extract_revisions(repo, window=window, streaming=True))
+            assert revisions == expected
+            assert [r.previous for r in revisions] == [r.previous for r in expected]
+
+    def test_pathspecs(self):
+        assert pathspecs(["src/train.py", "a*.py", ""]) == [
+            ":(literal)a*.py",
+            ":(glob)**/a\\*.py",
+            ":(literal)src/train.py",
+        ]
+
+    def test_generate_commit_graph(self, tmp_path):
+        path = tmp_path / ".git"
+        shutil.copytree(path_testproject_git_repo, path)
+
+        with GitFetcher() as fetcher:
+            fetcher.get_from_local_path(path)
+            assert not fetcher.commit_graph
+        with GitFetcher(generate_commit_graph=True) as fetcher:
+            fetcher.get_from_local_path(path)
+            assert fetcher.commit_graph
+            assert has_commit_graph(fetcher.repo)
+
+    def test_extract_with_commit_graph(self, tmp_path):
+        path = tmp_path / ".git"
+        shutil.copytree(path_testproject_git_repo, path)
+        with GitFetcher(generate_commit_graph=True) as fetcher:
+            fetcher.get_from_local_path(path)
+        repo = git.repo.Repo(path)
+
+        files = list(extract_files(repo))
+        paths = {files[0].path, files[-1].name, "missing.py"}
+        for window in (None, HistoryWindow(max_count=3)):
+            assert list(
+                extract_files(repo, paths=paths, window=window, commit_graph=True)
+            ) == list(extract_files(repo, paths=paths, window=window))
+            assert list(
+                extract_revisions(repo, paths=paths, window=window, commit_graph=True)
+            ) == list(extract_revisions(repo, paths=paths, window=window))
+
+    def test_discover_repositories_with_submodules(self, tmp_path):
+        superproject = git.repo.Repo.init(tmp_path / "superproject")
+        superproject.git.execute(
+            [
+                "git",
+                "-c",
+                "protocol.file.allow=always",
+                "submodule",
+                "add",
+                str(path_testproject_git_repo),
+                "sub",
+            ]
+        )
+        superproject.git.execute(
+            [
+                "git",
+                "-c",
+                "user.name=test",
+                "-c",
+                "user.email=test@example.org",
+                "commit",
+                "-m",
+                "add submodule",
+            ]
+        )
+        path = pathlib.Path(superproject.working_tree_dir)
+
+        assert discover_repositories([path, path]) == [path]
+        assert discover_repositories([path], follow_submodules=True) == [
+            path,
+            path / "sub",
+        ]
+
+    def test_fetch_repositories(self, tmp_path):
+        path = tmp_path / ".git"
+        shutil.copytree(path_testproject_git_repo, path)
+        with GitFetcher() as fetcher:
+            fetcher.get_from_local_path(path_testproject_git_repo)
+            expected = list(fetcher.fetch_all())
+
+        fetcher = GitFetcher(workers=2)
+        fetched = [
+            (p, list(resources))
+            for p, resources in fetcher.fetch_repositories(
+                [path_testproject_git_repo, path]
+            )
+        ]
+
+        assert fetched == [(path_testproject_git_repo, expected), (path, expected)]
@@ -48,6 +48,28 @@ class TestMLflowFetcher:
         for r in fetcher.fetch_runs():
             pass
 
+    def test_fetch_runs_lazy(self):
+        eager = list(MLflowFetcher().fetch_runs())
+        lazy = list(MLflowFetcher(lazy=True, batch_size=4).fetch_runs())
+
+        assert lazy == eager
+
+    def test_fetch_runs_lazy_fetches_on_access(self, mocker):
+        fetcher = MLflowFetcher(lazy=True, batch_size=2)
+        get_run = mocker.spy(fetcher.mlflow_client, "get_run")
+
+        runs = list(fetcher.fetch_runs())
+
+        assert runs
+        assert get_run.call_count == 0
+        loader = runs[0].params.loader
+        assert set(loader.pending) == {run.run_id for run in runs}
+
+        runs[0].params.get()
+
+        assert get_run.call_count == min(len(runs), 2)
+        assert runs[0].run_id not in loader.pending
+
     def test_fetch_registered_models(self):
         fetcher = MLflowFetcher()
         for m in fetcher.fetch_models():
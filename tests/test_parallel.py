@@ -0,0 +1,68 @@
+import prov.model
+
+from mlflow2prov.adapters.git.fetcher import GitFetcher
+from mlflow2prov.adapters.repository import InMemoryRepository
+from mlflow2prov.prov import operations
+from mlflow2prov.prov.model import MODELS, FileAdditionModel, ProvContext
+from mlflow2prov.prov.parallel import build_fragment, build_parallel, chunked, shard
+from mlflow2prov.prov.query import QueryPlanner
+from tests.test_git_fetcher import path_testproject_git_repo
+
+
+def planner() -> QueryPlanner:
+    git_fetcher = GitFetcher()
+    git_fetcher.get_from_local_path(path_testproject_git_repo)
+
+    git_repository = InMemoryRepository()
+    for resource in git_fetcher.fetch_all():
+        git_repository.add(resource)
+
+    return QueryPlanner(git_repository, InMemoryRepository())
+
+
+class TestParallel:
+    def test_chunked(self):
+        assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+        assert list(chunked([], 2)) == []
+
+    def test_shard(self):
+        query_planner = planner()
+        shards = shard(query_planner, chunk_size=1)
+        index = [m.model for m in MODELS].index(FileAdditionModel)
+
+        assert shards
+        assert all(len(rows) == 1 for _, rows in shards)
+        assert len([i for i, _ in shards if i == index]) == len(
+            list(query_planner.execute(FileAdditionModel.plan))
+        )
+
+    def test_build_fragment(self):
+        index = [m.model for m in MODELS].index(FileAdditionModel)
+        rows = list(planner().execute(FileAdditionModel.plan))
+
+        document = prov.model.ProvDocument()
+        for record in build_fragment(index, rows):
+            document.new_record(*record)
+
+        context = ProvContext(prov.model.ProvDocument())
+        for args in rows:
+            FileAdditionModel(*args, shared_context=context).build_prov_model()
+
+        assert document == context.document
+
+    def test_build_parallel(self):
+        query_planner = planner()
+        context = ProvContext(prov.model.ProvDocument())
+        build_parallel(query_planner, context, workers=2, chunk_size=1)
+
+        context_expected = ProvContext(prov.model.ProvDocument())
+        for prov_model in MODELS:
+            prov_model([], query_planner, context_expected)
+
+        assert operations.dedupe(context.document) == operations.dedupe(
+            context_expected.document
+        )
+        # records built by several shards are merged into the indexed ones
+        records = context.document.get_records()
+        assert len(records) == len(context_expected.document.get_records())
+        assert len(records) == len(context.elements) + len(context.relations)
@@ -3,15 +3,22 @@ import unittest
 from typing import Type
 
 import prov.model
+import pytest
 
 from mlflow2prov.adapters.git.fetcher import GitFetcher
 from mlflow2prov.adapters.mlflow.fetcher import MLflowFetcher
 from mlflow2prov.adapters.repository import InMemoryRepository
-from mlflow2prov.domain.constants import ProvRole
+from mlflow2prov.domain.constants import ChangeType, ProvRole
 from mlflow2prov.domain.model import (
+    LAZY_RUN_FIELDS,
+    AbstractRunLoader,
     Commit,
     Experiment,
+    File,
+    FileRevision,
+    LazyField,
     LifecycleStage,
+    MetricStore,
     RegisteredModel,
     RegisteredModelVersion,
     RegisteredModelVersionStage,
@@ -23,20 +30,25 @@ from mlflow2prov.domain.model import (
 from mlflow2prov.prov import operations
 from mlflow2prov.prov.model import (
     DEFAULT_NAMESPACE,
+    MODEL_NAMES,
+    MODELS,
     CallableModel,
     ExperimentAdditionModel,
     ExperimentDeletionModel,
     FileAdditionModel,
     FileDeletionModel,
     FileModificationModel,
+    MetricGranularity,
     ProvContext,
     RegisteredModelAdditionModel,
     RegisteredModelVersionAdditionModel,
     RegisteredModelVersionDeletionModel,
     RunAdditionModel,
     RunDeletionModel,
+    select_models,
 )
 from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork
+from mlflow2prov.utils.prov_utils import qualified_name
 from tests.test_git_fetcher import path_testproject_git_repo
 from tests.utils import random_suffix
 
@@ -88,6 +100,76 @@ class TestProvContext:
 
         assert record == rec_expcected
 
+    def test_records_are_built_once(self):
+        parent = create_commit(
+            parents=[], authored_at=yesterday, committed_at=yesterday
+        )
+        commit = create_commit(
+            parents=[parent.sha], authored_at=today, committed_at=today
+        )
+
+        context = ProvContext(prov.model.ProvDocument())
+        context.add_element(commit)
+
+        assert len(context.document.get_records()) == 1
+
+        context.add_relation(commit, parent, prov.model.ProvCommunication)
+
+        assert len(context.document.get_records()) == 3
+
+    def test_add_element_merges_duplicates(self):
+        commit = create_commit(parents=[], authored_at=today, committed_at=today)
+
+        context = ProvContext(prov.model.ProvDocument())
+        first = context.add_element(commit)
+        second = context.add_element(commit)
+
+        assert first is second
+        assert len(context.document.get_records()) == 1
+        assert set(second.attributes) == set(commit.to_prov().attributes)
+
+    def test_add_relation_merges_duplicates(self):
+        parent = create_commit(
+            parents=[], authored_at=yesterday, committed_at=yesterday
+        )
+        commit = create_commit(
+            parents=[parent.sha], authored_at=today, committed_at=today
+        )
+
+        context = ProvContext(prov.model.ProvDocument())
+        context.add_relation(commit, parent, prov.model.ProvCommunication)
+        context.add_relation(
+            commit,
+            parent,
+            prov.model.ProvCommunication,
+            {str(prov.model.PROV_ROLE): ProvRole.COMMIT_AUTHOR},
+        )
+        context.add_relation(commit, parent, prov.model.ProvAssociation)
+
+        relations = list(context.document.get_records(prov.model.ProvRelation))
+        communication = list(context.document.get_records(prov.model.ProvCommunication))
+
+        assert len(relations) == 2
+        assert len(communication) == 1
+        assert prov.model.PROV_ROLE in dict(communication[0].extra_attributes)
+
+    def test_add_record_merges_duplicates(self):
+        parent = create_commit(
+            parents=[], authored_at=yesterday, committed_at=yesterday
+        )
+        commit = create_commit(
+            parents=[parent.sha], authored_at=today, committed_at=today
+        )
+        built = ProvContext(prov.model.ProvDocument())
+        built.add_relation(commit, parent, prov.model.ProvCommunication)
+
+        context = ProvContext(prov.model.ProvDocument())
+        context.add_relation(commit, parent, prov.model.ProvCommunication)
+        for record in built.document.get_records():
+            context.add_record(record.get_type(), record.identifier, record.attributes)
+
+        assert context.document == built.document
+
     def test_add_relation(self):
         parent = create_commit(
             parents=[], authored_at=yesterday, committed_at=yesterday
@@ -125,6 +207,31 @@ class TestProvContext:
         assert context == context_expected
 
 
+class TestFileModificationModel:
+    def test_build_prov_model_without_previous_revision(self):
+        parent = create_commit(
+            parents=[], authored_at=yesterday, committed_at=yesterday
+        )
+        commit = create_commit(
+            parents=[parent.sha], authored_at=today, committed_at=today
+        )
+        commit.author = User(name="author", email="author@domain.com")
+        commit.committer = User(name="committer", email="committer@domain.com")
+        file = File(name="train.py", path="src/train.py", commit=parent.sha)
+        revision = FileRevision(
+            name=file.name,
+            path=file.path,
+            commit=commit.sha,
+            status=ChangeType.MODIFIED,
+            file=file,
+        )
+
+        doc = FileModificationModel(commit, parent, revision, None).build_prov_model()
+
+        assert not list(doc.get_records(prov.model.ProvDerivation))
+        assert doc.get_record(revision.prov_identifier)
+
+
 class TestExperimentAdditionModel:
     def test_post_init(self):
         experiment_id = f"experiment-id-{random_suffix()}"
@@ -151,6 +258,32 @@ class TestExperimentAdditionModel:
 
         assert model.context == ProvContext(document=prov.model.ProvDocument())
 
+    def test_shared_context(self):
+        experiments = [
+            Experiment(
+                experiment_id=f"experiment-id-{random_suffix()}",
+                name=f"experiment-name-{random_suffix()}",
+                user=None,
+                artifact_location=None,
+                lifecycle_stage=LifecycleStage.ACTIVE,
+                tags=[],
+                created_at=today,
+                last_updated=today,
+            )
+            for _ in range(2)
+        ]
+        document = prov.model.ProvDocument()
+        context = ProvContext(document)
+
+        for experiment in experiments:
+            model = ExperimentAdditionModel(experiment, shared_context=context)
+
+            assert model.context is context
+            assert model.build_prov_model() is document
+
+        for experiment in experiments:
+            assert document.get_record(experiment.prov_identifier)
+
 
 class TestExperimentDeletionModel:
     def test_post_init(self):
@@ -227,6 +360,151 @@ class TestExperimentDeletionModel:
         assert model.context == ProvContext(document=prov.model.ProvDocument())
 
 
+class CountingRunLoader(AbstractRunLoader):
+    def __init__(self):
+        self.loaded = []
+
+    def load(self, run_id: str, name: str):
+        self.loaded.append((run_id, name))
+        return []
+
+
+def create_lazy_run(loader: AbstractRunLoader, lifecycle_stage: LifecycleStage) -> Run:
+    run_id = f"run-id-{random_suffix()}"
+    return Run(
+        run_id=run_id,
+        name=f"run-name-{random_suffix()}",
+        experiment_id=f"experiment-id-{random_suffix()}",
+        user=User.from_username_str(f"user-name-{random_suffix()}"),
+        status=RunStatus.FINISHED,
+        start_time=today,
+        end_time=today,
+        lifecycle_stage=lifecycle_stage,
+        artifact_uri=None,
+        note=None,
+        source_type=None,
+        source_name=None,
+        source_git_commit=None,
+        source_git_branch=None,
+        source_git_repo_url=None,
+        **{name: LazyField(loader, run_id, name) for name in LAZY_RUN_FIELDS},
+    )
+
+
+def create_run_with_metrics(
+    steps: int, lifecycle_stage: LifecycleStage = LifecycleStage.ACTIVE
+) -> Run:
+    run = create_lazy_run(CountingRunLoader(), lifecycle_stage)
+    run.metrics = MetricStore.from_points(
+        run.run_id,
+        (
+            (f"metric-{n % 2}", float(n), 1_600_000_000_000 + n, n // 2)
+            for n in range(steps)
+        ),
+    )
+    return run
+
+
+def create_experiment(
+    experiment_id: str, lifecycle_stage: LifecycleStage = LifecycleStage.ACTIVE
+) -> Experiment:
+    return Experiment(
+        experiment_id=experiment_id,
+        name=f"experiment-name-{random_suffix()}",
+        user=User.from_username_str(f"user-name-{random_suffix()}"),
+        artifact_location=None,
+        lifecycle_stage=lifecycle_stage,
+        tags=[],
+        created_at=today,
+        last_updated=today,
+    )
+
+
+def metric_entities(document: prov.model.ProvDocument) -> list:
+    return [
+        record
+        for record in document.get_records(prov.model.ProvEntity)
+        if "Metric?" in str(record.identifier)
+    ]
+
+
+class TestRunAdditionModel:
+    def build(self, run: Run, context: ProvContext) -> prov.model.ProvDocument:
+        experiment = create_experiment(run.experiment_id)
+        return RunAdditionModel(
+            run, experiment, None, None, shared_context=context
+        ).build_prov_model()
+
+    def test_metric_granularity(self):
+        for steps in (10, 1000):
+            run = create_run_with_metrics(steps)
+
+            per_step, last, summary = (
+                self.build(
+                    run,
+                    ProvContext(
+                        prov.model.ProvDocument(), metric_granularity=granularity
+                    ),
+                )
+                for granularity in MetricGranularity
+            )
+
+            assert len(metric_entities(per_step)) == steps
+            assert len(metric_entities(last)) == 2
+            assert len(metric_entities(summary)) == 2
+
+    def test_metric_series(self, tmp_path):
+        run = create_run_with_metrics(10)
+        context = ProvContext(
+            prov.model.ProvDocument(),
+            metric_granularity=MetricGranularity.SUMMARY,
+            metric_series=tmp_path,
+        )
+
+        document = self.build(run, context)
+
+        (path,) = tmp_path.iterdir()
+        assert len(path.read_text().splitlines()) == 11
+        assert all(
+            entity.get_attribute(qualified_name("series")) == {str(path)}
+            for entity in metric_entities(document)
+        )
+
+
+class TestRunDeletionModel:
+    def test_query_skips_loading_active_runs(self):
+        loader = CountingRunLoader()
+        active = create_lazy_run(loader, LifecycleStage.ACTIVE)
+        deleted = create_lazy_run(loader, LifecycleStage.DELETED)
+        mlflow_repository = InMemoryRepository()
+        mlflow_repository.add(active)
+        mlflow_repository.add(deleted)
+
+        for args in RunDeletionModel.query(InMemoryRepository(), mlflow_repository):
+            RunDeletionModel(*args).build_prov_model()
+
+        assert loader.loaded == [(deleted.run_id, name) for name in LAZY_RUN_FIELDS]
+
+    def test_metric_granularity(self):
+        run = create_run_with_metrics(1000, LifecycleStage.DELETED)
+        experiment = create_experiment(run.experiment_id, LifecycleStage.DELETED)
+
+        for granularity, count in zip(MetricGranularity, (1000, 2, 2)):
+            context = ProvContext(
+                prov.model.ProvDocument(), metric_granularity=granularity
+            )
+            RunDeletionModel(run, shared_context=context).build_prov_model()
+            assert len(metric_entities(context.document)) == count
+
+            context = ProvContext(
+                prov.model.ProvDocument(), metric_granularity=granularity
+            )
+            ExperimentDeletionModel(
+                experiment, run, shared_context=context
+            ).build_prov_model()
+            assert len(metric_entities(context.document)) == count
+
+
 class TestRegisteredModelVersionDeletionModel:
     def test_post_init(self):
         name = f"registered-model-name-{random_suffix()}"
@@ -547,3 +825,18 @@ class TestCallableModel:
         assert len(list(merged.get_records())) == len(
             list(merged_expected.get_records())
         )
+
+
+class TestSelectModels:
+    def test_select_all(self):
+        assert select_models() == MODELS
+        assert [m.model.__name__ for m in MODELS] == MODEL_NAMES
+
+    def test_select_subset(self):
+        selected = select_models(["RunAdditionModel", "FileAdditionModel"])
+
+        assert [m.model for m in selected] == [FileAdditionModel, RunAdditionModel]
+
+    def test_select_unknown(self):
+        with pytest.raises(ValueError):
+            select_models(["RunAdditionModel", "UnknownModel"])
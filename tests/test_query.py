@@ -0,0 +1,295 @@
+import copy
+from dataclasses import dataclass, field
+
+from mlflow2prov.adapters.git.fetcher import GitFetcher
+from mlflow2prov.adapters.repository import InMemoryRepository
+from mlflow2prov.prov.model import FileAdditionModel
+from mlflow2prov.prov.query import (
+    GIT,
+    MLFLOW,
+    Expand,
+    Join,
+    Lookup,
+    QueryPlan,
+    QueryPlanner,
+    Scan,
+    Unnest,
+    resolve,
+    resource_types,
+)
+from mlflow2prov.service_layer.services import fetch_git_from_path
+from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork, SqliteUnitOfWork
+from tests.test_git_fetcher import path_testproject_git_repo
+
+
+@dataclass
+class Node:
+    id: str
+    group: str = ""
+    refs: list[str] = field(default_factory=list)
+
+    @property
+    def prov_identifier(self) -> str:
+        return f"Node?id={self.id}"
+
+
+@dataclass
+class Item:
+    id: str
+    node: str
+    children: list[Node] = field(default_factory=list)
+
+    @property
+    def prov_identifier(self) -> str:
+        return f"Item?id={self.id}"
+
+
+def planner() -> QueryPlanner:
+    git_repository = InMemoryRepository()
+    for node in [
+        Node("a", group="x", refs=["b", "z"]),
+        Node("b", group="y"),
+        Node("c", group="x", refs=["a"]),
+    ]:
+        git_repository.add(node)
+
+    mlflow_repository = InMemoryRepository()
+    for item in [
+        Item("i1", node="a", children=[Node("n1", group="x"), Node("n2")]),
+        Item("i2", node="z"),
+        Item("i3", node="a"),
+    ]:
+        mlflow_repository.add(item)
+
+    return QueryPlanner(git_repository, mlflow_repository)
+
+
+class TestQueryPlanner:
+    def test_resolve(self):
+        binding = {"node": Node("a", refs=["b"])}
+
+        assert resolve(binding, "node") == binding["node"]
+        assert resolve(binding, "node.refs") == ["b"]
+
+    def test_scan(self):
+        plan = QueryPlan(
+            steps=(Scan("node", GIT, Node, (("group", "x"),)),),
+            select=("node.id",),
+        )
+
+        assert list(planner().execute(plan)) == [("a",), ("c",)]
+
+    def test_lookup(self):
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Lookup("node", GIT, Node, "id", "item.node"),
+            ),
+            select=("item.id", "node"),
+        )
+
+        assert [(i, n.id if n else None) for i, n in planner().execute(plan)] == [
+            ("i1", "a"),
+            ("i2", None),
+            ("i3", "a"),
+        ]
+
+    def test_required_lookup(self):
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Lookup("node", GIT, Node, "id", "item.node", required=True),
+            ),
+            select=("item.id",),
+        )
+
+        assert list(planner().execute(plan)) == [("i1",), ("i3",)]
+
+    def test_expand(self):
+        plan = QueryPlan(
+            steps=(
+                Scan("node", GIT, Node),
+                Expand("ref", GIT, Node, "id", "node.refs"),
+            ),
+            select=("node.id", "ref"),
+        )
+
+        assert [(i, r.id if r else None) for i, r in planner().execute(plan)] == [
+            ("a", "b"),
+            ("a", None),
+            ("c", "a"),
+        ]
+
+    def test_outer_join(self):
+        plan = QueryPlan(
+            steps=(
+                Scan("node", GIT, Node, (("id", "a"),)),
+                Join("item", MLFLOW, Item, "node", "node.id", outer=True),
+            ),
+            select=("item",),
+        )
+
+        assert [i.id if i else None for (i,) in planner().execute(plan)] == [
+            "i1",
+            "i3",
+            None,
+        ]
+
+    def test_unnest(self):
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Unnest("child", "item.children", (("group", "x"),)),
+            ),
+            select=("item.id", "child.id"),
+        )
+
+        assert list(planner().execute(plan)) == [("i1", "n1")]
+
+    def test_tables_are_shared(self):
+        query_planner = planner()
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Lookup("node", GIT, Node, "id", "item.node"),
+            ),
+            select=("node",),
+        )
+
+        first = list(query_planner.execute(plan))
+        table = query_planner.tables[(GIT, Node, "id")]
+        second = list(query_planner.execute(plan))
+
+        assert first == second
+        assert query_planner.tables[(GIT, Node, "id")] is table
+
+    def test_missing_repository(self):
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Lookup("node", GIT, Node, "id", "item.node"),
+            ),
+            select=("item.id", "node"),
+        )
+
+        mlflow_repository = planner().repositories[MLFLOW]
+        result = QueryPlanner(None, mlflow_repository).execute(plan)
+
+        assert list(QueryPlanner(None, None).execute(plan)) == []
+        assert [node for _, node in result] == [None, None, None]
+
+    def test_resource_types(self):
+        plans = [
+            QueryPlan(
+                steps=(
+                    Scan("item", MLFLOW, Item),
+                    Unnest("child", "item.children"),
+                    Lookup("node", GIT, Node, "id", "item.node"),
+                ),
+                select=("item", "child", "node"),
+            ),
+            QueryPlan(steps=(Scan("node", GIT, Node),), select=("node",)),
+        ]
+
+        assert resource_types(plans, GIT) == {Node}
+        assert resource_types(plans, MLFLOW) == {Item}
+        assert resource_types([], GIT) == set()
+
+    def test_execute_affected(self):
+        query_planner = planner()
+        a, b, c = query_planner.resources(GIT, Node)
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Lookup("node", GIT, Node, "id", "item.node"),
+            ),
+            select=("item.id",),
+        )
+
+        assert list(query_planner.execute_affected(plan, [a])) == [("i1",), ("i3",)]
+        assert list(query_planner.execute_affected(plan, [b, c])) == []
+
+    def test_execute_affected_expand(self):
+        query_planner = planner()
+        a, b, c = query_planner.resources(GIT, Node)
+        plan = QueryPlan(
+            steps=(
+                Scan("node", GIT, Node, (("group", "x"),)),
+                Expand("ref", GIT, Node, "id", "node.refs"),
+            ),
+            select=("node.id", "ref"),
+        )
+
+        assert list(query_planner.execute_affected(plan, [b])) == [("a", b)]
+        assert list(query_planner.execute_affected(plan, [a])) == [
+            ("a", b),
+            ("a", None),
+            ("c", a),
+        ]
+
+    def test_execute_affected_unnest(self):
+        query_planner = planner()
+        a, *_ = query_planner.resources(GIT, Node)
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Unnest("child", "item.children"),
+                Lookup("node", GIT, Node, "group", "child.group"),
+            ),
+            select=("item.id", "child.id", "node.id"),
+        )
+
+        assert list(query_planner.execute_affected(plan, [a])) == [("i1", "n1", "a")]
+
+    def test_execute_affected_copies(self):
+        query_planner = planner()
+        a, *_ = query_planner.resources(GIT, Node)
+        plan = QueryPlan(
+            steps=(
+                Scan("item", MLFLOW, Item),
+                Lookup("node", GIT, Node, "id", "item.node"),
+            ),
+            select=("item.id",),
+        )
+
+        # repositories may return a new copy of a resource on every read
+        assert list(query_planner.execute_affected(plan, [copy.copy(a)])) == [
+            ("i1",),
+            ("i3",),
+        ]
+
+    def test_before(self):
+        query_planner = planner()
+        added = Node("d", group="x")
+        query_planner.repositories[GIT].add(added)
+        a, b, c, _ = query_planner.resources(GIT, Node)
+        previous = Node("a", group="y")
+        plan = QueryPlan(
+            steps=(Scan("node", GIT, Node, (("group", "x"),)),),
+            select=("node.id",),
+        )
+
+        before = query_planner.before([a, added], [previous])
+
+        assert before.resources(GIT, Node) == [previous, b, c]
+        assert list(before.execute(plan)) == [("c",)]
+        assert list(query_planner.execute(plan)) == [("a",), ("c",), ("d",)]
+
+    def test_streamed_repository(self, tmp_path):
+        location = str(path_testproject_git_repo)
+        uows = [InMemoryUnitOfWork(), SqliteUnitOfWork(tmp_path / "db.sqlite")]
+        for uow in uows:
+            fetch_git_from_path(
+                path=path_testproject_git_repo, uow=uow, git_fetcher=GitFetcher()
+            )
+        in_memory, streamed = (
+            QueryPlanner(uow.resources[location], None) for uow in uows
+        )
+
+        expected = list(in_memory.execute(FileAdditionModel.plan))
+        result = list(streamed.execute(FileAdditionModel.plan))
+
+        assert result == expected
+        # indexed lookups probe the repository, nothing is listed
+        assert streamed.probes
+        assert not streamed.lists and not streamed.tables
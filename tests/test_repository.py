@@ -1,5 +1,22 @@
-from mlflow2prov.adapters.repository import InMemoryRepository
-from mlflow2prov.domain.model import User
+import datetime
+import pathlib
+from dataclasses import dataclass
+from typing import Any
+
+from mlflow2prov.adapters.repository import (
+    AbstractReadRepository,
+    AbstractRepository,
+    CompositeRepository,
+    InMemoryRepository,
+    SqliteDatabase,
+    SqliteRepository,
+)
+from mlflow2prov.domain.model import Commit, File, FileRevision, LifecycleStage, User
+
+
+@dataclass
+class Value:
+    value: Any
 
 
 class TestInMemoryRepository:
@@ -68,8 +85,194 @@ class TestInMemoryRepository:
 
         assert not repo1 == [repo1_u1, repo1_u2]
 
+    def test_indexed_get_and_list_all(self):
+        repo = InMemoryRepository(indexes={User: ("prov_role",)})
+
+        u1 = User(name="u1", email="u1@domain.com", prov_role="r1")
+        u2 = User(name="u2", email="u2@domain.com", prov_role="r2")
+        u3 = User(name="u3", email="u3@domain.com", prov_role="r1")
+
+        repo.add(u1)
+        repo.add(u2)
+        repo.add(u3)
+
+        assert repo.index[(User, "prov_role")] == {"r1": [u1, u3], "r2": [u2]}
+        assert repo.get(User, prov_role="r1") == u1
+        assert repo.get(User, prov_role="r3") == None
+        assert repo.list_all(resource_type=User, prov_role="r1") == [u1, u3]
+        assert repo.list_all(resource_type=User, prov_role="r1", name="u3") == [u3]
+        assert repo.list_all(resource_type=User, name="u2") == [u2]
+        assert repo.list_all(resource_type=User, prov_role=["r1"]) == []
+
+    def test_default_indexes(self):
+        repo = InMemoryRepository()
+
+        commit = Commit(
+            sha="abc",
+            title="title",
+            message="message",
+            author=None,
+            committer=None,
+            parents=[],
+            authored_at=datetime.datetime(2023, 1, 1),
+            committed_at=datetime.datetime(2023, 1, 1),
+        )
+        repo.add(commit)
+
+        assert repo.index[(Commit, "sha")] == {"abc": [commit]}
+        assert repo.get(Commit, sha="abc") == commit
+        assert repo.get(Commit, sha="def") == None
+
     def test_eq_if_repositories_empty(self):
         repo1 = InMemoryRepository()
         repo2 = InMemoryRepository()
 
         assert repo1 == repo2
+
+
+class TestCompositeRepository:
+    def test_get(self):
+        repo1, repo2 = InMemoryRepository(), InMemoryRepository()
+
+        u1 = User(name="u1", email="u1@domain.com", prov_role="r1")
+        u2 = User(name="u2", email="u2@domain.com", prov_role="r1")
+
+        repo1.add(u1)
+        repo2.add(u2)
+        repo = CompositeRepository([repo1, repo2])
+
+        assert repo.get(User, name="u1") == u1
+        assert repo.get(User, name="u2") == u2
+        assert repo.get(User, name="u3") == None
+
+    def test_list_all(self):
+        repo1, repo2 = InMemoryRepository(), InMemoryRepository()
+
+        u1 = User(name="u1", email="u1@domain.com", prov_role="r1")
+        u2 = User(name="u2", email="u2@domain.com", prov_role="r1")
+
+        repo1.add(u1)
+        repo2.add(u2)
+        repo = CompositeRepository([repo1, repo2])
+
+        assert repo.list_all(resource_type=User, prov_role="r1") == [u1, u2]
+        assert CompositeRepository([]).list_all(resource_type=User) == []
+
+    def test_is_read_only(self):
+        repo = CompositeRepository([InMemoryRepository()])
+
+        assert isinstance(repo, AbstractReadRepository)
+        assert not isinstance(repo, AbstractRepository)
+        assert not hasattr(repo, "add")
+
+
+def revisions(count: int) -> list[FileRevision]:
+    # newest revision first, each referencing its predecessor
+    file = File(name="train.py", path="train.py", commit="0")
+    revs = [
+        FileRevision(
+            name="train.py", path="train.py", commit=str(n), status="M", file=file
+        )
+        for n in range(count)
+    ]
+    for rev, prev in zip(revs, revs[1:]):
+        rev.previous = prev
+    return revs
+
+
+class TestSqliteRepository:
+    def test_add_and_get(self, tmp_path):
+        repo = SqliteRepository(SqliteDatabase(tmp_path / "db.sqlite"), "foo")
+
+        u1 = User(name="u1", email="u1@domain.com", prov_role="r1")
+        u2 = User(name="u2", email="u2@domain.com", prov_role="r2")
+
+        repo.add(u1)
+        repo.add(u2)
+
+        assert repo.get(User, name="u1") == u1
+        assert repo.get(User, name="u2") == u2
+        assert repo.get(User, name="u3") == None
+
+    def test_list_all(self, tmp_path):
+        database = SqliteDatabase(tmp_path / "db.sqlite")
+        repo = SqliteRepository(database, "foo")
+
+        u1 = User(name="u1", email="u1@domain.com", prov_role="r1")
+        u2 = User(name="u2", email="u2@domain.com", prov_role="r1")
+
+        repo.add(u1)
+        repo.add(u2)
+        SqliteRepository(database, "bar").add(u1)
+
+        assert repo.list_all(resource_type=User, name="u1") == [u1]
+        assert repo.list_all(resource_type=User, prov_role="r1") == [u1, u2]
+        assert list(repo.iter_all(User)) == [u1, u2]
+
+    def test_indexed_lookup(self, tmp_path):
+        repo = SqliteRepository(SqliteDatabase(tmp_path / "db.sqlite"), "foo")
+        revs = revisions(3)
+        for rev in revs:
+            repo.add(rev)
+
+        assert repo.list_all(resource_type=FileRevision, name="train.py") == revs
+        assert repo.get(FileRevision, name="train.py", commit="1") == revs[1]
+        assert repo.get(FileRevision, name="other.py") == None
+
+    def test_revision_chain(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("mlflow2prov.adapters.repository.BATCH_SIZE", 7)
+        database = SqliteDatabase(tmp_path / "db.sqlite")
+        repo = SqliteRepository(database, "foo")
+
+        # long chains must neither be duplicated nor loaded recursively
+        revs = revisions(5000)
+        for rev in revs[:-1]:
+            repo.add(rev)
+        database.commit()
+
+        loaded = repo.list_all(FileRevision)
+        assert len(loaded) == len(revs) - 1
+        assert [r.commit for r in loaded] == [r.commit for r in revs[:-1]]
+        assert all(r.previous is p for r, p in zip(loaded, loaded[1:]))
+        # the unlisted predecessor was stored with the last listed revision
+        assert loaded[-1].previous.commit == revs[-1].commit
+
+    def test_commit_and_rollback(self, tmp_path):
+        path = tmp_path / "db.sqlite"
+        database = SqliteDatabase(path)
+        repo = SqliteRepository(database, "foo")
+
+        u1 = User(name="u1", email="u1@domain.com")
+        u2 = User(name="u2", email="u2@domain.com")
+
+        repo.add(u1)
+        database.commit()
+        repo.add(u2)
+        database.rollback()
+
+        assert repo.list_all(User) == [u1]
+        assert SqliteRepository(SqliteDatabase(path), "foo").list_all(User) == [u1]
+
+    def test_indexed_lookup_by_equal_values(self, tmp_path, monkeypatch):
+        indexes = {Value: ("value",)}
+        monkeypatch.setattr("mlflow2prov.adapters.repository.DEFAULT_INDEXES", indexes)
+        repo = SqliteRepository(SqliteDatabase(tmp_path / "db.sqlite"), "foo")
+        in_memory = InMemoryRepository(indexes=indexes)
+        values = [
+            Value(1),
+            Value("a"),
+            Value(pathlib.Path("a")),
+            Value(None),
+            Value(LifecycleStage.DELETED),
+        ]
+        for value in values:
+            repo.add(value)
+            in_memory.add(value)
+
+        # lookups match what the in-memory repository compares equal
+        for value in [1.0, True, "a", pathlib.Path("a"), None, LifecycleStage.DELETED]:
+            assert repo.list_all(Value, value=value) == in_memory.list_all(
+                Value, value=value
+            )
+        assert repo.list_all(Value, value=1.0) == [Value(1)]
+        assert repo.list_all(Value, value="deleted") == []
@@ -1,27 +1,110 @@
+import copy
+import datetime
 import itertools
 import pathlib
+import shutil
 import tempfile
 
 import prov.model
+import pytest
 
 from mlflow2prov.adapters.git.fetcher import GitFetcher
 from mlflow2prov.adapters.mlflow.fetcher import MLflowFetcher
+from mlflow2prov.domain.model import (
+    Commit,
+    Experiment,
+    FileRevision,
+    LifecycleStage,
+    Run,
+    RunStatus,
+    User,
+)
 from mlflow2prov.prov import model, operations
+from mlflow2prov.prov.cache import FragmentCache
+from mlflow2prov.prov.query import resource_key
 from mlflow2prov.service_layer.services import (
+    changed_resources,
     compile_graph,
     fetch_git_from_path,
+    fetch_git_from_paths,
     fetch_mlflow,
+    load_snapshot,
     merge,
     read,
+    required_resource_types,
+    restrict_git_to_runs,
+    save_snapshot,
     statistics,
+    stream_graph,
     transform,
+    update_graph,
     write,
 )
-from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork
+from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork, SqliteUnitOfWork
 from mlflow2prov.utils.prov_utils import document_factory, qualified_name
 from tests.test_git_fetcher import path_testproject_git_repo
 from tests.utils import random_suffix
 
+today = datetime.datetime.now()
+yesterday = today - datetime.timedelta(days=1)
+
+
+def create_experiment(experiment_id: str) -> Experiment:
+    return Experiment(
+        experiment_id=experiment_id,
+        name=f"experiment-name-{random_suffix()}",
+        user=User.from_username_str(f"user-name-{random_suffix()}"),
+        artifact_location=None,
+        lifecycle_stage=LifecycleStage.ACTIVE,
+        tags=[],
+        created_at=yesterday,
+        last_updated=yesterday,
+    )
+
+
+def create_run(
+    experiment_id: str,
+    source_git_commit: str | None,
+    lifecycle_stage: LifecycleStage = LifecycleStage.ACTIVE,
+) -> Run:
+    return Run(
+        run_id=f"run-id-{random_suffix()}",
+        name=f"run-name-{random_suffix()}",
+        experiment_id=experiment_id,
+        user=User.from_username_str(f"user-name-{random_suffix()}"),
+        status=RunStatus.FINISHED,
+        start_time=yesterday,
+        end_time=yesterday,
+        lifecycle_stage=lifecycle_stage,
+        artifact_uri=None,
+        metrics=[],
+        params=[],
+        tags=[],
+        artifacts=[],
+        model_artifacts=[],
+        note=None,
+        source_type=None,
+        source_name=None,
+        source_git_commit=source_git_commit,
+        source_git_branch=None,
+        source_git_repo_url=None,
+    )
+
+
+def add_runs(uow, path: str, url: str) -> list[Experiment | Run]:
+    # an experiment with an active and a deleted run, both from the same commit
+    sha = uow.resources[path].list_all(Commit)[-1].sha
+    experiment = create_experiment(f"experiment-id-{random_suffix()}")
+    runs = [
+        create_run(experiment.experiment_id, sha),
+        create_run(experiment.experiment_id, sha, LifecycleStage.DELETED),
+    ]
+    with uow:
+        for resource in [experiment, *runs]:
+            uow.resources[url].add(resource)
+        uow.commit()
+    return [experiment, *runs]
+
 
 class TestServices:
     def test_fetch_git_from_path(self):
@@ -70,6 +153,244 @@ class TestServices:
 
         assert graph == graph_expected
 
+    def test_compile_graph_is_repeatable(self):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+
+        first = compile_graph([path, url], uow)
+        second = compile_graph([path, url], uow)
+
+        assert first == second
+        assert len(first.get_records()) == len(second.get_records())
+
+    def test_compile_graph_parallel(self):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+
+        graph = compile_graph([path, url], uow, workers=2)
+
+        assert graph == compile_graph([path, url], uow)
+
+    def test_compile_graph_parallel_with_fragment_cache(self, tmp_path):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+
+        with FragmentCache(tmp_path / "cache.sqlite") as cache:
+            with pytest.raises(ValueError):
+                compile_graph([path, url], InMemoryUnitOfWork(), workers=2, cache=cache)
+
+    def test_compile_graph_with_selected_models(self):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+
+        graph = compile_graph([path, url], uow, models=["FileAdditionModel"])
+        graph_expected = operations.dedupe(
+            model.CallableModel(model.FileAdditionModel)(
+                [uow.resources[path], uow.resources[url]]
+            )
+        )
+
+        assert graph == graph_expected
+
+    def test_compile_graph_with_fragment_cache(self, tmp_path):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+
+        graphs = []
+        for _ in range(2):
+            with FragmentCache(tmp_path / "cache.sqlite") as cache:
+                graphs.append(compile_graph([path, url], uow, cache=cache))
+
+        assert cache.statistics.hits > 0
+        assert cache.statistics.misses == 0
+        assert graphs == [compile_graph([path, url], uow)] * 2
+
+    def test_compile_graph_with_sqlite(self, tmp_path):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = SqliteUnitOfWork(tmp_path / "db.sqlite")
+        in_memory = InMemoryUnitOfWork()
+        for unit in (uow, in_memory):
+            fetch_git_from_path(
+                path=path_testproject_git_repo,
+                uow=unit,
+                git_fetcher=GitFetcher(),
+            )
+        with in_memory:
+            for resource in add_runs(uow, path, url):
+                in_memory.resources[url].add(resource)
+
+        graph = compile_graph([path, url], uow)
+
+        assert graph == compile_graph([path, url], in_memory)
+
+    def test_update_graph(self):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+        graph = compile_graph([path, url], uow)
+
+        # a commit that is both the parent and the child of other commits
+        commits = uow.resources[path].list_all(Commit)
+        parents = {sha for commit in commits for sha in commit.parents}
+        commit = next(c for c in commits if c.parents and c.sha in parents)
+        previous = copy.copy(commit)
+        commit.message = f"message-{random_suffix()}"
+
+        updated = update_graph(graph, [path, url], uow, [commit], [previous])
+
+        assert updated != graph
+        assert updated == compile_graph([path, url], uow)
+
+    def test_update_graph_with_changed_runs(self):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+        _, *runs = add_runs(uow, path, url)
+        graph = compile_graph([path, url], uow)
+
+        # the deletion of a run starts when the run ends
+        previous = [copy.copy(run) for run in runs]
+        commits = uow.resources[path].list_all(Commit)
+        for run in runs:
+            run.status = RunStatus.FAILED
+            run.end_time = today
+            run.source_git_commit = commits[0].sha
+
+        updated = update_graph(graph, [path, url], uow, runs, previous)
+
+        assert updated != graph
+        assert updated == compile_graph([path, url], uow)
+
+    def test_update_graph_with_sqlite(self, tmp_path):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = SqliteUnitOfWork(tmp_path / "db.sqlite")
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+        add_runs(uow, path, url)
+        graph = compile_graph([path, url], uow)
+
+        # every read returns new copies of the stored resources
+        runs = uow.resources[url].list_all(Run)
+        unchanged = update_graph(
+            graph, [path, url], uow, runs, uow.resources[url].list_all(Run)
+        )
+
+        assert unchanged == graph
+
+        added = add_runs(uow, path, url)
+        updated = update_graph(graph, [path, url], uow, added)
+
+        assert updated != graph
+        assert updated == compile_graph([path, url], uow)
+
+    def test_update_graph_from_snapshot(self, tmp_path):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        previous_uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=previous_uow,
+            git_fetcher=GitFetcher(),
+        )
+        add_runs(previous_uow, path, url)
+        save_snapshot(
+            path=tmp_path / "snapshot", uow=previous_uow, locations=[path, url]
+        )
+        graph = compile_graph([path, url], previous_uow)
+        uow = InMemoryUnitOfWork()
+        load_snapshot(path=tmp_path / "snapshot", uow=uow)
+
+        # loaded resources are copies of the stored ones
+        assert changed_resources(previous_uow, uow, [path, url]) == ([], [])
+
+        commit = uow.resources[path].list_all(Commit)[0]
+        message = commit.message
+        commit.message = f"message-{random_suffix()}"
+        added = add_runs(uow, path, url)
+        resources, previous = changed_resources(previous_uow, uow, [path, url])
+
+        assert sorted(map(resource_key, resources), key=repr) == sorted(
+            map(resource_key, [commit, *added]), key=repr
+        )
+        assert [resource_key(r) for r in previous] == [resource_key(commit)]
+        assert previous[0].message == message
+
+        updated = update_graph(graph, [path, url], uow, resources, previous)
+
+        assert updated == compile_graph([path, url], uow)
+
+    def test_required_resource_types(self):
+        assert required_resource_types(["ExperimentAdditionModel"], "git") == set()
+        assert required_resource_types(["FileAdditionModel"], "git") == {
+            Commit,
+            FileRevision,
+        }
+        assert required_resource_types(["RunAdditionModel"], "mlflow") == {
+            Experiment,
+            Run,
+        }
+
+    def test_stream_graph(self, tmp_path):
+        path = str(path_testproject_git_repo)
+        url = str(MLflowFetcher().tracking_uri)
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo,
+            uow=uow,
+            git_fetcher=GitFetcher(),
+        )
+        filename = str(tmp_path / "graph.json")
+
+        stream_graph([path, url], uow, filename)
+
+        streamed = read(filename=filename, format=operations.DeserializationFormat.JSON)
+        expected = operations.deserialize(
+            operations.serialize(compile_graph([path, url], uow)),
+            operations.DeserializationFormat.JSON,
+        )
+
+        assert streamed == expected
+        assert len(streamed.get_records()) == len(expected.get_records())
+
     def test_merge(self):
         agent1 = prov.model.ProvAgent(
             None, qualified_name(f"agent-id-{random_suffix()}")
@@ -155,3 +476,62 @@ class TestServices:
         assert statistics(
             document=graph, resolution=resolution, format=format
         ) == operations.statistics(graph=graph, resolution=resolution, format=format)
+
+    def test_restrict_git_to_runs(self):
+        mlflow_fetcher = MLflowFetcher()
+        url = str(mlflow_fetcher.tracking_uri)
+
+        uow = InMemoryUnitOfWork()
+        fetch_mlflow(url=url, uow=uow, mlflow_fetcher=mlflow_fetcher)
+
+        git_fetcher = GitFetcher()
+        restrict_git_to_runs(url=url, uow=uow, git_fetcher=git_fetcher)
+
+        runs = uow.resources[url].list_all(Run)
+        assert git_fetcher.commits == {
+            run.source_git_commit for run in runs if run.source_git_commit
+        }
+        assert git_fetcher.paths == {run.source_name for run in runs}
+
+    def test_fetch_git_from_paths(self):
+        git_fetcher = GitFetcher()
+        git_fetcher.get_from_local_path(path=path_testproject_git_repo)
+        fetched_expected = list(git_fetcher.fetch_all())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / ".git"
+            shutil.copytree(path_testproject_git_repo, path)
+
+            uow = InMemoryUnitOfWork()
+            locations = fetch_git_from_paths(
+                paths=[path_testproject_git_repo, path],
+                uow=uow,
+                git_fetcher=GitFetcher(workers=2),
+            )
+
+        assert locations == [str(path_testproject_git_repo), str(path)]
+        for location in locations:
+            fetched_nested = uow.resources[location].repo.values()
+            assert list(itertools.chain(*fetched_nested)) == fetched_expected
+
+    def test_save_and_load_snapshot(self, tmp_path):
+        uow = InMemoryUnitOfWork()
+        fetch_git_from_path(
+            path=path_testproject_git_repo, uow=uow, git_fetcher=GitFetcher()
+        )
+        locations = [str(path_testproject_git_repo)]
+
+        save_snapshot(path=tmp_path / "snapshot", uow=uow, locations=locations)
+        loaded = InMemoryUnitOfWork()
+
+        assert load_snapshot(path=tmp_path / "snapshot", uow=loaded) == locations
+        assert loaded == uow
+
+        # snapshots of other units of work hold the same resources
+        sqlite_uow = SqliteUnitOfWork(tmp_path / "db.sqlite")
+        load_snapshot(path=tmp_path / "snapshot", uow=sqlite_uow)
+        save_snapshot(path=tmp_path / "copy", uow=sqlite_uow, locations=locations)
+        copied = InMemoryUnitOfWork()
+        load_snapshot(path=tmp_path / "copy", uow=copied)
+
+        assert copied == uow
@@ -0,0 +1,74 @@
+import struct
+
+import pytest
+
+from mlflow2prov.adapters.snapshot import (
+    SNAPSHOT_MAGIC,
+    SnapshotError,
+    read_metadata,
+    read_snapshot,
+    write_snapshot,
+)
+from mlflow2prov.domain.model import FileRevision, User
+from tests.test_repository import revisions
+
+
+class TestSnapshot:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "resources.snapshot"
+        u1 = User(name="u1", email="u1@domain.com", prov_role="r1")
+        u2 = User(name="u2", email="u2@domain.com", prov_role="r2")
+
+        write_snapshot(path, [("foo", [u1, u2]), ("bar", [u2])])
+
+        assert read_metadata(path)["locations"] == ["foo", "bar"]
+        assert list(read_snapshot(path)) == [("foo", u1), ("foo", u2), ("bar", u2)]
+
+    def test_revision_chain(self, tmp_path):
+        path = tmp_path / "resources.snapshot"
+        # newest revision first, the oldest revision is never listed
+        revs = revisions(5000)
+
+        write_snapshot(path, [("foo", revs[:-1])])
+        loaded = [resource for _, resource in read_snapshot(path)]
+
+        assert [r.commit for r in loaded] == [r.commit for r in revs[:-1]]
+        assert all(r.previous is p for r, p in zip(loaded, loaded[1:]))
+        assert loaded[-1].previous.commit == revs[-1].commit
+        assert loaded[-1].previous.previous is None
+        # references are restored, not pickled along with each revision
+        assert path.stat().st_size < 5000 * 1024
+
+    def test_reversed_revision_chain(self, tmp_path):
+        path = tmp_path / "resources.snapshot"
+        revs = revisions(3)
+
+        write_snapshot(path, [("foo", revs[::-1])])
+        loaded = [resource for _, resource in read_snapshot(path)]
+
+        assert [r.commit for r in loaded] == ["2", "1", "0"]
+        assert loaded[2].previous is loaded[1]
+        assert loaded[1].previous is loaded[0]
+
+    def test_unsupported_version(self, tmp_path):
+        path = tmp_path / "resources.snapshot"
+        write_snapshot(path, [("foo", revisions(2))])
+
+        data = bytearray(path.read_bytes())
+        struct.pack_into(">H", data, len(SNAPSHOT_MAGIC), 99)
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(SnapshotError, match="version 99"):
+            list(read_snapshot(path))
+
+    def test_not_a_snapshot(self, tmp_path):
+        path = tmp_path / "resources.snapshot"
+        path.write_bytes(b"")
+
+        with pytest.raises(SnapshotError):
+            read_metadata(path)
+
+        path.write_bytes(b"0" * 64)
+
+        with pytest.raises(SnapshotError):
+            read_metadata(path)
@@ -0,0 +1,121 @@
+import copy
+import pathlib
+import tempfile
+
+import prov.model
+import pytest
+
+from mlflow2prov.prov import operations
+from mlflow2prov.prov.operations import SerializationFormat
+from mlflow2prov.prov.stream import StreamingWriter
+from mlflow2prov.utils.prov_utils import document_factory, qualified_name
+from tests.utils import random_suffix
+
+
+def documents() -> list[prov.model.ProvDocument]:
+    # both documents contain the agent and the relation to it
+    agent = qualified_name(f"agent-id={random_suffix()}")
+    first, second = document_factory(), document_factory()
+    for document in (first, second):
+        entity = document.entity(qualified_name(f"entity-id={random_suffix()}"))
+        document.wasAttributedTo(
+            entity,
+            document.agent(agent),
+            identifier=qualified_name(f"relation:{entity.identifier}:{agent}"),
+        )
+        document.wasAttributedTo(
+            entity,
+            agent,
+            identifier=qualified_name(f"relation:{entity.identifier}:{agent}"),
+        )
+    return [first, second]
+
+
+def anonymous_documents() -> list[prov.model.ProvDocument]:
+    # each document generates its own entity, both use the same agent
+    activity = qualified_name(f"activity-id={random_suffix()}")
+    agent = qualified_name(f"agent-id={random_suffix()}")
+    first, second = document_factory(), document_factory()
+    for document in (first, second):
+        entity = document.entity(qualified_name(f"entity-id={random_suffix()}"))
+        document.wasGeneratedBy(entity, document.activity(activity))
+        document.wasAssociatedWith(
+            activity,
+            document.agent(agent),
+            other_attributes={"prov:role": f"role-{random_suffix()}"},
+        )
+    return [first, second]
+
+
+class TestStreamingWriter:
+    def test_json(self):
+        docs = documents()
+        expected = operations.merge([copy.deepcopy(document) for document in docs])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = str(pathlib.Path(tmpdir) / "graph.json")
+            with StreamingWriter(filename=filename) as writer:
+                for document in docs:
+                    writer.emit(document)
+
+            streamed = operations.read_prov_file(
+                filename, operations.DeserializationFormat.JSON
+            )
+
+        assert streamed == operations.deserialize(
+            operations.serialize(expected), operations.DeserializationFormat.JSON
+        )
+        assert len(streamed.get_records()) == 5
+
+    def test_anonymous_relations(self):
+        docs = anonymous_documents()
+        expected = operations.merge([copy.deepcopy(document) for document in docs])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = str(pathlib.Path(tmpdir) / "graph.json")
+            with StreamingWriter(filename=filename) as writer:
+                for document in docs:
+                    writer.emit(document)
+
+            streamed = operations.read_prov_file(
+                filename, operations.DeserializationFormat.JSON
+            )
+
+        assert streamed == operations.deserialize(
+            operations.serialize(expected), operations.DeserializationFormat.JSON
+        )
+        assert len(list(streamed.get_records(prov.model.ProvGeneration))) == 2
+        assert len(list(streamed.get_records(prov.model.ProvAssociation))) == 1
+
+    def test_provn(self):
+        docs = documents()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = str(pathlib.Path(tmpdir) / "graph.provn")
+            with StreamingWriter(filename, SerializationFormat.PROVN) as writer:
+                for document in docs:
+                    writer.emit(document)
+
+            with open(filename) as f:
+                streamed = f.read().splitlines()
+
+        expected = operations.merge([copy.deepcopy(document) for document in docs])
+        expected = operations.serialize(expected, SerializationFormat.PROVN)
+
+        assert streamed[0] == "document"
+        assert streamed[-1] == "endDocument"
+        assert sorted(streamed) == sorted(expected.splitlines())
+
+    def test_nothing_written_on_error(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = pathlib.Path(tmpdir) / "graph.json"
+            with pytest.raises(RuntimeError):
+                with StreamingWriter(str(filename)) as writer:
+                    writer.emit(documents()[0])
+                    raise RuntimeError
+
+            assert not filename.exists()
+
+    def test_unsupported_format(self):
+        with pytest.raises(NotImplementedError):
+            StreamingWriter("-", SerializationFormat.XML)
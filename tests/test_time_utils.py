@@ -1,18 +1,53 @@
+import calendar
 import datetime
 import time
 
 import pytz
 
-from mlflow2prov.utils.time_utils import unix_timestamp_to_datetime
+from mlflow2prov.utils.time_utils import (
+    datetime_to_unix_timestamp,
+    unix_timestamp_to_datetime,
+    unix_timestamps_to_datetimes,
+)
 
 
 class TestTimeUtils:
     def test_unix_timestamp_to_datetime(self):
         dt = datetime.datetime(2022, 2, 1, 8, 42, tzinfo=pytz.utc)
-        ts = time.mktime(dt.timetuple()) * 1000.0
+        ts = calendar.timegm(dt.timetuple()) * 1000.0
 
         assert unix_timestamp_to_datetime(ts) == dt
         assert unix_timestamp_to_datetime(int(ts)) == dt
         assert unix_timestamp_to_datetime(None) == datetime.datetime(
             1970, 1, 1, 0, 0
         ).replace(tzinfo=pytz.utc)
+
+    def test_unix_timestamp_to_datetime_independent_of_local_time(self, monkeypatch):
+        dt = datetime.datetime(2022, 2, 1, 8, 42, tzinfo=pytz.utc)
+        ts = calendar.timegm(dt.timetuple()) * 1000
+
+        monkeypatch.setenv("TZ", "America/New_York")
+        time.tzset()
+        try:
+            assert unix_timestamp_to_datetime(ts) == dt
+            assert unix_timestamp_to_datetime(ts).utcoffset() == datetime.timedelta(0)
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+
+    def test_datetime_to_unix_timestamp(self):
+        ts = 1_643_704_920_500
+
+        assert datetime_to_unix_timestamp(unix_timestamp_to_datetime(ts)) == ts
+        assert (
+            datetime_to_unix_timestamp(datetime.datetime(1970, 1, 1, 0, 0, 1)) == 1000
+        )
+
+    def test_unix_timestamps_to_datetimes(self):
+        timestamps = [1_643_704_920_000, None, 1_643_704_920_500, 1_643_704_920_000]
+
+        datetimes = unix_timestamps_to_datetimes(timestamps)
+
+        assert datetimes == [unix_timestamp_to_datetime(ts) for ts in timestamps]
+        assert datetimes[0] is datetimes[3]
+        assert unix_timestamps_to_datetimes([]) == []
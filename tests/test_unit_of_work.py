@@ -1,5 +1,6 @@
-from mlflow2prov.adapters.repository import InMemoryRepository
-from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork
+from mlflow2prov.adapters.repository import InMemoryRepository, SqliteRepository
+from mlflow2prov.domain.model import User
+from mlflow2prov.service_layer.unit_of_work import InMemoryUnitOfWork, SqliteUnitOfWork
 
 
 class TestInMemoryUnitOfWork:
@@ -26,3 +27,32 @@ class TestInMemoryUnitOfWork:
         assert uow1 == uow2
 
         assert not uow1 == InMemoryRepository()
+
+
+class TestSqliteUnitOfWork:
+    def test_with_and_commit(self, tmp_path):
+        uow = SqliteUnitOfWork(tmp_path / "db.sqlite")
+        user = User(name="u1", email="u1@domain.com")
+
+        with uow:
+            uow.resources["foo"].add(user)
+            uow.commit()
+
+        assert isinstance(uow.resources["foo"], SqliteRepository)
+        assert uow.resources["foo"].list_all(User) == [user]
+        assert uow.resources["bar"].list_all(User) == []
+
+    def test_rollback_on_exit(self, tmp_path):
+        uow = SqliteUnitOfWork(tmp_path / "db.sqlite")
+
+        with uow:
+            uow.resources["foo"].add(User(name="u1", email="u1@domain.com"))
+
+        assert uow.resources["foo"].list_all(User) == []
+
+    def test_eq(self, tmp_path):
+        uow = SqliteUnitOfWork(tmp_path / "db.sqlite")
+
+        assert uow == SqliteUnitOfWork(tmp_path / "db.sqlite")
+        assert not uow == SqliteUnitOfWork(tmp_path / "other.sqlite")
+        assert not uow == InMemoryUnitOfWork()